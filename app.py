@@ -6,130 +6,575 @@ A complete web interface for uploading plant images and getting disease analysis
 with treatment recommendations, weather analysis, and Wikipedia information.
 """
 
-from flask import Flask, request, render_template, jsonify, redirect, url_for, flash
+from flask import Flask, request, render_template, jsonify, redirect, url_for, flash, Response, stream_with_context, send_from_directory, send_file, abort
 from werkzeug.utils import secure_filename
 import os
 import json
 import uuid
+import mimetypes
+import zipfile
+import tarfile
+import threading
 from datetime import datetime
-import torch
-import torchvision.models as models
-from PIL import Image
-from torchvision import transforms
+from concurrent.futures import ThreadPoolExecutor
 import sys
 
 # Add src directory to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.plant_care_system import PlantCareRecommendationSystem
+from src.plant_care_system import PlantCareRecommendationSystem, get_care_system
+from src.recommendation_store import get_recommendation_store
 from src.disease_analyzer import SimpleEnhancedPlantCare
+from src.prediction_cache import PredictionCache, image_hash
+from src.lookup_cache import LookupCache
+from src.job_queue import JobQueue
+from src.weather_service import WeatherService, OpenWeatherMapProvider, MockWeatherProvider
+from src.result_store import ResultStore
+from src.class_names import CLASS_NAMES
+from src.image_derivatives import DerivativeGenerator, derivative_names, FORMATS as DERIVATIVE_FORMATS
+from src.blob_store import BlobStore, is_content_hash
+from src.calibration import Calibration, DEFAULT_TOP_K, top_k
+
+# torch/torchvision are imported lazily (see load_model) so the web process
+# can start serving pages before the model is ready
 
 app = Flask(__name__)
 app.secret_key = 'plant_disease_secret_key_2025'  # Change in production
 
 # Configuration
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz')
+MAX_BATCH_IMAGES = 200
+MAX_BATCH_BYTES = 256 * 1024 * 1024  # decompressed image data per batch request
+HISTORY_PAGE_SIZE = 12
+MAX_HISTORY_PAGE_SIZE = 100
+PREPROCESS_WORKERS = 4
+MODEL_DIR = 'model'
+MODEL_BACKEND = os.environ.get('MODEL_BACKEND', 'pytorch')
+LAZY_MODEL_LOAD = os.environ.get('LAZY_MODEL_LOAD', '0') == '1'
+PREDICTION_CACHE_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 1024))
+PREDICTION_CACHE_DIR = os.environ.get('PREDICTION_CACHE_DIR', '')  # empty = memory only
+ENRICHMENT_DEADLINE = float(os.environ.get('ENRICHMENT_DEADLINE', 8.0))  # seconds
+ENRICHMENT_JOB_WORKERS = int(os.environ.get('ENRICHMENT_JOB_WORKERS', 4))
+OPENWEATHER_API_KEY = os.environ.get('OPENWEATHER_API_KEY', '')
+WEATHER_PROVIDER = os.environ.get('WEATHER_PROVIDER', 'openweathermap')  # or 'mock'
+WEATHER_FRESHNESS = float(os.environ.get('WEATHER_FRESHNESS', 600))  # seconds
+WEATHER_DAILY_BUDGET = int(os.environ.get('WEATHER_DAILY_BUDGET', 1000))  # 0 = unlimited
+RECOMMENDATIONS_PATH = os.environ.get('RECOMMENDATIONS_PATH', '')  # empty = data/care_recommendations.json
+WIKIPEDIA_CACHE_PATH = os.environ.get('WIKIPEDIA_CACHE_PATH', os.path.join('cache', 'wikipedia.sqlite3'))
+RESULT_DB_PATH = os.environ.get('RESULT_DB_PATH', os.path.join('results', 'results.sqlite3'))
+DERIVATIVES_DIR = os.environ.get('DERIVATIVES_DIR', 'derivatives')
+MEDIA_MAX_AGE = 365 * 24 * 3600  # derivative and original URLs are content-addressed
+BLOB_DIR = os.environ.get('BLOB_DIR', 'blobs')
+BLOB_MAX_AGE_DAYS = float(os.environ.get('BLOB_MAX_AGE_DAYS', 0))  # 0 = keep forever
+BLOB_MAX_TOTAL_MB = float(os.environ.get('BLOB_MAX_TOTAL_MB', 0))  # 0 = unlimited
+PERSIST_UPLOADS = os.environ.get('PERSIST_UPLOADS', '1') == '1'
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
+INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', 8))
+INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', 10))
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 0))  # 0 = in-process
+INFERENCE_THREADS_PER_WORKER = int(os.environ.get('INFERENCE_THREADS_PER_WORKER', 0))  # 0 = cores / workers
+INFERENCE_START_METHOD = os.environ.get('INFERENCE_START_METHOD', '')  # empty = spawn
+INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', 30))  # seconds, 0 = wait forever
+TOP_K_PREDICTIONS = int(os.environ.get('TOP_K_PREDICTIONS', DEFAULT_TOP_K))
+REVIEW_THRESHOLD = os.environ.get('REVIEW_THRESHOLD', '')  # empty = fitted threshold from the calibration file
+TTA_MODE = os.environ.get('TTA_MODE', 'off')  # off, auto (below TTA_THRESHOLD) or always
+TTA_VIEWS = int(os.environ.get('TTA_VIEWS', 4))
+TTA_THRESHOLD = os.environ.get('TTA_THRESHOLD', '')  # empty = the review threshold
 
-app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
-
-# Create upload directory if it doesn't exist
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+app.config['INFERENCE_MAX_BATCH_SIZE'] = INFERENCE_MAX_BATCH_SIZE
+app.config['INFERENCE_MAX_WAIT_MS'] = INFERENCE_MAX_WAIT_MS
+app.config['INFERENCE_WORKERS'] = INFERENCE_WORKERS
+app.config['INFERENCE_THREADS_PER_WORKER'] = INFERENCE_THREADS_PER_WORKER
+app.config['INFERENCE_START_METHOD'] = INFERENCE_START_METHOD or None
+app.config['INFERENCE_TIMEOUT'] = INFERENCE_TIMEOUT or None
+app.config['TOP_K_PREDICTIONS'] = TOP_K_PREDICTIONS
+app.config['REVIEW_THRESHOLD'] = float(REVIEW_THRESHOLD) if REVIEW_THRESHOLD else None
+app.config['TTA_MODE'] = TTA_MODE
+app.config['TTA_VIEWS'] = TTA_VIEWS
+app.config['TTA_THRESHOLD'] = float(TTA_THRESHOLD) if TTA_THRESHOLD else None
+app.config['PERSIST_UPLOADS'] = PERSIST_UPLOADS
+app.config['RESULT_DB_PATH'] = RESULT_DB_PATH
+app.config['DERIVATIVES_DIR'] = DERIVATIVES_DIR
+app.config['BLOB_DIR'] = BLOB_DIR
+app.config['BLOB_MAX_AGE_DAYS'] = BLOB_MAX_AGE_DAYS
+app.config['BLOB_MAX_TOTAL_MB'] = BLOB_MAX_TOTAL_MB
+app.config['MODEL_BACKEND'] = MODEL_BACKEND
+app.config['LAZY_MODEL_LOAD'] = LAZY_MODEL_LOAD
+app.config['PREDICTION_CACHE_SIZE'] = PREDICTION_CACHE_SIZE
+app.config['PREDICTION_CACHE_DIR'] = PREDICTION_CACHE_DIR
+app.config['WIKIPEDIA_CACHE_PATH'] = WIKIPEDIA_CACHE_PATH
+app.config['RECOMMENDATIONS_PATH'] = RECOMMENDATIONS_PATH
+app.config['OPENWEATHER_API_KEY'] = OPENWEATHER_API_KEY
+app.config['WEATHER_PROVIDER'] = WEATHER_PROVIDER
+app.config['WEATHER_FRESHNESS'] = WEATHER_FRESHNESS
+app.config['WEATHER_DAILY_BUDGET'] = WEATHER_DAILY_BUDGET
+app.config['ENRICHMENT_DEADLINE'] = ENRICHMENT_DEADLINE
+app.config['ENRICHMENT_JOB_WORKERS'] = ENRICHMENT_JOB_WORKERS
 
 # Global variables for model and systems
-model = None
+inference_engine = None
+prediction_cache = None
 class_names = None
+calibration = Calibration()  # temperature scaling + review threshold (see src/calibration.py)
+tta_stats = {'predictions': 0, 'triggered': 0, 'changed': 0}
+tta_stats_lock = threading.Lock()
 care_system = None
 enhanced_system = None
+model_lock = threading.Lock()
+
+# Background writer so uploads are persisted off the request path
+persistence_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='persist')
+pending_uploads = {}  # content hash -> Future of a blob write still in progress
+
+# Stores and background workers, created by init_storage()
+result_store = None
+derivative_generator = None
+blob_store = None
+job_queue = None
+app.jinja_env.globals['media_formats'] = DERIVATIVE_FORMATS
+
+def init_storage():
+    """
+    Open the result, upload and derivative stores and start the enrichment
+    job queue. Not run in spawned inference workers, which re-import this
+    module as __mp_main__ but only need the model.
+    """
+    global result_store, derivative_generator, blob_store, job_queue
+    
+    # Analysis results (SQLite); results saved as JSON files by older versions
+    # are imported the first time the store is created
+    result_store = ResultStore(app.config['RESULT_DB_PATH'])
+    if result_store.count() == 0:
+        imported, _ = result_store.import_json_dir('results')
+        if imported:
+            print(f"✅ Imported {imported} saved results into {app.config['RESULT_DB_PATH']}")
+    result_store.ensure_index()
+    
+    # Thumbnails / display-sized copies of uploads, generated in the background
+    derivative_generator = DerivativeGenerator(app.config['DERIVATIVES_DIR'])
+    
+    # One content-addressed copy of each original upload (see src/blob_store.py)
+    blob_store = BlobStore(
+        app.config['BLOB_DIR'],
+        max_age_days=app.config['BLOB_MAX_AGE_DAYS'],
+        max_total_bytes=int(app.config['BLOB_MAX_TOTAL_MB'] * 1024 * 1024)
+    )
+    
+    # Enrichment (weather / Wikipedia) runs here after the prediction is returned
+    job_queue = JobQueue(workers=app.config['ENRICHMENT_JOB_WORKERS'])
+
+if __name__ != '__mp_main__':
+    init_storage()
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def load_model_and_systems():
-    """Load the disease detection model and care systems"""
-    global model, class_names, care_system, enhanced_system
+def is_archive(filename):
+    """Check if the upload is a supported image archive"""
+    return filename.lower().endswith(ARCHIVE_EXTENSIONS)
+
+class BatchTooLarge(ValueError):
+    """A batch upload holds more than MAX_BATCH_IMAGES images or MAX_BATCH_BYTES of image data"""
+
+def extract_batch_images(files):
+    """
+    Collect (filename, bytes) pairs from uploaded images and zip/tar archives.
+    Limits are checked member by member while unpacking, so an oversized
+    archive (or a decompression bomb) is rejected before it is expanded.
     
-    try:
-        # Load model
-        model_path = os.path.join("model", "plant_disease_classifier.pth")
-        checkpoint = torch.load(model_path, map_location="cpu")
-        
-        # Get class names and create model
-        class_names = checkpoint['class_names']
-        num_classes = len(class_names)
-        
-        # Create model architecture
-        model = models.resnet50(pretrained=False)
-        model.fc = torch.nn.Linear(model.fc.in_features, num_classes)
+    Raises:
+        BatchTooLarge: too many images or too much decompressed data
+    """
+    images = []
+    total_bytes = 0
+    
+    def add(name, stream):
+        nonlocal total_bytes
+        if len(images) >= MAX_BATCH_IMAGES:
+            raise BatchTooLarge(f'Too many images (max {MAX_BATCH_IMAGES})')
+        # Never read more than the batch has room for
+        data = stream.read(MAX_BATCH_BYTES - total_bytes + 1)
+        total_bytes += len(data)
+        if total_bytes > MAX_BATCH_BYTES:
+            raise BatchTooLarge(f'Images too large (max {MAX_BATCH_BYTES // (1024 * 1024)}MB per batch)')
+        images.append((name, data))
+    
+    for file in files:
+        if not file or file.filename == '':
+            continue
         
-        # Load weights
-        if 'model_state_dict' in checkpoint:
-            model.load_state_dict(checkpoint['model_state_dict'])
+        if is_archive(file.filename):
+            if file.filename.lower().endswith('.zip'):
+                with zipfile.ZipFile(file.stream) as archive:
+                    for member in archive.infolist():
+                        if member.is_dir() or not allowed_file(member.filename):
+                            continue
+                        if member.file_size > MAX_CONTENT_LENGTH:
+                            continue
+                        with archive.open(member) as stream:
+                            add(os.path.basename(member.filename), stream)
+            else:
+                # Streaming mode: members are decompressed one at a time
+                with tarfile.open(fileobj=file.stream, mode='r|*') as archive:
+                    for member in archive:
+                        if not member.isfile() or not allowed_file(member.name):
+                            continue
+                        if member.size > MAX_CONTENT_LENGTH:
+                            continue
+                        add(os.path.basename(member.name), archive.extractfile(member))
+        elif allowed_file(file.filename):
+            add(secure_filename(file.filename), file.stream)
+    
+    return images
+
+def persist_upload_async(image_bytes, image_key, filename):
+    """
+    Store the original upload in the background, once per distinct image
+    (a re-upload only adds a reference). Skipped when PERSIST_UPLOADS is off;
+    the result then links to its display-sized copy instead.
+    
+    Returns:
+        str: content hash of the stored original, or None
+    """
+    if not app.config['PERSIST_UPLOADS']:
+        return None
+    future = persistence_executor.submit(blob_store.put, image_bytes, image_key, mimetypes.guess_type(filename)[0])
+    pending_uploads[image_key] = future
+    future.add_done_callback(lambda _: pending_uploads.pop(image_key, None))
+    return image_key
+
+def create_weather_service(http_client):
+    """Weather service for the configured provider (None without an API key)"""
+    if app.config['WEATHER_PROVIDER'] == 'mock':
+        provider = MockWeatherProvider()
+    elif app.config['OPENWEATHER_API_KEY']:
+        provider = OpenWeatherMapProvider(app.config['OPENWEATHER_API_KEY'], http_client)
+    else:
+        return None
+    print(f"🌤️ Weather provider: {provider.name}")
+    return WeatherService(
+        provider,
+        freshness=app.config['WEATHER_FRESHNESS'],
+        daily_budget=app.config['WEATHER_DAILY_BUDGET']
+    )
+
+def load_care_systems():
+    """Load the recommendation and enrichment systems (no torch needed)"""
+    global care_system, enhanced_system
+    
+    if care_system is None:
+        # One recommendation database (hot-reloaded from JSON) for the app and enrichment
+        if app.config['RECOMMENDATIONS_PATH']:
+            care_system = PlantCareRecommendationSystem(get_recommendation_store(app.config['RECOMMENDATIONS_PATH']))
         else:
-            model = checkpoint['model']
-        
-        model.eval()
-        
-        # Load care systems
-        care_system = PlantCareRecommendationSystem()
-        enhanced_system = SimpleEnhancedPlantCare()
-        
-        print("✅ Model and systems loaded successfully!")
-        return True
+            care_system = get_care_system()
+        care_system.review_threshold = calibration.review_threshold
+    if enhanced_system is None:
+        lookup_cache = LookupCache(app.config['WIKIPEDIA_CACHE_PATH'] or None)
+        enhanced_system = SimpleEnhancedPlantCare(
+            lookup_cache=lookup_cache,
+            enrichment_deadline=app.config['ENRICHMENT_DEADLINE'],
+            care_system=care_system
+        )
+        enhanced_system.weather_service = create_weather_service(enhanced_system.http_client)
+
+def load_model():
+    """Load the disease detection model and start the inference engine"""
+    global inference_engine, prediction_cache, class_names, calibration
+    
+    with model_lock:
+        if inference_engine is not None:
+            return True
         
+        try:
+            # Heavy imports deferred until the model is actually needed
+            from src.model_backends import load_backend, model_version
+            from src.calibration import calibration_path
+            
+            # Load model for the configured backend (pytorch, torchscript, int8, onnx)
+            model, names = load_backend(app.config['MODEL_BACKEND'], MODEL_DIR)
+            print(f"🧠 Model backend: {app.config['MODEL_BACKEND']}")
+            class_names = names
+            version = model_version(app.config['MODEL_BACKEND'], MODEL_DIR)
+            
+            # Temperature scaling fitted offline (python -m src.calibration fit)
+            calibration = Calibration.load(calibration_path(app.config['MODEL_BACKEND'], MODEL_DIR), version)
+            if app.config['REVIEW_THRESHOLD'] is not None:
+                calibration.review_threshold = app.config['REVIEW_THRESHOLD']
+            if calibration.fitted:
+                print(f"📏 Calibration: temperature {calibration.temperature:.3f}, "
+                      f"review below {calibration.review_threshold:.2f}")
+            if care_system is not None:
+                care_system.review_threshold = calibration.review_threshold
+            
+            # Predictions are cached per image content, model version, calibration and TTA mode
+            if app.config['TTA_MODE'] != 'off':
+                version += f":tta-{app.config['TTA_MODE']}-{app.config['TTA_VIEWS']}"
+            prediction_cache = PredictionCache(
+                max_entries=app.config['PREDICTION_CACHE_SIZE'],
+                disk_dir=app.config['PREDICTION_CACHE_DIR'] or None,
+                model_version=f"{version}:T{calibration.temperature:.4f}"
+            )
+            
+            if app.config['INFERENCE_WORKERS'] > 0:
+                # Worker processes sharing the loaded weights; backends that
+                # cannot be pickled to them (TorchScript, ONNX) load in each worker
+                from functools import partial
+                from src.worker_pool import InferenceWorkerPool
+                
+                model_loader = None
+                if app.config['MODEL_BACKEND'] != 'pytorch':
+                    model_loader = partial(load_backend, app.config['MODEL_BACKEND'], MODEL_DIR)
+                inference_engine = InferenceWorkerPool(
+                    model, class_names,
+                    num_workers=app.config['INFERENCE_WORKERS'],
+                    threads_per_worker=app.config['INFERENCE_THREADS_PER_WORKER'] or None,
+                    max_batch_size=app.config['INFERENCE_MAX_BATCH_SIZE'],
+                    max_wait_ms=app.config['INFERENCE_MAX_WAIT_MS'],
+                    start_method=app.config['INFERENCE_START_METHOD'],
+                    temperature=calibration.temperature,
+                    model_loader=model_loader
+                ).start()
+                print(f"⚙️ Inference workers: {app.config['INFERENCE_WORKERS']} ({inference_engine.start_method})")
+            else:
+                from src.inference_engine import BatchingInferenceEngine
+                
+                # Wrap the model in the in-process batching scheduler
+                inference_engine = BatchingInferenceEngine(
+                    model, class_names,
+                    max_batch_size=app.config['INFERENCE_MAX_BATCH_SIZE'],
+                    max_wait_ms=app.config['INFERENCE_MAX_WAIT_MS'],
+                    temperature=calibration.temperature
+                ).start()
+            return True
+            
+        except Exception as e:
+            print(f"❌ Error loading model: {str(e)}")
+            return False
+
+def ensure_model_loaded():
+    """Load the model on first use if it isn't ready yet"""
+    return inference_engine is not None or load_model()
+
+def start_background_model_load():
+    """Warm the model up in the background while the server starts"""
+    threading.Thread(target=load_model, name='model-loader', daemon=True).start()
+
+def load_model_and_systems():
+    """Load the disease detection model and care systems"""
+    try:
+        load_care_systems()
     except Exception as e:
-        print(f"❌ Error loading model: {str(e)}")
+        print(f"❌ Error loading care systems: {str(e)}")
+        return False
+    
+    if not load_model():
         return False
+    
+    print("✅ Model and systems loaded successfully!")
+    return True
 
-def preprocess_image(image_path):
-    """Preprocess image for model prediction"""
+def preprocess_image(image_source, on_decoded=None):
+    """
+    Preprocess image for model prediction.
+    Accepts a file path, a file-like object or raw image bytes.
+    on_decoded(image) receives the decoded RGB image before normalization.
+    """
     try:
-        # Define transforms (same as training)
-        transform = transforms.Compose([
-            transforms.Resize((224, 224)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406],
-                               std=[0.229, 0.224, 0.225])
-        ])
+        from src import image_preprocessing
         
-        # Load and transform image
-        image = Image.open(image_path).convert('RGB')
-        image_tensor = transform(image).unsqueeze(0)
+        if on_decoded is not None:
+            image = image_preprocessing.decode_image(image_source)
+            on_decoded(image)
+            return image_preprocessing.image_to_tensor(image).unsqueeze(0)
         
-        return image_tensor
+        # Shared pipeline: draft-mode decode + fused resize/normalize
+        return image_preprocessing.preprocess_image(image_source)
         
     except Exception as e:
         print(f"❌ Error preprocessing image: {str(e)}")
         return None
 
-def predict_disease(image_path):
-    """Predict disease from image"""
-    global model, class_names
-    
+def predict_disease(image_source, on_decoded=None, tta_mode=None):
+    """
+    Predict disease from an image path, file-like object or bytes
+
+    Args:
+        tta_mode: 'off', 'auto' or 'always' (default: TTA_MODE). In 'auto'
+            mode, predictions below TTA_THRESHOLD are redone from TTA_VIEWS
+            augmented views in one batch, averaging their logits.
+
+    Returns:
+        tuple: (predicted_class, confidence, top_predictions), where
+        top_predictions lists the TOP_K_PREDICTIONS most probable classes
+        as {"class", "probability"} with calibrated probabilities
+    """
     try:
-        # Preprocess image
-        image_tensor = preprocess_image(image_path)
+        if not ensure_model_loaded():
+            return None, 0.0, []
+        
+        tta_mode = tta_mode or app.config['TTA_MODE']
+        decoded = {}
+        
+        def keep_decoded(image):
+            decoded['image'] = image
+            if on_decoded is not None:
+                on_decoded(image)
+        
+        # Preprocess image (keeping the decode when TTA may need it)
+        image_tensor = preprocess_image(image_source, keep_decoded if tta_mode != 'off' else on_decoded)
         if image_tensor is None:
-            return None, 0.0
+            return None, 0.0, []
         
-        # Make prediction
-        with torch.no_grad():
-            outputs = model(image_tensor)
-            probabilities = torch.nn.functional.softmax(outputs[0], dim=0)
-            confidence, predicted_idx = torch.max(probabilities, 0)
-            
-            predicted_class = class_names[predicted_idx.item()]
-            confidence_score = confidence.item()
-            
-            return predicted_class, confidence_score
+        # Make prediction (batched with concurrent requests)
+        probabilities = inference_engine.predict_proba(image_tensor, timeout=app.config['INFERENCE_TIMEOUT'])[0]
+        
+        if tta_mode != 'off':
+            threshold = app.config['TTA_THRESHOLD']
+            if threshold is None:
+                threshold = calibration.review_threshold
+            triggered = tta_mode == 'always' or probabilities.max().item() < threshold
+            changed = False
+            if triggered:
+                from src.tta import VIEWS, predict_tta
+                
+                base_class = probabilities.argmax().item()
+                probabilities = predict_tta(inference_engine, decoded['image'], VIEWS[:app.config['TTA_VIEWS']],
+                                            base_probabilities=probabilities,
+                                            timeout=app.config['INFERENCE_TIMEOUT'])
+                changed = probabilities.argmax().item() != base_class
+            with tta_stats_lock:
+                tta_stats['predictions'] += 1
+                tta_stats['triggered'] += int(triggered)
+                tta_stats['changed'] += int(changed)
+        
+        top_predictions = top_k(probabilities.numpy(), class_names, app.config['TOP_K_PREDICTIONS'])
+        return top_predictions[0]['class'], top_predictions[0]['probability'], top_predictions
             
+    except TimeoutError:
+        print(f"❌ Error predicting disease: no result within {app.config['INFERENCE_TIMEOUT']}s")
+        return None, 0.0, []
     except Exception as e:
         print(f"❌ Error predicting disease: {str(e)}")
-        return None, 0.0
+        return None, 0.0, []
+
+def analyze_image_bytes(image_bytes, on_decoded=None):
+    """
+    Predict disease with the content-hash cache in front of the model.
+    on_decoded is passed to preprocess_image (only called on a cache miss).
+
+    Returns:
+        tuple: (predicted_class, confidence, image_key, top_predictions)
+    """
+    if not ensure_model_loaded():
+        return None, 0.0, None, []
+    
+    image_key = image_hash(image_bytes)
+    cached = prediction_cache.get_prediction(image_key)
+    if cached is not None:
+        return cached[0], cached[1], image_key, cached[2]
+    
+    predicted_class, confidence, top_predictions = predict_disease(image_bytes, on_decoded)
+    if predicted_class is not None:
+        prediction_cache.put_prediction(image_key, predicted_class, confidence, top_predictions)
+    
+    return predicted_class, confidence, image_key, top_predictions
+
+def get_enhanced_analysis(image_key, predicted_class, confidence, location):
+    """Enhanced diagnosis, reused when the same image is re-analyzed for a location"""
+    cached = prediction_cache.get_analysis(image_key, location)
+    if cached is not None:
+        return cached
+    return compute_enhanced_analysis(image_key, predicted_class, confidence, location)
+
+def compute_enhanced_analysis(image_key, predicted_class, confidence, location, on_progress=None):
+    """Run the enhanced diagnosis and store it in the prediction cache"""
+    enhanced_analysis = enhanced_system.get_complete_enhanced_diagnosis(
+        predicted_class, confidence, location, on_progress=on_progress
+    )
+    
+    # Don't pin partial results (sources that missed the deadline) in the cache
+    if not enhanced_analysis.get('enrichment_timing', {}).get('partial'):
+        prediction_cache.put_analysis(image_key, location, enhanced_analysis)
+    return enhanced_analysis
+
+def save_result(result_id, result_data):
+    """Persist a result (saved again when background enrichment completes)"""
+    result_store.save(result_id, result_data)
+
+def start_enrichment_job(image_key, predicted_class, confidence, location, result_id=None, result_data=None):
+    """
+    Queue the enhanced diagnosis as a background job.
+    When result_data is given, the saved result is updated once it finishes.
+
+    Returns:
+        str: job id (the result id for saved results)
+    """
+    steps = ['classification'] + enhanced_system.enrichment_steps(location) + ['saving']
+    
+    def run(report):
+        try:
+            enhanced_analysis = compute_enhanced_analysis(
+                image_key, predicted_class, confidence, location, on_progress=report
+            )
+        except Exception as e:
+            print(f"Enhanced analysis error: {e}")
+            if result_data is not None:
+                result_data['enhanced_analysis'] = {"error": str(e)}
+                result_data['enrichment_status'] = 'failed'
+                save_result(result_id, result_data)
+            raise
+        
+        if result_data is not None:
+            result_data['enhanced_analysis'] = enhanced_analysis
+            result_data['enrichment_status'] = 'complete'
+            save_result(result_id, result_data)
+        return enhanced_analysis
+    
+    return job_queue.submit(run, steps, job_id=result_id, completed_steps=['classification'])
+
+def merge_job_sections(enhanced_analysis, job):
+    """Fill an analysis with the sections a running job has already produced"""
+    merged = dict(enhanced_analysis or {})
+    for step, data in job['sections'].items():
+        if step == 'recommendations':
+            merged.update(data)
+        else:
+            merged[step] = data
+    return merged
+
+def wants_json():
+    """True for script clients that asked for JSON instead of a page"""
+    best = request.accept_mimetypes.best_match(['application/json', 'text/html'])
+    return best == 'application/json' and request.accept_mimetypes[best] > request.accept_mimetypes['text/html']
+
+def parse_history_filters(args):
+    """
+    Read history filters from query parameters
+    (class, location, date_from, date_to as YYYY-MM-DD, min_confidence 0-1)
+
+    Raises:
+        ValueError: for malformed dates or confidence values
+    """
+    filters = {
+        'predicted_class': args.get('class') or None,
+        'location': args.get('location') or None,
+        'date_from': args.get('date_from') or None,
+        'date_to': args.get('date_to') or None,
+        'min_confidence': None
+    }
+    for key in ('date_from', 'date_to'):
+        if filters[key]:
+            datetime.strptime(filters[key], '%Y-%m-%d')
+    if args.get('min_confidence'):
+        filters['min_confidence'] = float(args['min_confidence'])
+        if not 0.0 <= filters['min_confidence'] <= 1.0:
+            raise ValueError("min_confidence must be between 0 and 1")
+    return filters
 
 @app.route('/')
 def index():
@@ -139,70 +584,88 @@ def index():
 @app.route('/upload', methods=['POST'])
 def upload_file():
     """Handle file upload and disease analysis"""
-    if 'file' not in request.files:
+    if 'file' not in request.files or request.files['file'].filename == '':
+        if wants_json():
+            return jsonify({'error': 'No file selected'}), 400
         flash('No file selected')
         return redirect(request.url)
     
     file = request.files['file']
     location = request.form.get('location', 'Unknown')
     
-    if file.filename == '':
-        flash('No file selected')
-        return redirect(request.url)
-    
     if file and allowed_file(file.filename):
-        # Save uploaded file
         filename = secure_filename(file.filename)
-        unique_filename = f"{uuid.uuid4()}_{filename}"
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        
-        # Also save to static/uploads for web display
-        static_filepath = os.path.join('static', 'uploads', unique_filename)
-        file.save(filepath)
         
-        # Copy to static directory for web display
-        import shutil
-        shutil.copy2(filepath, static_filepath)
+        # Decode straight from memory; disk writes happen in the background
+        image_bytes = file.read()
         
-        # Predict disease
-        predicted_class, confidence = predict_disease(filepath)
+        # Predict disease (cached by image content), keeping the decode for thumbnails
+        decoded = {}
+        predicted_class, confidence, image_key, top_predictions = analyze_image_bytes(
+            image_bytes, on_decoded=lambda image: decoded.setdefault('image', image)
+        )
         
         if predicted_class is None:
+            if wants_json():
+                return jsonify({'error': 'Error analyzing image'}), 500
             flash('Error analyzing image. Please try again.')
             return redirect(url_for('index'))
         
-        # Get enhanced analysis
-        try:
-            enhanced_analysis = enhanced_system.get_complete_enhanced_diagnosis(
-                predicted_class, confidence, location
-            )
-        except Exception as e:
-            print(f"Enhanced analysis error: {e}")
-            enhanced_analysis = {"error": str(e)}
+        # Original (stored once per image) plus thumbnail and display-sized
+        # copies, all written off the request path
+        original = persist_upload_async(image_bytes, image_key, filename)
+        derivatives = derivative_generator.submit(image_key, image_bytes, decoded.get('image'))
+        
+        # Enhanced analysis comes from the cache, or is filled in by a
+        # background job after the prediction has been returned
+        cached_analysis = prediction_cache.get_analysis(image_key, location)
         
         # Create result data
+        result_id = str(uuid.uuid4())
         result_data = {
-            'filename': unique_filename,
+            'original': original,
             'original_filename': filename,
+            'derivatives': derivatives,
+            'thumbnail': derivatives['thumb']['jpeg'],
             'predicted_class': predicted_class,
             'confidence': confidence,
+            'top_predictions': top_predictions,
+            'needs_review': calibration.needs_review(confidence),
             'location': location,
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'enhanced_analysis': enhanced_analysis
+            'enhanced_analysis': cached_analysis or {},
+            'enrichment_status': 'complete' if cached_analysis is not None else 'pending'
         }
         
         # Save result to JSON file for persistence
-        result_id = str(uuid.uuid4())
-        result_file = os.path.join('results', f'{result_id}.json')
-        os.makedirs('results', exist_ok=True)
+        save_result(result_id, result_data)
+        
+        job = None
+        if cached_analysis is None:
+            start_enrichment_job(image_key, predicted_class, confidence, location,
+                                 result_id=result_id, result_data=dict(result_data))
+            job = job_queue.get(result_id)
         
-        with open(result_file, 'w') as f:
-            json.dump(result_data, f, indent=2)
+        if wants_json():
+            return jsonify({
+                'result_id': result_id,
+                'predicted_class': predicted_class,
+                'confidence': confidence,
+                'top_predictions': top_predictions,
+                'needs_review': result_data['needs_review'],
+                'enrichment_status': result_data['enrichment_status'],
+                'result_url': url_for('view_result', result_id=result_id),
+                'status_url': url_for('api_job_status', job_id=result_id),
+                'events_url': url_for('api_job_events', job_id=result_id)
+            }), 202 if job else 200
         
         return render_template('results.html', 
                              result=result_data, 
-                             result_id=result_id)
+                             result_id=result_id,
+                             job=job)
     
+    if wants_json():
+        return jsonify({'error': 'Invalid file type'}), 400
     flash('Invalid file type. Please upload PNG, JPG, JPEG, or GIF files.')
     return redirect(url_for('index'))
 
@@ -219,38 +682,148 @@ def api_analyze():
         if not allowed_file(file.filename):
             return jsonify({'error': 'Invalid file type'}), 400
         
-        # Save temporary file
-        filename = secure_filename(file.filename)
-        temp_filepath = os.path.join(app.config['UPLOAD_FOLDER'], f"temp_{uuid.uuid4()}_{filename}")
-        file.save(temp_filepath)
+        # Predict disease from the in-memory upload (cached by image content)
+        predicted_class, confidence, image_key, top_predictions = analyze_image_bytes(file.read())
         
-        try:
-            # Predict disease
-            predicted_class, confidence = predict_disease(temp_filepath)
-            
-            if predicted_class is None:
-                return jsonify({'error': 'Error analyzing image'}), 500
-            
-            # Get enhanced analysis
-            enhanced_analysis = enhanced_system.get_complete_enhanced_diagnosis(
-                predicted_class, confidence, location
-            )
+        if predicted_class is None:
+            return jsonify({'error': 'Error analyzing image'}), 500
+        
+        result = {
+            'predicted_class': predicted_class,
+            'confidence': confidence,
+            'top_predictions': top_predictions,
+            'needs_review': calibration.needs_review(confidence),
+            'location': location,
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        # async=1: return the prediction now and enrich in the background
+        if request.form.get('async', request.args.get('async')) == '1':
+            cached_analysis = prediction_cache.get_analysis(image_key, location)
+            if cached_analysis is not None:
+                result['enhanced_analysis'] = cached_analysis
+                return jsonify(result)
             
-            result = {
-                'predicted_class': predicted_class,
-                'confidence': confidence,
-                'location': location,
-                'timestamp': datetime.now().isoformat(),
-                'enhanced_analysis': enhanced_analysis
-            }
+            job_id = start_enrichment_job(image_key, predicted_class, confidence, location)
+            result.update({
+                'job_id': job_id,
+                'status_url': url_for('api_job_status', job_id=job_id),
+                'events_url': url_for('api_job_events', job_id=job_id)
+            })
+            return jsonify(result), 202
+        
+        # Get enhanced analysis
+        result['enhanced_analysis'] = get_enhanced_analysis(
+            image_key, predicted_class, confidence, location
+        )
+        
+        return jsonify(result)
+                
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def api_analyze_batch():
+    """API endpoint for analyzing many images (or an archive) in one request"""
+    try:
+        files = request.files.getlist('files') + request.files.getlist('file')
+        location = request.form.get('location', 'Unknown')
+        
+        if not files:
+            return jsonify({'error': 'No files provided'}), 400
+        
+        try:
+            images = extract_batch_images(files)
+        except BatchTooLarge as e:
+            return jsonify({'error': str(e)}), 400
+        except (zipfile.BadZipFile, tarfile.TarError):
+            return jsonify({'error': 'Unreadable archive'}), 400
+        
+        if not images:
+            return jsonify({'error': 'No valid images found'}), 400
+        
+        if not ensure_model_loaded():
+            return jsonify({'error': 'Model not available'}), 503
+        
+        from src import image_preprocessing
+        
+        # Serve previously seen images from the prediction cache
+        predictions = {}
+        image_keys = [image_hash(data) for _, data in images]
+        misses = []
+        for i, image_key in enumerate(image_keys):
+            cached = prediction_cache.get_prediction(image_key)
+            if cached is not None:
+                predictions[i] = cached
+            else:
+                misses.append(i)
+        
+        # Preprocess the rest in parallel straight into one batch slab
+        if misses:
+            with ThreadPoolExecutor(max_workers=PREPROCESS_WORKERS) as executor:
+                batch, valid = image_preprocessing.preprocess_batch(
+                    [images[i][1] for i in misses], executor=executor
+                )
             
-            return jsonify(result)
+            # Single batched model pass; top-k comes from the same probabilities
+            if valid:
+                probabilities = inference_engine.predict_proba(batch, timeout=app.config['INFERENCE_TIMEOUT']).numpy()
+                for j, row in zip(valid, probabilities):
+                    i = misses[j]
+                    top_predictions = top_k(row, class_names, app.config['TOP_K_PREDICTIONS'])
+                    predicted_class, confidence = top_predictions[0]['class'], top_predictions[0]['probability']
+                    predictions[i] = (predicted_class, confidence, top_predictions)
+                    # The cache version promises TTA results, which this pass does not compute
+                    if app.config['TTA_MODE'] == 'off':
+                        prediction_cache.put_prediction(image_keys[i], predicted_class, confidence, top_predictions)
+        
+        # Per-class aggregates
+        class_summary = {}
+        for predicted_class, confidence, _ in predictions.values():
+            summary = class_summary.setdefault(predicted_class, {'count': 0, 'confidences': []})
+            summary['count'] += 1
+            summary['confidences'].append(confidence)
+        
+        for predicted_class, summary in class_summary.items():
+            confidences = summary.pop('confidences')
+            summary['mean_confidence'] = sum(confidences) / len(confidences)
+            summary['min_confidence'] = min(confidences)
+            summary['max_confidence'] = max(confidences)
             
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_filepath):
-                os.remove(temp_filepath)
-                
+            # Enrichment runs once per predicted class
+            try:
+                summary['enhanced_analysis'] = enhanced_system.get_complete_enhanced_diagnosis(
+                    predicted_class, summary['mean_confidence'], location, priority='background'
+                )
+            except Exception as e:
+                summary['enhanced_analysis'] = {'error': str(e)}
+        
+        results = []
+        for i, (filename, _) in enumerate(images):
+            if i in predictions:
+                predicted_class, confidence, top_predictions = predictions[i]
+                results.append({
+                    'filename': filename,
+                    'predicted_class': predicted_class,
+                    'confidence': confidence,
+                    'top_predictions': top_predictions,
+                    'needs_review': calibration.needs_review(confidence)
+                })
+            else:
+                results.append({'filename': filename, 'error': 'Error analyzing image'})
+        
+        return jsonify({
+            'location': location,
+            'timestamp': datetime.now().isoformat(),
+            'total_images': len(images),
+            'analyzed_images': len(predictions),
+            'needs_review': sum(1 for result in results if result.get('needs_review')),
+            'results': results,
+            'classes': class_summary
+        })
+        
+    except TimeoutError:
+        return jsonify({'error': 'Inference timed out'}), 503
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -258,18 +831,23 @@ def api_analyze():
 def view_result(result_id):
     """View saved result by ID"""
     try:
-        result_file = os.path.join('results', f'{result_id}.json')
+        result_data = result_store.get(result_id)
         
-        if not os.path.exists(result_file):
+        if result_data is None:
             flash('Result not found')
             return redirect(url_for('index'))
         
-        with open(result_file, 'r') as f:
-            result_data = json.load(f)
+        # Show whatever sections a still-running enrichment job has finished
+        job = None
+        if result_data.get('enrichment_status') == 'pending':
+            job = job_queue.get(result_id)
+            if job is not None:
+                result_data['enhanced_analysis'] = merge_job_sections(result_data.get('enhanced_analysis'), job)
         
         return render_template('results.html', 
                              result=result_data, 
-                             result_id=result_id)
+                             result_id=result_id,
+                             job=job)
         
     except Exception as e:
         flash(f'Error loading result: {str(e)}')
@@ -278,30 +856,155 @@ def view_result(result_id):
 @app.route('/history')
 def history():
     """View analysis history"""
+    filters = {}
     try:
-        results_dir = 'results'
-        if not os.path.exists(results_dir):
-            return render_template('history.html', results=[])
+        filters = parse_history_filters(request.args)
         
-        results = []
-        for filename in os.listdir(results_dir):
-            if filename.endswith('.json'):
-                try:
-                    with open(os.path.join(results_dir, filename), 'r') as f:
-                        data = json.load(f)
-                        data['result_id'] = filename[:-5]  # Remove .json extension
-                        results.append(data)
-                except:
-                    continue
+        # One page of summaries, newest first (keyset pagination)
+        results, next_cursor = result_store.query_summaries(
+            limit=HISTORY_PAGE_SIZE, cursor=request.args.get('cursor'), **filters
+        )
         
-        # Sort by timestamp (newest first)
-        results.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+        # Page links keep the active filters
+        query_args = {key: value for key, value in request.args.items() if key != 'cursor' and value}
         
-        return render_template('history.html', results=results)
+        # Results saved before uploads were content-addressed may have no
+        # thumbnail yet; they show their old upload file instead
+        legacy_uploads = result_store.legacy_upload_names(
+            [result['result_id'] for result in results if not result['thumbnail']]
+        )
+        
+        return render_template('history.html',
+                             results=results,
+                             legacy_uploads=legacy_uploads,
+                             summary=result_store.summarize(**filters),
+                             filters=filters,
+                             next_url=url_for('history', cursor=next_cursor, **query_args) if next_cursor else None,
+                             first_url=url_for('history', **query_args) if request.args.get('cursor') else None,
+                             class_options=CLASS_NAMES,
+                             location_options=result_store.distinct_values('location'))
         
     except Exception as e:
         flash(f'Error loading history: {str(e)}')
-        return render_template('history.html', results=[])
+        return render_template('history.html', results=[], legacy_uploads={}, summary=None, filters=filters,
+                             next_url=None, first_url=None,
+                             class_options=CLASS_NAMES, location_options=[])
+
+@app.route('/api/history')
+def api_history():
+    """
+    Paginated result summaries (no enhanced_analysis), newest first.
+    Query parameters: limit, cursor, class, location, date_from, date_to, min_confidence
+    """
+    try:
+        filters = parse_history_filters(request.args)
+        limit = min(max(1, int(request.args.get('limit', HISTORY_PAGE_SIZE))), MAX_HISTORY_PAGE_SIZE)
+        results, next_cursor = result_store.query_summaries(
+            limit=limit, cursor=request.args.get('cursor'), **filters
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'results': results,
+        'next_cursor': next_cursor,
+        'limit': limit
+    })
+
+@app.route('/media/<path:name>')
+def media_file(name):
+    """Serve an upload derivative with long-lived cache headers"""
+    if not os.path.exists(derivative_generator.path(name)):
+        # Generation may still be running for a just-uploaded image
+        derivative_generator.wait(os.path.basename(name).split('-')[0])
+        if not os.path.exists(derivative_generator.path(name)):
+            abort(404)
+    
+    response = send_from_directory(os.path.abspath(app.config['DERIVATIVES_DIR']), name, max_age=MEDIA_MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/originals/<content_hash>')
+def original_file(content_hash):
+    """Serve a stored original upload (falls back to its display copy once evicted)"""
+    if not is_content_hash(content_hash):
+        abort(404)
+    
+    if not blob_store.exists(content_hash):
+        # Still being written, or removed by the retention policy
+        future = pending_uploads.get(content_hash)
+        if future is not None:
+            try:
+                future.result(timeout=5.0)
+            except Exception:
+                pass
+        if not blob_store.exists(content_hash):
+            display_name = derivative_names(content_hash)['display']['jpeg']
+            if os.path.exists(derivative_generator.path(display_name)):
+                return redirect(url_for('media_file', name=display_name))
+            abort(404)
+    
+    info = blob_store.get_info(content_hash) or {}
+    response = send_file(os.path.abspath(blob_store.path(content_hash)),
+                         mimetype=info.get('content_type') or 'application/octet-stream',
+                         max_age=MEDIA_MAX_AGE, etag=content_hash, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+@app.route('/api/jobs/<job_id>')
+def api_job_status(job_id):
+    """Poll an enrichment job: progress, finished sections and final result"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/jobs/<job_id>/events')
+def api_job_events(job_id):
+    """Server-Sent Events stream of job progress (ends with a 'done' event)"""
+    if job_queue.get(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    def generate():
+        version = -1
+        while True:
+            job = job_queue.wait_for_update(job_id, version, timeout=15.0)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'error': 'Job not found'})}\n\n"
+                return
+            if job['version'] == version and job['status'] not in ('done', 'failed'):
+                yield ": keep-alive\n\n"
+                continue
+            version = job['version']
+            finished = job['status'] in ('done', 'failed')
+            yield f"event: {'done' if finished else 'progress'}\ndata: {json.dumps(job)}\n\n"
+            if finished:
+                return
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/stats')
+def api_stats():
+    """Inference engine / worker pool metrics (batch fill rate, latency)"""
+    if inference_engine is None:
+        return jsonify({'error': 'Model not loaded'}), 503
+    return jsonify({
+        'inference_engine': inference_engine.get_stats(),
+        'prediction_cache': prediction_cache.get_stats(),
+        'wikipedia_cache': enhanced_system.lookup_cache.get_stats() if enhanced_system else None,
+        'external_apis': enhanced_system.http_client.get_stats() if enhanced_system else None,
+        'enrichment_jobs': job_queue.get_stats(),
+        'result_store': result_store.get_stats(),
+        'derivatives': derivative_generator.get_stats(),
+        'recommendations': care_system.store.get_stats() if care_system else None,
+        'weather': enhanced_system.weather_service.get_stats() if enhanced_system and enhanced_system.weather_service else None,
+        'uploads': blob_store.get_stats(),
+        'calibration': calibration.to_dict(),
+        'tta': dict(tta_stats, mode=app.config['TTA_MODE'], views=app.config['TTA_VIEWS'])
+    })
 
 @app.route('/about')
 def about():
@@ -312,8 +1015,16 @@ if __name__ == '__main__':
     print("🌱 PLANT DISEASE DETECTION WEB APPLICATION")
     print("="*50)
     
-    # Load model and systems
-    if load_model_and_systems():
+    if app.config['LAZY_MODEL_LOAD']:
+        # Serve pages immediately; the model warms up in the background
+        load_care_systems()
+        start_background_model_load()
+        ready = True
+    else:
+        # Load model and systems
+        ready = load_model_and_systems()
+    
+    if ready:
         print("🚀 Starting Flask application...")
         print("📱 Access the web interface at: http://localhost:5000")
         print("🔌 API endpoint available at: http://localhost:5000/api/analyze")
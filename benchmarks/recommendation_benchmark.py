@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Recommendation Lookup Benchmark
+===============================
+Times PlantCareRecommendationSystem.get_recommendations and
+generate_care_schedule per call, answered from the frozen lookup tables,
+against the previous implementation, which copied the class dict and rebuilt
+the care-tip, generic and seasonal dict literals on every call.
+
+Usage:
+    python benchmarks/recommendation_benchmark.py [--calls 200000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.class_names import CLASS_NAMES
+from src.plant_care_system import PlantCareRecommendationSystem
+
+
+def legacy_general_care_tips(predicted_class):
+    plant_type = predicted_class.split('___')[0] if '___' in predicted_class else predicted_class
+    care_tips = {
+        "Apple": {
+            "watering": "Deep, infrequent watering - avoid wetting leaves",
+            "pruning": "Prune in late winter for air circulation",
+            "harvest": "Harvest when fruit comes off easily with upward twist"
+        },
+        "Tomato": {
+            "watering": "Consistent moisture - 1-2 inches per week",
+            "pruning": "Remove suckers, lower leaves touching ground",
+            "harvest": "Pick when fully colored but still firm"
+        },
+        "Potato": {
+            "watering": "Consistent moisture, especially during tuber formation",
+            "hilling": "Hill soil around plants as they grow",
+            "harvest": "Harvest after plant dies back naturally"
+        }
+    }
+    return care_tips.get(plant_type, {
+        "watering": "Maintain consistent moisture levels",
+        "care": "Follow best practices for this plant type",
+        "monitoring": "Regular inspection for pests and diseases"
+    })
+
+
+def legacy_generic_recommendations(predicted_class):
+    plant_type = predicted_class.split('___')[0] if '___' in predicted_class else predicted_class
+    if 'healthy' in predicted_class.lower():
+        return {
+            "disease_info": f"Healthy {plant_type} - maintain current care",
+            "immediate_treatment": ["Continue current care routine", "Monitor regularly"],
+            "fertilizer_recommendations": ["Balanced NPK fertilizer", "Seasonal adjustments as needed"],
+            "organic_manure": ["Well-composted organic matter", "Seasonal compost applications"],
+            "soil_amendments": ["Maintain proper pH", "Regular soil testing"],
+            "prevention": ["Continue good practices", "Regular monitoring"]
+        }
+    return {
+        "disease_info": f"Disease detected in {plant_type} - general treatment needed",
+        "immediate_treatment": ["Remove infected plant parts", "Improve air circulation", "Apply appropriate fungicide/bactericide"],
+        "fertilizer_recommendations": ["Reduce nitrogen", "Increase potassium for disease resistance", "Ensure adequate calcium"],
+        "organic_manure": ["Well-aged compost only", "Avoid fresh manure during disease"],
+        "soil_amendments": ["Improve drainage", "Maintain optimal pH", "Add organic matter"],
+        "prevention": ["Use resistant varieties", "Improve growing conditions", "Regular monitoring"]
+    }
+
+
+def legacy_get_recommendations(database, predicted_class, confidence_score=None):
+    """The pre-lookup-table get_recommendations"""
+    if predicted_class not in database:
+        return legacy_generic_recommendations(predicted_class)
+    recommendations = database[predicted_class].copy()
+    if confidence_score:
+        recommendations['model_confidence'] = f"{confidence_score:.2%}"
+        if confidence_score < 0.7:
+            recommendations['confidence_warning'] = "Low confidence - consider manual verification"
+    recommendations['general_care'] = legacy_general_care_tips(predicted_class)
+    return recommendations
+
+
+def legacy_care_schedule(database, predicted_class, season):
+    """The pre-lookup-table generate_care_schedule"""
+    recommendations = legacy_get_recommendations(database, predicted_class)
+    seasonal_tasks = {
+        "spring": ["Apply base fertilizer", "Begin regular watering", "Start disease monitoring"],
+        "summer": ["Increase watering frequency", "Apply potassium fertilizer", "Harvest as ready"],
+        "fall": ["Reduce watering", "Apply phosphorus fertilizer", "Prepare for dormancy"],
+        "winter": ["Minimal watering", "Plan for next season", "Equipment maintenance"]
+    }
+    return {
+        "immediate_actions": recommendations.get('immediate_treatment', []),
+        "weekly_tasks": ["Monitor plant health", "Check soil moisture", "Apply organic fertilizer if scheduled"],
+        "monthly_tasks": ["Soil pH testing", "Apply compost or manure as recommended", "Disease prevention treatments"],
+        "seasonal_tasks": seasonal_tasks.get(season, seasonal_tasks["spring"])
+    }
+
+
+def per_call_us(fn, calls):
+    start = time.perf_counter()
+    for args in calls:
+        fn(*args)
+    return (time.perf_counter() - start) / len(calls) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark recommendation lookups')
+    parser.add_argument('--calls', type=int, default=200000)
+    args = parser.parse_args()
+
+    print("🌱 RECOMMENDATION LOOKUP BENCHMARK")
+    print("=" * 60)
+
+    start = time.perf_counter()
+    system = PlantCareRecommendationSystem()
+    print(f"Construction (database + lookup tables): {(time.perf_counter() - start) * 1000.0:.2f} ms")
+
+    rng = random.Random(0)
+    seasons = ('spring', 'summer', 'fall', 'winter')
+    recommendation_calls = [(rng.choice(CLASS_NAMES), rng.uniform(0.3, 1.0)) for _ in range(args.calls)]
+    schedule_calls = [(rng.choice(CLASS_NAMES), rng.choice(seasons)) for _ in range(args.calls)]
+    database = system.recommendations
+
+    print(f"\n{'per call':<36} {'legacy us':>10} {'table us':>10} {'speedup':>8}")
+    rows = [
+        ("get_recommendations",
+         lambda c, s: legacy_get_recommendations(database, c, s), system.get_recommendations, recommendation_calls),
+        ("generate_care_schedule",
+         lambda c, s: legacy_care_schedule(database, c, s), system.generate_care_schedule, schedule_calls),
+    ]
+    for name, legacy_fn, table_fn, calls in rows:
+        legacy_us = per_call_us(legacy_fn, calls)
+        table_us = per_call_us(table_fn, calls)
+        print(f"{name:<36} {legacy_us:>10.3f} {table_us:>10.3f} {legacy_us / table_us:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+Result Store Benchmark
+======================
+Fills a SQLite result store with synthetic analyses and times the queries
+behind the results and history pages. For comparison, it also times the old
+approach (listdir + json.load of every results/<id>.json file, then sort) on
+a smaller sample and extrapolates linearly.
+
+Usage:
+    python benchmarks/result_store_benchmark.py [--results 100000] [--json-sample 2000]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.class_names import CLASS_NAMES
+from src.result_store import ResultStore
+
+LOCATIONS = ['New York', 'London', 'Paris', 'Tokyo', 'Mumbai', 'Delhi', 'Sydney', 'Toronto', 'Unknown']
+
+
+def synthetic_results(count, seed=0):
+    """Yield (result_id, result_data) with a realistically sized enhanced analysis"""
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    for i in range(count):
+        predicted_class = rng.choice(CLASS_NAMES)
+        yield str(uuid.UUID(int=rng.getrandbits(128))), {
+            'filename': f"{i}_leaf.jpg",
+            'original_filename': 'leaf.jpg',
+            'predicted_class': predicted_class,
+            'confidence': rng.uniform(0.3, 1.0),
+            'location': rng.choice(LOCATIONS),
+            'timestamp': (start + timedelta(minutes=i)).strftime('%Y-%m-%d %H:%M:%S'),
+            'enrichment_status': 'complete',
+            'enhanced_analysis': {
+                'fertilizer_recommendations': [f"Fertilizer option {n} for {predicted_class}" for n in range(5)],
+                'organic_manure': [f"Manure option {n}" for n in range(5)],
+                'immediate_treatment': [f"Treatment step {n}" for n in range(4)],
+                'weather_analysis': {'status': 'success', 'temperature': 22, 'humidity': 78, 'risk_level': 'MEDIUM'},
+                'integrated_advice': [f"Advice line {n}" for n in range(6)]
+            }
+        }
+
+
+def timed(fn, repeat):
+    """Mean wall time of fn() in ms"""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000.0
+
+
+def legacy_history(results_dir):
+    """The pre-store /history implementation"""
+    results = []
+    for filename in os.listdir(results_dir):
+        if filename.endswith('.json'):
+            with open(os.path.join(results_dir, filename), 'r') as f:
+                data = json.load(f)
+                data['result_id'] = filename[:-5]
+                results.append(data)
+    results.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the SQLite result store')
+    parser.add_argument('--results', type=int, default=100000, help='Rows to insert into the store')
+    parser.add_argument('--json-sample', type=int, default=2000, help='JSON files for the legacy comparison')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='result_store_bench_')
+    try:
+        print("🗄️ RESULT STORE BENCHMARK")
+        print("=" * 60)
+
+        store = ResultStore(os.path.join(workdir, 'results.sqlite3'))
+        items = list(synthetic_results(args.results))
+        start = time.perf_counter()
+        for offset in range(0, len(items), 1000):
+            store.save_many(items[offset:offset + 1000])
+        insert_s = time.perf_counter() - start
+        print(f"Inserted {store.count():,} results in {insert_s:.1f}s ({args.results / insert_s:,.0f} rows/s)")
+
+        deep_cursor = None
+        for _ in range(499):
+            deep_cursor = store.query_summaries(limit=12, cursor=deep_cursor)[1]
+
+        probe_ids = [result_id for result_id, _ in random.Random(1).sample(items, 100)]
+        single_save = items[0]
+
+        print(f"\n{'operation':<44} {'ms':>10}")
+        rows = [
+            ("save one result (upsert)", lambda: store.save(*single_save)),
+            ("get result by id", lambda: [store.get(result_id) for result_id in probe_ids], 100),
+            ("newest 12 results", lambda: store.query_summaries(limit=12)),
+            ("newest 12 for one class", lambda: store.query_summaries(limit=12, predicted_class=CLASS_NAMES[5])),
+            ("newest 12 for one location", lambda: store.query_summaries(limit=12, location='Paris')),
+            ("page 500 (cursor) of 12", lambda: store.query_summaries(limit=12, cursor=deep_cursor)),
+            ("history totals (counters)", lambda: store.summarize()),
+            ("history totals (full scan)", lambda: store._summarize()),
+            ("location filter options", lambda: store.distinct_values('location')),
+        ]
+        for row in rows:
+            name, fn = row[0], row[1]
+            per_call = row[2] if len(row) > 2 else 1
+            print(f"{name:<44} {timed(fn, args.repeat) / per_call:>10.3f}")
+
+        # Legacy: one JSON file per result, everything loaded per page view
+        json_dir = os.path.join(workdir, 'json')
+        os.makedirs(json_dir)
+        for result_id, data in items[:args.json_sample]:
+            with open(os.path.join(json_dir, f'{result_id}.json'), 'w') as f:
+                json.dump(data, f, indent=2)
+        legacy_ms = timed(lambda: legacy_history(json_dir), max(1, args.repeat // 4))
+        print(f"\nLegacy /history scan of {args.json_sample:,} JSON files: {legacy_ms:,.1f} ms")
+        print(f"  extrapolated to {args.results:,} results: ~{legacy_ms * args.results / args.json_sample / 1000.0:,.1f} s")
+
+        start = time.perf_counter()
+        store.rebuild_index()
+        print(f"Rebuilt summary index for {store.count():,} results in {time.perf_counter() - start:.1f}s")
+
+        migrate_store = ResultStore(os.path.join(workdir, 'migrated.sqlite3'))
+        start = time.perf_counter()
+        imported, _ = migrate_store.import_json_dir(json_dir)
+        print(f"Migrated {imported:,} JSON files in {(time.perf_counter() - start) * 1000.0:,.0f} ms")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
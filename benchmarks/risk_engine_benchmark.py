@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Weather Risk Engine Benchmark
+=============================
+Scores a forecast grid (locations x time steps, default 5 days of 3-hourly
+steps) against all 38 classes in one vectorised RiskEngine.score call, and
+compares it with scoring the same observations one class at a time in plain
+Python. Also checks that both give the same scores.
+
+Usage:
+    python benchmarks/risk_engine_benchmark.py [--locations 10000] [--steps 40]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.risk_engine import RiskEngine, estimate_leaf_wetness
+
+
+def scalar_scores(engine, temperature, humidity, wetness, rainfall):
+    """Reference implementation: one observation, one class at a time"""
+    raw = []
+    for i in range(len(engine.class_names)):
+        t_min, t_opt, t_max = float(engine.t_min[i]), float(engine.t_opt[i]), float(engine.t_max[i])
+        t = max(0.0, min(1.0, (temperature - t_min) / (t_opt - t_min), (t_max - temperature) / (t_max - t_opt)))
+        threshold = float(engine.rh_threshold[i])
+        if engine.rh_direction[i] > 0:
+            h = (humidity - threshold) / max(100.0 - threshold, 1.0)
+        else:
+            h = (threshold - humidity) / max(threshold, 1.0)
+        h = max(0.0, min(1.0, h))
+        w = 1.0 - math.exp(-wetness / float(engine.wetness_hours[i])) if engine.wetness_hours[i] > 0 else 0.0
+        r = 1.0 - math.exp(-rainfall / float(engine.rain_scale[i])) if engine.rain_scale[i] > 0 else 0.0
+        moisture = float(engine.w_humidity[i]) * h + float(engine.w_wetness[i]) * w + float(engine.w_rain[i]) * r
+        raw.append(float(engine.susceptibility[i]) * t * moisture)
+    return [max(raw[j] for j in engine.healthy_sources[i]) if i in engine.healthy_sources else raw[i]
+            for i in range(len(raw))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the vectorised weather risk engine')
+    parser.add_argument('--locations', type=int, default=10000)
+    parser.add_argument('--steps', type=int, default=40, help='Time steps per location (40 = 5 days, 3-hourly)')
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--scalar-observations', type=int, default=2000)
+    args = parser.parse_args()
+
+    print("🌦️ WEATHER RISK ENGINE BENCHMARK")
+    print("=" * 60)
+
+    engine = RiskEngine()
+    rng = np.random.default_rng(0)
+    shape = (args.locations, args.steps)
+    temperature = rng.uniform(-5, 40, shape).astype(np.float32)
+    humidity = rng.uniform(20, 100, shape).astype(np.float32)
+    rainfall = np.where(rng.random(shape) < 0.3, rng.exponential(2.0, shape), 0.0).astype(np.float32)
+    wetness = estimate_leaf_wetness(humidity, rainfall)
+
+    engine.score(temperature[:1], humidity[:1], wetness[:1], rainfall[:1])  # warm up
+    timings = []
+    for _ in range(args.repeats):
+        start = time.perf_counter()
+        scores = engine.score(temperature, humidity, wetness, rainfall)
+        timings.append(time.perf_counter() - start)
+    vector_s = min(timings)
+    observations = args.locations * args.steps
+    print(f"Grid: {args.locations} locations x {args.steps} steps x {len(engine.class_names)} classes "
+          f"-> scores {scores.shape}")
+    print(f"Vectorised: {vector_s * 1000.0:.1f} ms per grid, "
+          f"{args.locations / vector_s:,.0f} locations/s, {observations / vector_s:,.0f} observations/s")
+
+    n = min(args.scalar_observations, observations)
+    flat = [a.reshape(-1)[:n].tolist() for a in (temperature, humidity, wetness, rainfall)]
+    start = time.perf_counter()
+    reference = [scalar_scores(engine, *values) for values in zip(*flat)]
+    scalar_s = (time.perf_counter() - start) / n
+    print(f"Per-class Python loop: {scalar_s * 1e6:.1f} us per observation, "
+          f"{1.0 / (scalar_s * args.steps):,.0f} locations/s")
+    print(f"Speedup: {scalar_s * observations / vector_s:.0f}x")
+
+    max_diff = float(np.abs(scores.reshape(-1, scores.shape[-1])[:n] - np.array(reference)).max())
+    status = "✅" if max_diff < 1e-4 else "❌"
+    print(f"{status} Max difference from reference: {max_diff:.2e}")
+
+
+if __name__ == '__main__':
+    main()
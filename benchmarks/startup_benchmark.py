@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Startup Time Benchmark
+======================
+Measures cold-start costs in fresh interpreter processes:
+
+  * importing app.py (time until Flask can serve /about and /history)
+  * importing torch/torchvision alone (the floor for any model load)
+  * loading the model the old way (random init + full torch.load + copy)
+  * loading via the mmap-backed checkpoint on the meta device
+  * loading the pre-serialized TorchScript artifact (if exported)
+
+Usage (from the project root, with model/ present):
+    python benchmarks/startup_benchmark.py [--runs 3]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+SCENARIOS = {
+    "import app (pages reachable)": """
+import app
+client = app.app.test_client()
+assert client.get('/about').status_code == 200
+""",
+    "import torch + torchvision only": """
+import torch, torchvision.models
+""",
+    "model: legacy eager load": """
+import torch, torchvision.models as models
+checkpoint = torch.load('model/plant_disease_classifier.pth', map_location='cpu', weights_only=False)
+model = models.resnet50(weights=None)
+model.fc = torch.nn.Linear(model.fc.in_features, len(checkpoint['class_names']))
+model.load_state_dict(checkpoint['model_state_dict'])
+model.eval()
+""",
+    "model: mmap + meta device": """
+from src.model_backends import load_backend
+load_backend('pytorch')
+""",
+    "model: torchscript artifact": """
+from src.model_backends import load_backend
+load_backend('torchscript')
+""",
+}
+
+TIMER = """
+import time
+_start = time.perf_counter()
+{body}
+print(time.perf_counter() - _start)
+"""
+
+
+def run_scenario(body):
+    """Run a snippet in a fresh interpreter and return its wall time in seconds"""
+    result = subprocess.run(
+        [sys.executable, '-c', TIMER.format(body=body)],
+        cwd=ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "failed")
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark application cold start')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh processes per scenario')
+    args = parser.parse_args()
+
+    print("⏱️ STARTUP BENCHMARK")
+    print("=" * 60)
+    print(f"{'scenario':<34} {'median s':>9} {'min s':>9}")
+
+    for name, body in SCENARIOS.items():
+        try:
+            times = [run_scenario(body) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"{name:<34} ⚠️ skipped: {e}")
+            continue
+        print(f"{name:<34} {statistics.median(times):>9.3f} {min(times):>9.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test-Time Augmentation Benchmark
+================================
+Accuracy and latency per image of three modes over a labeled folder (one
+sub-folder per class):
+
+    off     - one plain forward pass
+    always  - every image classified from K views in one batch
+    auto    - K views only when the plain confidence is below the threshold
+
+Uses the configured backend and its calibration file, if fitted.
+
+Usage:
+    python benchmarks/tta_benchmark.py --data-dir path/to/labeled_images [--views 4] [--threshold 0.7]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import torch
+
+from src.calibration import Calibration, calibration_path
+from src.image_preprocessing import decode_image, image_to_tensor
+from src.inference_engine import BatchingInferenceEngine
+from src.model_backends import MODEL_DIR, load_backend, load_labeled_folder, model_version
+from src.tta import VIEWS, predict_tta
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark test-time augmentation')
+    parser.add_argument('--data-dir', required=True, help='Folder with one sub-folder per class')
+    parser.add_argument('--backend', default='pytorch')
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--views', type=int, default=4, help=f'Views per image (max {len(VIEWS)})')
+    parser.add_argument('--threshold', type=float, default=None,
+                        help='Confidence below which auto mode runs TTA (default: review threshold)')
+    parser.add_argument('--limit-per-class', type=int, default=None)
+    args = parser.parse_args()
+
+    print("🔁 TEST-TIME AUGMENTATION BENCHMARK")
+    print("=" * 60)
+
+    model, class_names = load_backend(args.backend, args.model_dir)
+    calibration = Calibration.load(calibration_path(args.backend, args.model_dir),
+                                   model_version(args.backend, args.model_dir))
+    threshold = calibration.review_threshold if args.threshold is None else args.threshold
+    engine = BatchingInferenceEngine(model, class_names, temperature=calibration.temperature)
+    views = VIEWS[:args.views]
+
+    samples = load_labeled_folder(args.data_dir, class_names, args.limit_per_class)
+    if not samples:
+        raise SystemExit(f"❌ No labeled images found in {args.data_dir}")
+    print(f"Images: {len(samples)} | views: {', '.join(views)} | auto threshold: {threshold:.2f} "
+          f"| temperature: {calibration.temperature:.3f}")
+
+    engine.predict_proba(torch.zeros(len(views), 3, 224, 224))  # warm up
+    results = {mode: {"correct": 0, "seconds": 0.0} for mode in ('off', 'always', 'auto')}
+    triggered = 0
+    images = 0
+
+    for path, label in samples:
+        try:
+            image = decode_image(path)
+        except Exception as e:
+            print(f"⚠️ Skipping {path}: {str(e)}")
+            continue
+        images += 1
+
+        started = time.perf_counter()
+        base = engine.predict_proba(image_to_tensor(image).unsqueeze(0))[0]
+        base_seconds = time.perf_counter() - started
+        results['off']["seconds"] += base_seconds
+        results['off']["correct"] += int(base.argmax().item() == label)
+
+        started = time.perf_counter()
+        always = predict_tta(engine, image, views)
+        results['always']["seconds"] += time.perf_counter() - started
+        results['always']["correct"] += int(always.argmax().item() == label)
+
+        # auto = the plain pass, plus the remaining views only when uncertain
+        auto, auto_seconds = base, base_seconds
+        if base.max().item() < threshold:
+            triggered += 1
+            started = time.perf_counter()
+            auto = predict_tta(engine, image, views, base_probabilities=base)
+            auto_seconds += time.perf_counter() - started
+        results['auto']["seconds"] += auto_seconds
+        results['auto']["correct"] += int(auto.argmax().item() == label)
+
+    if not images:
+        raise SystemExit("❌ None of the images could be decoded")
+
+    print(f"\n{'mode':<8} {'accuracy':>9} {'ms/image':>9} {'vs off':>7}")
+    base_ms = results['off']["seconds"] / images * 1000.0
+    for mode, result in results.items():
+        ms = result["seconds"] / images * 1000.0
+        print(f"{mode:<8} {result['correct'] / images:>8.2%} {ms:>9.2f} {ms / base_ms:>6.2f}x")
+    print(f"\nAuto mode ran TTA on {triggered}/{images} images ({triggered / images:.1%})")
+
+
+if __name__ == '__main__':
+    main()
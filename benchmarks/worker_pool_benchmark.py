@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Inference Worker Pool Load Test
+===============================
+Fires concurrent single-image requests at the in-process batching engine
+and at process pools of increasing size, and reports throughput.
+
+Usage (from the project root):
+    python benchmarks/worker_pool_benchmark.py [--workers 1 2 4] [--requests 64] [--clients 16]
+    python benchmarks/worker_pool_benchmark.py --random-model   # no checkpoint needed
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import torch
+import torchvision.models as models
+
+from src.inference_engine import BatchingInferenceEngine
+from src.worker_pool import InferenceWorkerPool
+
+
+def build_model(random_model):
+    """Load the real checkpoint, or a randomly initialised ResNet-50 of the same shape"""
+    if not random_model:
+        from src.model_backends import load_backend
+        return load_backend('pytorch')
+
+    model = models.resnet50(weights=None)
+    model.fc = torch.nn.Linear(model.fc.in_features, 38)
+    return model.eval(), [f"class_{i}" for i in range(38)]
+
+
+def run_load(engine, num_requests, num_clients):
+    """Send num_requests single images from num_clients threads; return images/s"""
+    image = torch.randn(1, 3, 224, 224)
+    engine.predict(image)  # warm-up
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=num_clients) as clients:
+        list(clients.map(lambda _: engine.predict(image), range(num_requests)))
+    return num_requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the inference worker pool')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--random-model', action='store_true', help='Use random weights instead of model/')
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    model, class_names = build_model(args.random_model)
+
+    print("⚙️ INFERENCE WORKER POOL LOAD TEST")
+    print("=" * 60)
+    print(f"CPU cores: {cores}, requests: {args.requests}, concurrent clients: {args.clients}")
+    print(f"{'mode':<24} {'threads/proc':>12} {'images/s':>10} {'speedup':>8}")
+
+    engine = BatchingInferenceEngine(model, class_names, max_batch_size=args.max_batch_size).start()
+    baseline = run_load(engine, args.requests, args.clients)
+    engine.stop()
+    print(f"{'in-process engine':<24} {torch.get_num_threads():>12} {baseline:>10.1f} {1.0:>7.2f}x")
+
+    for workers in args.workers:
+        pool = InferenceWorkerPool(model, class_names, num_workers=workers,
+                                   max_batch_size=args.max_batch_size).start()
+        try:
+            throughput = run_load(pool, args.requests, args.clients)
+        finally:
+            pool.stop()
+        print(f"{f'{workers} worker process(es)':<24} {pool.threads_per_worker:>12} "
+              f"{throughput:>10.1f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
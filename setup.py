@@ -105,6 +105,11 @@ def generate_project_info():
             "Organic alternatives",
             "Confidence-based advice"
         ],
+        "commands": {
+            "web app": "python app.py",
+            "bulk classification": "python -m src.bulk_classify <image_dir> --output results.csv",
+            "calibration": "python -m src.calibration fit --data-dir <labeled_dir>"
+        },
         "structure": {
             "src/": "Core system code",
             "tests/": "Test scripts and analysis", 
@@ -151,7 +156,8 @@ def main():
     print("\n📋 Quick Start:")
     print("  1. Test the system: cd tests && python fixed_analysis.py")
     print("  2. Use in code: from src.plant_care_system import PlantCareRecommendationSystem")
-    print("  3. Read docs: check docs/ folder for detailed information")
+    print("  3. Classify a folder: python -m src.bulk_classify path/to/images --output results.csv")
+    print("  4. Read docs: check docs/ folder for detailed information")
     print("\n🚀 Ready for deployment!")
 
 if __name__ == "__main__":
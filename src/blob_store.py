@@ -0,0 +1,517 @@
+"""
+Content-Addressed Upload Storage
+================================
+Keeps exactly one canonical copy of every uploaded image, named by the
+SHA-256 of its bytes and sharded into `<root>/<hash[:2]>/<hash[2:4]>/<hash>`.
+Re-uploading a photo adds a reference to the existing blob instead of
+writing another file, and legacy upload files are hard-linked into the
+store (no copy) when they are migrated.
+
+A small SQLite index next to the blobs tracks size, content type, reference
+count and when each blob was last referenced. put() adds references; the
+counts are recomputed from the result store by `gc`, which also deletes
+blobs no result references any more (deleting a result does not release its
+blob until then). Blobs younger than a grace period are never collected, so
+an upload whose result row is still being written is not lost.
+
+The retention policy evicts, least recently referenced first:
+
+- max_age_days: blobs not referenced for this many days
+- max_total_bytes: blobs until the store fits the budget
+
+Uploads enforce the size budget as soon as it is exceeded and the age limit
+at most every retention_interval seconds; `gc` applies both. Results whose
+original was evicted keep their thumbnail and display copies.
+
+Reconcile the store with the result store (migrate legacy uploads, reset
+reference counts, delete orphaned blobs and derivatives, apply retention):
+    python -m src.blob_store gc [--dry-run] [--max-age-days 90] [--max-total-mb 2048] [--grace-seconds 3600]
+"""
+
+import argparse
+import hashlib
+import mimetypes
+import os
+import shutil
+import sqlite3
+import threading
+import time
+
+try:
+    from .image_derivatives import DerivativeGenerator
+except ImportError:
+    from image_derivatives import DerivativeGenerator
+
+DEFAULT_BLOB_DIR = 'blobs'
+LEGACY_UPLOAD_DIRS = (os.path.join('static', 'uploads'), 'uploads')
+INDEX_NAME = 'blobs.sqlite3'
+HASH_LENGTH = 64
+DEFAULT_RETENTION_INTERVAL = 300  # seconds between age-based retention passes on upload
+DEFAULT_GC_GRACE = 3600           # seconds a new blob is safe from gc without a referencing result
+RETENTION_BATCH = 500             # blobs evicted per retention query
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blobs (
+    content_hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    content_type TEXT,
+    refcount INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_referenced_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_blobs_last_referenced ON blobs (last_referenced_at);
+"""
+
+
+def is_content_hash(value):
+    """True for a lowercase hex SHA-256 digest (safe to use in a path)"""
+    return isinstance(value, str) and len(value) == HASH_LENGTH and all(c in '0123456789abcdef' for c in value)
+
+
+def file_hash(path, chunk_size=1024 * 1024):
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BlobStore:
+    """
+    Deduplicated, reference-counted blob storage with retention
+    """
+
+    def __init__(self, root=DEFAULT_BLOB_DIR, max_age_days=0, max_total_bytes=0,
+                 retention_interval=DEFAULT_RETENTION_INTERVAL):
+        self.root = root
+        self.max_age_days = max_age_days or 0
+        self.max_total_bytes = max_total_bytes or 0
+        self.retention_interval = retention_interval
+        self._last_retention = 0.0
+        os.makedirs(root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(root, INDEX_NAME), check_same_thread=False, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._db.commit()
+
+        self._total_bytes = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        self._stats = {
+            "writes": 0,
+            "deduplicated": 0,
+            "linked": 0,
+            "deleted": 0,
+            "evicted": 0,
+            "errors": 0
+        }
+
+    def path(self, content_hash):
+        return os.path.join(self.root, content_hash[:2], content_hash[2:4], content_hash)
+
+    def exists(self, content_hash):
+        return is_content_hash(content_hash) and os.path.exists(self.path(content_hash))
+
+    def get_info(self, content_hash):
+        """Return the index row of a blob as a dict, or None"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT content_hash, size, content_type, refcount, created_at, last_referenced_at "
+                "FROM blobs WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('content_hash', 'size', 'content_type', 'refcount', 'created_at', 'last_referenced_at'), row))
+
+    def put(self, data, content_hash=None, content_type=None, references=1):
+        """
+        Store bytes (once) and add references to them.
+
+        Args:
+            data: Blob contents
+            content_hash: SHA-256 hex digest of data, if already known
+            content_type: MIME type served with the blob
+            references: References to add (one per result using the blob)
+
+        Returns:
+            str: content hash, or None if the blob could not be written
+        """
+        content_hash = content_hash or hashlib.sha256(data).hexdigest()
+        path = self.path(content_hash)
+        try:
+            if os.path.exists(path):
+                self._count("deduplicated")
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(temp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+                self._count("writes")
+            self._reference(content_hash, len(data), content_type, references)
+        except Exception as e:
+            print(f"❌ Error storing blob {content_hash[:12]}: {str(e)}")
+            self._count("errors")
+            return None
+
+        if self._retention_due():
+            self.enforce_retention()
+        return content_hash
+
+    def add_file(self, source_path, content_hash=None, content_type=None, references=1):
+        """
+        Bring an existing file into the store without copying it: the blob
+        is a hard link to source_path (a copy only across filesystems).
+
+        Returns:
+            str: content hash
+        """
+        content_hash = content_hash or file_hash(source_path)
+        path = self.path(content_hash)
+        if os.path.exists(path):
+            self._count("deduplicated")
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                os.link(source_path, path)
+                self._count("linked")
+            except OSError:
+                temp_path = f"{path}.{threading.get_ident()}.tmp"
+                shutil.copyfile(source_path, temp_path)
+                os.replace(temp_path, path)
+                self._count("writes")
+
+        content_type = content_type or mimetypes.guess_type(source_path)[0]
+        self._reference(content_hash, os.path.getsize(path), content_type, references)
+        return content_hash
+
+    def _reference(self, content_hash, size, content_type, references):
+        now = time.time()
+        with self._lock:
+            known = self._db.execute(
+                "SELECT 1 FROM blobs WHERE content_hash = ?", (content_hash,)
+            ).fetchone() is not None
+            self._db.execute(
+                "INSERT INTO blobs (content_hash, size, content_type, refcount, created_at, last_referenced_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(content_hash) DO UPDATE SET "
+                "refcount = refcount + excluded.refcount, last_referenced_at = excluded.last_referenced_at, "
+                "content_type = COALESCE(content_type, excluded.content_type)",
+                (content_hash, size, content_type, references, now, now)
+            )
+            self._db.commit()
+            if not known:
+                self._total_bytes += size
+
+    def delete(self, content_hash):
+        """
+        Remove a blob file and its index row, whatever its reference count
+
+        Returns:
+            bool: True if the blob was indexed or on disk
+        """
+        removed = False
+        try:
+            os.remove(self.path(content_hash))
+            removed = True
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            row = self._db.execute("SELECT size FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+            self._db.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+            self._db.commit()
+            if row is not None:
+                self._total_bytes -= row[0]
+                removed = True
+            if removed:
+                self._stats["deleted"] += 1
+        return removed
+
+    def _retention_due(self):
+        """Cheap check made on every upload: over the size budget, or the age pass is due"""
+        if self.max_total_bytes and self._total_bytes > self.max_total_bytes:
+            return True
+        return bool(self.max_age_days) and time.time() - self._last_retention >= self.retention_interval
+
+    def retention_candidates(self, now=None, limit=RETENTION_BATCH):
+        """
+        Up to `limit` blobs (-1 = all) the retention policy would evict,
+        oldest reference first. Reads only that many rows, in index order.
+
+        Returns:
+            list: (content_hash, size) pairs
+        """
+        now = now or time.time()
+        cutoff = now - self.max_age_days * 86400 if self.max_age_days else 0.0
+        with self._lock:
+            excess = self._total_bytes - self.max_total_bytes if self.max_total_bytes else 0
+            if excess <= 0:
+                if not cutoff:
+                    return []
+                return self._db.execute(
+                    "SELECT content_hash, size FROM blobs WHERE last_referenced_at < ? "
+                    "ORDER BY last_referenced_at LIMIT ?", (cutoff, limit)
+                ).fetchall()
+
+            # Over budget: walk the oldest rows until enough bytes are freed
+            candidates = []
+            for content_hash, size, last_referenced_at in self._db.execute(
+                "SELECT content_hash, size, last_referenced_at FROM blobs ORDER BY last_referenced_at LIMIT ?",
+                (limit,)
+            ):
+                if excess <= 0 and last_referenced_at >= cutoff:
+                    break
+                candidates.append((content_hash, size))
+                excess -= size
+            return candidates
+
+    def enforce_retention(self, now=None):
+        """
+        Evict blobs by age and total size
+
+        Returns:
+            int: blobs evicted
+        """
+        self._last_retention = time.time()
+        if not (self.max_age_days or self.max_total_bytes):
+            return 0
+
+        evicted = 0
+        while True:
+            candidates = self.retention_candidates(now)
+            for content_hash, _ in candidates:
+                self.delete(content_hash)
+            evicted += len(candidates)
+            if len(candidates) < RETENTION_BATCH:
+                break
+        if evicted:
+            self._count("evicted", evicted)
+            print(f"⚠️ Retention policy evicted {evicted} stored uploads")
+        return evicted
+
+    def set_refcounts(self, counts):
+        """Overwrite every blob's reference count (missing hashes get 0)"""
+        with self._lock:
+            self._db.execute("UPDATE blobs SET refcount = 0")
+            self._db.executemany(
+                "UPDATE blobs SET refcount = ? WHERE content_hash = ?",
+                [(count, content_hash) for content_hash, count in counts.items()]
+            )
+            self._db.commit()
+
+    def indexed_hashes(self):
+        """Return {content_hash: refcount} for every indexed blob"""
+        with self._lock:
+            return dict(self._db.execute("SELECT content_hash, refcount FROM blobs").fetchall())
+
+    def created_since(self, since):
+        """Content hashes of blobs first stored at or after a timestamp"""
+        with self._lock:
+            return {row[0] for row in self._db.execute(
+                "SELECT content_hash FROM blobs WHERE created_at >= ?", (since,)
+            )}
+
+    def files_on_disk(self):
+        """Yield the content hash of every blob file under the root"""
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if is_content_hash(filename):
+                    yield filename
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["blobs"] = self._db.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+            stats["total_bytes"] = self._total_bytes
+        stats["max_total_bytes"] = self.max_total_bytes
+        stats["max_age_days"] = self.max_age_days
+        return stats
+
+
+def _find_legacy_file(filename, legacy_dirs):
+    if not filename or os.path.basename(filename) != filename:
+        return None
+    for directory in legacy_dirs:
+        path = os.path.join(directory, filename)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def collect_garbage(blob_store, result_store, derivatives_dir=None, legacy_dirs=LEGACY_UPLOAD_DIRS,
+                    purge_legacy=False, dry_run=False, grace_seconds=DEFAULT_GC_GRACE):
+    """
+    Reconcile stored uploads with the results that reference them.
+
+    1. Results saved before the blob store (an upload file in static/uploads
+       or uploads/) are migrated: the file is hard-linked into the store,
+       derivatives are generated, the result records the hash, and the old
+       copies are removed.
+    2. Reference counts are reset to the number of results using each blob.
+    3. Blobs (and derivatives) no result references are deleted, as are
+       index rows whose file is gone. Blobs and derivatives stored less than
+       grace_seconds ago are skipped: the app writes them before the result
+       row that references them.
+    4. The retention policy (age / total size) is applied.
+
+    Returns:
+        dict: counts of what was (or, with dry_run, would be) done
+    """
+    report = {
+        "legacy_migrated": 0,
+        "legacy_missing": 0,
+        "legacy_files_removed": 0,
+        "legacy_bytes_removed": 0,
+        "orphaned_blobs": 0,
+        "orphaned_bytes": 0,
+        "missing_blobs": 0,
+        "orphaned_derivatives": 0,
+        "in_grace_period": 0,
+        "evicted": 0,
+        "evicted_bytes": 0
+    }
+
+    # 1. Legacy uploads referenced by results
+    generator = DerivativeGenerator(derivatives_dir) if derivatives_dir and not dry_run else None
+    migrated_paths = set()
+    for result_id, result_data in result_store.iter_legacy_uploads():
+        filename = result_data.get('filename')
+        source = _find_legacy_file(filename, legacy_dirs)
+        if source is None:
+            report["legacy_missing"] += 1
+            continue
+        report["legacy_migrated"] += 1
+        migrated_paths.update(os.path.join(d, filename) for d in legacy_dirs)
+        if dry_run:
+            continue
+
+        content_hash = blob_store.add_file(source, references=0)
+        result_data['original'] = content_hash
+        if generator is not None and not result_data.get('derivatives'):
+            with open(source, 'rb') as f:
+                result_data['derivatives'] = generator.submit(content_hash, f.read())
+            result_data['thumbnail'] = result_data['derivatives']['thumb']['jpeg']
+            generator.wait(content_hash, timeout=60.0)
+        result_store.save(result_id, result_data)
+
+    # Old copies: migrated ones are now in the store; unreferenced ones only with purge_legacy
+    for directory in legacy_dirs:
+        if not os.path.isdir(directory):
+            continue
+        for filename in os.listdir(directory):
+            path = os.path.join(directory, filename)
+            if not os.path.isfile(path) or (path not in migrated_paths and not purge_legacy):
+                continue
+            report["legacy_files_removed"] += 1
+            report["legacy_bytes_removed"] += os.path.getsize(path)
+            if not dry_run:
+                os.remove(path)
+
+    # 2. Reference counts from the result store (blobs are listed first, so
+    # a blob whose result is saved meanwhile is either referenced or recent)
+    grace_cutoff = time.time() - grace_seconds
+    indexed = blob_store.indexed_hashes()
+    on_disk = set(blob_store.files_on_disk())
+    references = result_store.referenced_originals()
+    recent = blob_store.created_since(grace_cutoff)
+
+    # 3. Orphans in both directions
+    for content_hash in sorted(on_disk):
+        if content_hash in references:
+            continue
+        path = blob_store.path(content_hash)
+        if content_hash in recent or (content_hash not in indexed and os.path.getmtime(path) >= grace_cutoff):
+            report["in_grace_period"] += 1
+            continue
+        report["orphaned_blobs"] += 1
+        report["orphaned_bytes"] += os.path.getsize(path)
+        if not dry_run:
+            blob_store.delete(content_hash)
+    for content_hash in indexed:
+        if content_hash not in on_disk:
+            report["missing_blobs"] += 1
+            if not dry_run:
+                blob_store.delete(content_hash)
+
+    if not dry_run:
+        # Referenced files without an index row are re-indexed
+        for content_hash in references:
+            if content_hash in on_disk and content_hash not in indexed:
+                blob_store.add_file(blob_store.path(content_hash), content_hash=content_hash, references=0)
+        blob_store.set_refcounts(references)
+
+    if derivatives_dir and os.path.isdir(derivatives_dir):
+        referenced_derivatives = result_store.referenced_derivatives()
+        for dirpath, _, filenames in os.walk(derivatives_dir):
+            for filename in filenames:
+                content_hash = filename.split('-')[0]
+                if not is_content_hash(content_hash) or content_hash in referenced_derivatives:
+                    continue
+                # Derivatives are also written before the result that uses them
+                path = os.path.join(dirpath, filename)
+                if os.path.getmtime(path) >= grace_cutoff:
+                    report["in_grace_period"] += 1
+                    continue
+                report["orphaned_derivatives"] += 1
+                if not dry_run:
+                    os.remove(path)
+
+    # 4. Retention
+    candidates = blob_store.retention_candidates(limit=-1) if (blob_store.max_age_days or blob_store.max_total_bytes) else []
+    report["evicted"] = len(candidates)
+    report["evicted_bytes"] = sum(size for _, size in candidates)
+    if not dry_run and candidates:
+        blob_store.enforce_retention()
+
+    return report
+
+
+def main():
+    from src.result_store import DEFAULT_DB_PATH, ResultStore
+
+    parser = argparse.ArgumentParser(description='Upload blob store maintenance')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    gc = subparsers.add_parser('gc', help='Reconcile stored uploads with the result store')
+    gc.add_argument('--blobs', default=os.environ.get('BLOB_DIR', DEFAULT_BLOB_DIR))
+    gc.add_argument('--db', default=os.environ.get('RESULT_DB_PATH', DEFAULT_DB_PATH))
+    gc.add_argument('--derivatives', default=os.environ.get('DERIVATIVES_DIR', 'derivatives'))
+    gc.add_argument('--max-age-days', type=float, default=float(os.environ.get('BLOB_MAX_AGE_DAYS', 0)),
+                    help='Evict uploads not referenced for this many days (0 = keep)')
+    gc.add_argument('--max-total-mb', type=float, default=float(os.environ.get('BLOB_MAX_TOTAL_MB', 0)),
+                    help='Evict least recently referenced uploads above this size (0 = unlimited)')
+    gc.add_argument('--purge-legacy', action='store_true',
+                    help='Also delete old upload files that no result references')
+    gc.add_argument('--grace-seconds', type=float, default=DEFAULT_GC_GRACE,
+                    help='Never collect blobs stored more recently than this')
+    gc.add_argument('--dry-run', action='store_true', help='Report what would be deleted')
+    args = parser.parse_args()
+
+    if args.command == 'gc':
+        blob_store = BlobStore(args.blobs, max_age_days=args.max_age_days,
+                               max_total_bytes=int(args.max_total_mb * 1024 * 1024))
+        report = collect_garbage(blob_store, ResultStore(args.db), derivatives_dir=args.derivatives,
+                                 purge_legacy=args.purge_legacy, dry_run=args.dry_run,
+                                 grace_seconds=args.grace_seconds)
+        prefix = "Would remove" if args.dry_run else "Removed"
+        print(f"✅ Migrated {report['legacy_migrated']} legacy uploads "
+              f"({report['legacy_missing']} referenced files were already missing)")
+        print(f"🧹 {prefix} {report['legacy_files_removed']} legacy upload files "
+              f"({report['legacy_bytes_removed'] / 1024 / 1024:.1f} MB)")
+        print(f"🧹 {prefix} {report['orphaned_blobs']} unreferenced blobs "
+              f"({report['orphaned_bytes'] / 1024 / 1024:.1f} MB) and {report['orphaned_derivatives']} derivatives")
+        print(f"🧹 {prefix} {report['missing_blobs']} index entries without a file")
+        print(f"⏳ Kept {report['in_grace_period']} unreferenced blobs stored in the last "
+              f"{args.grace_seconds:.0f}s")
+        print(f"🧹 Retention: {prefix.lower()} {report['evicted']} blobs "
+              f"({report['evicted_bytes'] / 1024 / 1024:.1f} MB)")
+        stats = blob_store.get_stats()
+        print(f"📦 {stats['blobs']} blobs, {stats['total_bytes'] / 1024 / 1024:.1f} MB in {args.blobs}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,322 @@
+"""
+Bulk Image Classification
+=========================
+Classifies every image under a directory tree without going through the web
+app. A DataLoader decodes images in several worker processes while the main
+process runs batched inference. The model is loaded the same way as the app
+(MODEL_BACKEND artifact plus its calibration file), so probabilities and
+`needs_review` flags match what /upload would report.
+
+Results are appended to the output file as they are produced:
+    .csv / .jsonl  - one row per image
+    .parquet       - a directory of part files, one per checkpoint
+                     (read with pandas.read_parquet(path); needs pyarrow)
+
+Every --checkpoint-every batches the output is flushed and a checkpoint
+(<output>.checkpoint.json) is written. An interrupted run resumes from the
+last checkpoint: rows written after it are discarded and images already in
+the output are skipped. --restart starts over.
+
+Usage:
+    python -m src.bulk_classify path/to/images --output results.csv [--workers 4] [--batch-size 32]
+"""
+
+import argparse
+import csv
+import json
+import os
+import shutil
+import time
+
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+from .calibration import Calibration, DEFAULT_TOP_K, calibration_path
+from .image_preprocessing import INPUT_SIZE, preprocess_image
+from .inference_engine import BatchingInferenceEngine
+from .model_backends import MODEL_DIR, find_images, load_backend, model_version
+
+FORMATS = ('csv', 'jsonl', 'parquet')
+COLUMNS = ('path', 'predicted_class', 'confidence', 'needs_review', 'top_predictions', 'error')
+
+
+class ImageFolderDataset(Dataset):
+    """Decodes and normalizes images by index; undecodable files are flagged, not raised"""
+
+    def __init__(self, paths):
+        self.paths = paths
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, index):
+        try:
+            return index, preprocess_image(self.paths[index])[0], ""
+        except Exception as e:
+            return index, torch.zeros(3, INPUT_SIZE[1], INPUT_SIZE[0]), str(e) or type(e).__name__
+
+
+class _LineWriter:
+    """Appends CSV or JSON Lines rows; a checkpoint records the committed byte offset"""
+
+    def __init__(self, path, format):
+        self.path = path
+        self.format = format
+        self._file = None
+        self._csv = None
+
+    def restore(self, checkpoint):
+        """Drop anything written after the checkpoint"""
+        if os.path.exists(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(checkpoint.get('offset', 0))
+
+    def done_paths(self):
+        """Image paths already in the output"""
+        if not os.path.exists(self.path):
+            return set()
+        with open(self.path, 'r', newline='', encoding='utf-8') as f:
+            if self.format == 'csv':
+                return {row['path'] for row in csv.DictReader(f)}
+            return {json.loads(line)['path'] for line in f if line.strip()}
+
+    def write(self, rows):
+        if self._file is None:
+            self._file = open(self.path, 'a', newline='', encoding='utf-8')
+            if self.format == 'csv':
+                self._csv = csv.DictWriter(self._file, fieldnames=COLUMNS)
+                if self._file.tell() == 0:
+                    self._csv.writeheader()
+        for row in rows:
+            if self.format == 'csv':
+                self._csv.writerow(dict(row, top_predictions=json.dumps(row['top_predictions'])))
+            else:
+                self._file.write(json.dumps(row) + "\n")
+
+    def commit(self):
+        """Flush to disk; returns the checkpoint fields"""
+        if self._file is None:
+            return {'offset': os.path.getsize(self.path) if os.path.exists(self.path) else 0}
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return {'offset': self._file.tell()}
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _ParquetWriter:
+    """Writes one Parquet part file per checkpoint into the output directory"""
+
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required for Parquet output: pip install pyarrow")
+        self.pa = pyarrow
+        self.pq = pyarrow.parquet
+        self.path = path
+        self.parts = []
+        self._rows = []
+
+    def restore(self, checkpoint):
+        """Keep only the part files the checkpoint committed"""
+        self.parts = list(checkpoint.get('parts', []))
+        if os.path.isdir(self.path):
+            for name in os.listdir(self.path):
+                if name not in self.parts:
+                    os.remove(os.path.join(self.path, name))
+
+    def done_paths(self):
+        done = set()
+        for name in self.parts:
+            done.update(self.pq.read_table(os.path.join(self.path, name), columns=['path']).column('path').to_pylist())
+        return done
+
+    def write(self, rows):
+        self._rows.extend(dict(row, top_predictions=json.dumps(row['top_predictions'])) for row in rows)
+
+    def commit(self):
+        if self._rows:
+            os.makedirs(self.path, exist_ok=True)
+            name = f"part-{len(self.parts):05d}.parquet"
+            table = self.pa.Table.from_pylist(self._rows)
+            temp_path = os.path.join(self.path, f".{name}.tmp")
+            self.pq.write_table(table, temp_path)
+            os.replace(temp_path, os.path.join(self.path, name))
+            self.parts.append(name)
+            self._rows = []
+        return {'parts': list(self.parts)}
+
+    def close(self):
+        pass
+
+
+def output_format(path, format=None):
+    """Output format from --format or the file extension"""
+    format = format or os.path.splitext(path)[1].lstrip('.').lower()
+    if format not in FORMATS:
+        raise ValueError(f"Unknown output format '{format}' (choose from {', '.join(FORMATS)})")
+    return format
+
+
+def create_writer(path, format):
+    return _ParquetWriter(path) if format == 'parquet' else _LineWriter(path, format)
+
+
+def load_checkpoint(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def save_checkpoint(path, checkpoint):
+    """Write the checkpoint atomically"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(checkpoint, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def remove_output(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def classify_directory(input_dir, output, format=None, backend='pytorch', model_dir=MODEL_DIR,
+                       batch_size=32, workers=4, top_k=DEFAULT_TOP_K, checkpoint_every=10,
+                       restart=False, review_threshold=None):
+    """
+    Classify all images under input_dir into an output file, resumably
+
+    Returns:
+        dict: images found, skipped (already done), classified, failed, seconds
+    """
+    format = output_format(output, format)
+    checkpoint_file = f"{output}.checkpoint.json"
+    writer = create_writer(output, format)
+
+    # Same loading as the web app: backend artifact + calibration
+    model, class_names = load_backend(backend, model_dir)
+    version = model_version(backend, model_dir)
+    calibration = Calibration.load(calibration_path(backend, model_dir), version)
+    if review_threshold is not None:
+        calibration.review_threshold = review_threshold
+    engine = BatchingInferenceEngine(model, class_names, temperature=calibration.temperature)
+    print(f"🧠 Model backend: {backend} (temperature {calibration.temperature:.3f})")
+
+    settings = {
+        'input_dir': os.path.abspath(input_dir),
+        'format': format,
+        'model_version': version,
+        'temperature': calibration.temperature,
+        'top_k': top_k
+    }
+    checkpoint = None if restart else load_checkpoint(checkpoint_file)
+    if checkpoint is not None:
+        changed = [key for key, value in settings.items() if checkpoint.get(key) != value]
+        if changed:
+            raise SystemExit(f"❌ {checkpoint_file} was written with a different {', '.join(changed)} "
+                             f"- use --restart to start over")
+        writer.restore(checkpoint)
+        done = writer.done_paths()
+        print(f"↩️ Resuming: {len(done)} images already classified")
+    else:
+        if os.path.exists(output) and not restart:
+            raise SystemExit(f"❌ {output} exists without a checkpoint - use --restart to overwrite it")
+        remove_output(output)
+        done = set()
+
+    relative = {path: os.path.relpath(path, input_dir) for path in find_images(input_dir)}
+    paths = [path for path, name in relative.items() if name not in done]
+    stats = {"images": len(relative), "skipped": len(relative) - len(paths), "classified": 0, "failed": 0}
+    print(f"📂 {len(relative)} images found, {len(paths)} to classify")
+
+    loader = DataLoader(ImageFolderDataset(paths), batch_size=batch_size, num_workers=workers,
+                        shuffle=False, persistent_workers=False)
+    started = time.perf_counter()
+    processed = 0
+
+    def commit():
+        save_checkpoint(checkpoint_file, dict(settings, **writer.commit(), rows=len(done) + processed,
+                                              updated_at=time.strftime('%Y-%m-%d %H:%M:%S')))
+
+    try:
+        for batch_number, (indices, batch, errors) in enumerate(loader, 1):
+            valid = [i for i, error in enumerate(errors) if not error]
+            rows = [None] * len(indices)
+            if valid:
+                probabilities = engine.predict_proba(batch[valid])
+                values, top_indices = probabilities.topk(min(top_k, len(class_names)), dim=1)
+                for i, row_values, row_indices in zip(valid, values.tolist(), top_indices.tolist()):
+                    top_predictions = [{"class": class_names[c], "probability": p}
+                                       for c, p in zip(row_indices, row_values)]
+                    rows[i] = {
+                        'path': relative[paths[int(indices[i])]],
+                        'predicted_class': top_predictions[0]['class'],
+                        'confidence': top_predictions[0]['probability'],
+                        'needs_review': calibration.needs_review(top_predictions[0]['probability']),
+                        'top_predictions': top_predictions,
+                        'error': ""
+                    }
+            for i, error in enumerate(errors):
+                if error:
+                    rows[i] = {'path': relative[paths[int(indices[i])]], 'predicted_class': "",
+                               'confidence': None, 'needs_review': True, 'top_predictions': [], 'error': error}
+
+            writer.write(rows)
+            processed += len(rows)
+            stats["classified"] += len(valid)
+            stats["failed"] += len(rows) - len(valid)
+
+            if batch_number % checkpoint_every == 0:
+                commit()
+                elapsed = time.perf_counter() - started
+                print(f"📦 {processed}/{len(paths)} images ({processed / elapsed:.1f} img/s)")
+        commit()
+    finally:
+        writer.close()
+
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Classify every image under a directory')
+    parser.add_argument('input_dir', help='Directory tree of images')
+    parser.add_argument('--output', required=True, help='Results file: .csv, .jsonl or .parquet')
+    parser.add_argument('--format', choices=FORMATS, help='Output format (default: from the extension)')
+    parser.add_argument('--backend', default=os.environ.get('MODEL_BACKEND', 'pytorch'))
+    parser.add_argument('--model-dir', default=MODEL_DIR)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--workers', type=int, default=4, help='Image decoding processes')
+    parser.add_argument('--top-k', type=int, default=DEFAULT_TOP_K)
+    parser.add_argument('--review-threshold', type=float, default=None,
+                        help='Override the calibrated review threshold')
+    parser.add_argument('--checkpoint-every', type=int, default=10, help='Batches between checkpoints')
+    parser.add_argument('--restart', action='store_true', help='Ignore any checkpoint and overwrite the output')
+    args = parser.parse_args()
+
+    print("🌱 BULK CLASSIFICATION")
+    print("=" * 60)
+    stats = classify_directory(
+        args.input_dir, args.output, format=args.format, backend=args.backend, model_dir=args.model_dir,
+        batch_size=args.batch_size, workers=args.workers, top_k=args.top_k,
+        checkpoint_every=max(1, args.checkpoint_every), restart=args.restart,
+        review_threshold=args.review_threshold
+    )
+    rate = stats["classified"] / stats["seconds"] if stats["seconds"] else 0.0
+    print(f"\n✅ {stats['classified']} classified, {stats['failed']} failed, {stats['skipped']} already done "
+          f"in {stats['seconds']:.1f}s ({rate:.1f} img/s)")
+    print(f"📁 Results: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
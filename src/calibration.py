@@ -0,0 +1,264 @@
+"""
+Confidence Calibration
+======================
+Raw softmax scores of a fine-tuned classifier are over-confident. Temperature
+scaling divides the logits by one scalar T, fitted offline on labelled images
+by minimising the negative log-likelihood. This changes the confidences but
+never the ranking of the classes, so accuracy is unchanged.
+
+The fit also picks a review threshold: the lowest calibrated confidence at
+which predictions on the fitting set still reach the target accuracy.
+Predictions below it are flagged `needs_review` instead of relying on a
+hard-coded cutoff.
+
+The result is stored next to the model artifact, e.g.
+model/plant_disease_classifier.calibration.json, and loaded with the model.
+Without the file, T = 1 (plain softmax) and the threshold is 0.7.
+
+Fit from a folder with one sub-folder per class:
+    python -m src.calibration fit --data-dir path/to/labeled_images [--backend pytorch]
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+DEFAULT_REVIEW_THRESHOLD = 0.7
+DEFAULT_TARGET_ACCURACY = 0.95
+DEFAULT_TOP_K = 3
+
+
+def log_softmax(logits, temperature=1.0):
+    """Row-wise log-softmax of logits / temperature"""
+    scaled = np.asarray(logits, dtype=np.float64) / temperature
+    scaled = scaled - scaled.max(axis=1, keepdims=True)
+    return scaled - np.log(np.exp(scaled).sum(axis=1, keepdims=True))
+
+
+def negative_log_likelihood(logits, labels, temperature=1.0):
+    """Mean NLL of the true labels"""
+    log_probabilities = log_softmax(logits, temperature)
+    return float(-log_probabilities[np.arange(len(labels)), labels].mean())
+
+
+def expected_calibration_error(probabilities, labels, bins=15):
+    """
+    Gap between confidence and accuracy, averaged over equal-width
+    confidence bins weighted by how many predictions fall in each
+    """
+    confidences = probabilities.max(axis=1)
+    correct = probabilities.argmax(axis=1) == labels
+    edges = np.linspace(0.0, 1.0, bins + 1)
+    bin_ids = np.clip(np.digitize(confidences, edges[1:-1]), 0, bins - 1)
+    error = 0.0
+    for b in range(bins):
+        in_bin = bin_ids == b
+        if in_bin.any():
+            error += in_bin.mean() * abs(correct[in_bin].mean() - confidences[in_bin].mean())
+    return float(error)
+
+
+def fit_temperature(logits, labels, bounds=(0.05, 20.0), iterations=60):
+    """
+    Temperature minimising the NLL (golden-section search over log T; the
+    NLL is unimodal in T)
+    """
+    labels = np.asarray(labels)
+    low, high = np.log(bounds[0]), np.log(bounds[1])
+    ratio = (np.sqrt(5.0) - 1.0) / 2.0
+    a = high - ratio * (high - low)
+    b = low + ratio * (high - low)
+    nll_a = negative_log_likelihood(logits, labels, np.exp(a))
+    nll_b = negative_log_likelihood(logits, labels, np.exp(b))
+    for _ in range(iterations):
+        if nll_a < nll_b:
+            high, b, nll_b = b, a, nll_a
+            a = high - ratio * (high - low)
+            nll_a = negative_log_likelihood(logits, labels, np.exp(a))
+        else:
+            low, a, nll_a = a, b, nll_b
+            b = low + ratio * (high - low)
+            nll_b = negative_log_likelihood(logits, labels, np.exp(b))
+    return float(np.exp((low + high) / 2.0))
+
+
+def choose_review_threshold(probabilities, labels, target_accuracy=DEFAULT_TARGET_ACCURACY):
+    """
+    Lowest confidence threshold at which the predictions at or above it
+    reach target_accuracy (1.0 if no threshold does)
+    """
+    confidences = probabilities.max(axis=1)
+    correct = (probabilities.argmax(axis=1) == labels).astype(np.float64)
+    order = np.argsort(-confidences)
+    # Accuracy of the k most confident predictions, for every k
+    running_accuracy = np.cumsum(correct[order]) / np.arange(1, len(order) + 1)
+    passing = np.flatnonzero(running_accuracy >= target_accuracy)
+    if not len(passing):
+        return 1.0
+    return float(confidences[order][passing[-1]])
+
+
+def top_k(probabilities, class_names, k=DEFAULT_TOP_K):
+    """
+    The k most probable classes of one probability row
+
+    Returns:
+        list: [{"class": name, "probability": p}, ...] most probable first
+    """
+    probabilities = np.asarray(probabilities)
+    k = min(max(1, int(k)), len(probabilities))
+    indices = np.argpartition(-probabilities, k - 1)[:k]
+    indices = indices[np.argsort(-probabilities[indices])]
+    return [{"class": class_names[i], "probability": float(probabilities[i])} for i in indices]
+
+
+class Calibration:
+    """
+    Fitted temperature and review threshold for one model artifact
+    """
+
+    def __init__(self, temperature=1.0, review_threshold=DEFAULT_REVIEW_THRESHOLD, metadata=None):
+        self.temperature = float(temperature)
+        self.review_threshold = float(review_threshold)
+        self.metadata = metadata or {}
+
+    @property
+    def fitted(self):
+        return bool(self.metadata)
+
+    def needs_review(self, confidence):
+        """True when a calibrated confidence is too low to trust unreviewed"""
+        return confidence is None or confidence < self.review_threshold
+
+    def to_dict(self):
+        return dict(self.metadata, temperature=self.temperature, review_threshold=self.review_threshold)
+
+    def save(self, path):
+        """Write the calibration file atomically"""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path, model_version=None):
+        """
+        Calibration from a file, or the identity calibration when the file is
+        missing or unreadable. Warns when it was fitted on other weights.
+        """
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return cls()
+
+        metadata = {k: v for k, v in data.items() if k not in ('temperature', 'review_threshold')}
+        if model_version and metadata.get('model_version') not in (None, model_version):
+            print(f"⚠️ {path} was fitted on different model weights - refit with: python -m src.calibration fit")
+        return cls(data.get('temperature', 1.0), data.get('review_threshold', DEFAULT_REVIEW_THRESHOLD), metadata)
+
+
+def calibration_path(backend='pytorch', model_dir=None):
+    """Calibration file stored next to a backend's model artifact"""
+    from .model_backends import MODEL_DIR, artifact_path
+    return os.path.splitext(artifact_path(backend, model_dir or MODEL_DIR))[0] + ".calibration.json"
+
+
+def collect_logits(model, samples, batch_size=32):
+    """
+    Run a model over (image_path, label) samples
+
+    Returns:
+        tuple: (logits array (N, classes), labels array (N,))
+    """
+    import torch
+    from .image_preprocessing import preprocess_batch
+
+    logits, labels = [], []
+    with torch.no_grad():
+        for start in range(0, len(samples), batch_size):
+            chunk = samples[start:start + batch_size]
+            batch, valid = preprocess_batch([path for path, _ in chunk])
+            if not valid:
+                continue
+            logits.append(model(batch).float().numpy())
+            labels.extend(chunk[i][1] for i in valid)
+    if not logits:
+        raise ValueError("None of the images could be decoded")
+    return np.concatenate(logits), np.asarray(labels)
+
+
+def fit_calibration(logits, labels, target_accuracy=DEFAULT_TARGET_ACCURACY):
+    """
+    Fit a Calibration and report its effect
+
+    Returns:
+        Calibration: metadata holds before/after NLL and ECE, accuracy and
+        the share of predictions that would skip review
+    """
+    temperature = fit_temperature(logits, labels)
+    before = np.exp(log_softmax(logits))
+    after = np.exp(log_softmax(logits, temperature))
+    threshold = choose_review_threshold(after, labels, target_accuracy)
+    accepted = after.max(axis=1) >= threshold
+    return Calibration(temperature, threshold, {
+        "images": int(len(labels)),
+        "accuracy": float((after.argmax(axis=1) == labels).mean()),
+        "nll_before": negative_log_likelihood(logits, labels),
+        "nll_after": negative_log_likelihood(logits, labels, temperature),
+        "ece_before": expected_calibration_error(before, labels),
+        "ece_after": expected_calibration_error(after, labels),
+        "target_accuracy": target_accuracy,
+        "auto_accepted_share": float(accepted.mean()),
+        "auto_accepted_accuracy": float((after.argmax(axis=1) == labels)[accepted].mean()) if accepted.any() else 0.0,
+        "fitted_at": time.strftime('%Y-%m-%d %H:%M:%S')
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fit confidence calibration for the classifier')
+    parser.add_argument('--model-dir', default=None, help='Directory holding the model artifacts')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    fit_parser = subparsers.add_parser('fit', help='Fit temperature and review threshold on a labeled folder')
+    fit_parser.add_argument('--data-dir', required=True, help='Folder with one sub-folder per class')
+    fit_parser.add_argument('--backend', default='pytorch')
+    fit_parser.add_argument('--batch-size', type=int, default=32)
+    fit_parser.add_argument('--limit-per-class', type=int, default=None)
+    fit_parser.add_argument('--target-accuracy', type=float, default=DEFAULT_TARGET_ACCURACY,
+                            help='Accuracy required of predictions that skip review')
+    fit_parser.add_argument('--output', help='Calibration file (default: next to the model artifact)')
+    args = parser.parse_args()
+
+    from .model_backends import MODEL_DIR, load_backend, load_labeled_folder, model_version
+
+    model_dir = args.model_dir or MODEL_DIR
+    model, class_names = load_backend(args.backend, model_dir)
+    samples = load_labeled_folder(args.data_dir, class_names, args.limit_per_class)
+    if not samples:
+        raise SystemExit(f"❌ No labeled images found in {args.data_dir}")
+
+    print(f"🧠 Collecting logits for {len(samples)} images ({args.backend})...")
+    logits, labels = collect_logits(model, samples, args.batch_size)
+    calibration = fit_calibration(logits, labels, args.target_accuracy)
+    calibration.metadata.update({"backend": args.backend, "model_version": model_version(args.backend, model_dir)})
+
+    report = calibration.metadata
+    print("\n📏 CALIBRATION")
+    print("=" * 60)
+    print(f"Temperature:      {calibration.temperature:.3f}")
+    print(f"NLL:              {report['nll_before']:.4f} -> {report['nll_after']:.4f}")
+    print(f"ECE:              {report['ece_before']:.4f} -> {report['ece_after']:.4f}")
+    print(f"Accuracy:         {report['accuracy']:.2%}")
+    print(f"Review threshold: {calibration.review_threshold:.3f} "
+          f"({report['auto_accepted_share']:.1%} auto-accepted at {report['auto_accepted_accuracy']:.2%} accuracy)")
+
+    output = args.output or calibration_path(args.backend, model_dir)
+    calibration.save(output)
+    print(f"\n📁 Calibration saved to: {output}")
+
+
+if __name__ == '__main__':
+    main()
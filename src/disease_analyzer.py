@@ -3,32 +3,88 @@ Simple Working Example: Plant Disease System with OpenWeatherMap and Wikipedia
 This demonstrates the two APIs working with your plant disease system.
 """
 
-import requests
+import functools
 import json
+import time
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+
+try:
+    from .lookup_cache import LookupCache, is_cacheable
+    from .http_client import HttpClient
+    from .class_names import CLASS_NAMES, plant_name as get_plant_name
+    from .weather_service import WeatherService, OpenWeatherMapProvider
+    from .risk_engine import get_risk_engine
+except ImportError:
+    from lookup_cache import LookupCache, is_cacheable
+    from http_client import HttpClient
+    from class_names import CLASS_NAMES, plant_name as get_plant_name
+    from weather_service import WeatherService, OpenWeatherMapProvider
+    from risk_engine import get_risk_engine
+
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
+ENRICHMENT_DEADLINE = 8.0  # seconds for weather + Wikipedia lookups combined
 
 class SimpleEnhancedPlantCare:
     """
     Simple implementation of enhanced plant care with APIs
     """
     
-    def __init__(self, openweather_api_key=None):
+    def __init__(self, openweather_api_key=None, lookup_cache=None, wikipedia_api_url=WIKIPEDIA_API_URL,
+                 enrichment_deadline=ENRICHMENT_DEADLINE, enrichment_workers=8, http_client=None,
+                 care_system=None, weather_service=None):
         self.openweather_api_key = openweather_api_key
+        self.wikipedia_api_url = wikipedia_api_url
+        self.enrichment_deadline = enrichment_deadline
         
-        # Load your plant care system
-        try:
-            from plant_care_system import PlantCareRecommendationSystem
-            self.care_system = PlantCareRecommendationSystem()
-            print("✅ Your plant care system loaded successfully!")
-        except ImportError:
-            print("⚠️ Plant care system not found")
-            self.care_system = None
+        # Weather and Wikipedia lookups run concurrently on this pool
+        self.enrichment_executor = ThreadPoolExecutor(
+            max_workers=enrichment_workers, thread_name_prefix='enrichment'
+        )
+        
+        # Keep-alive connection pool with retries / circuit breaking, sized so
+        # every enrichment thread can hold a connection
+        self.http_client = http_client if http_client is not None else HttpClient(
+            pool_maxsize=enrichment_workers
+        )
+        
+        # Wikipedia answers barely change - cache them (in-memory unless a
+        # persistent LookupCache is passed in)
+        self.lookup_cache = lookup_cache if lookup_cache is not None else LookupCache()
+
+        # Weather observations are cached per location and limited by a daily
+        # call budget; without a service or API key a placeholder is returned
+        if weather_service is None and openweather_api_key:
+            weather_service = WeatherService(OpenWeatherMapProvider(openweather_api_key, self.http_client))
+        self.weather_service = weather_service
+
+        # Load your plant care system (the shared instance unless one is passed in)
+        if care_system is not None:
+            self.care_system = care_system
+        else:
+            try:
+                try:
+                    from .plant_care_system import get_care_system
+                except ImportError:
+                    from plant_care_system import get_care_system
+                self.care_system = get_care_system()
+                print("✅ Your plant care system loaded successfully!")
+            except ImportError:
+                print("⚠️ Plant care system not found")
+                self.care_system = None
     
-    def get_weather_risk_assessment(self, location):
+    def get_weather_risk_assessment(self, location, disease_class=None, priority='interactive'):
         """
         Get weather data and assess disease risk
+
+        Args:
+            location: Free-text location
+            disease_class: Predicted class; risk is scored for it (or, for a
+                healthy plant, for its most favoured disease). None scores
+                the highest risk over all classes.
+            priority: weather budget priority, 'interactive' or 'background'
         """
-        if not self.openweather_api_key:
+        if self.weather_service is None:
             return {
                 "status": "no_api_key",
                 "message": "Get free OpenWeatherMap API key at: https://openweathermap.org/api",
@@ -40,56 +96,83 @@ class SimpleEnhancedPlantCare:
                 }
             }
         
-        try:
-            # OpenWeatherMap API call
-            url = "http://api.openweathermap.org/data/2.5/weather"
-            params = {
-                'q': location,
-                'appid': self.openweather_api_key,
-                'units': 'metric'
-            }
-            
-            response = requests.get(url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                temp = data['main']['temp']
-                humidity = data['main']['humidity']
-                
-                # Assess disease risk
-                risk_level = "LOW"
-                advice = "Good growing conditions"
-                
-                if humidity > 85:
-                    risk_level = "HIGH"
-                    advice = "Very high humidity promotes fungal diseases"
-                elif humidity > 70:
-                    risk_level = "MEDIUM" 
-                    advice = "Moderate disease risk due to high humidity"
-                
-                return {
-                    "status": "success",
-                    "location": data['name'],
-                    "temperature": temp,
-                    "humidity": humidity,
-                    "risk_level": risk_level,
-                    "advice": advice,
-                    "weather_description": data['weather'][0]['description']
-                }
-            else:
-                return {"status": "error", "message": f"Weather API error: {response.status_code}"}
-                
-        except Exception as e:
-            return {"status": "error", "message": f"Weather API error: {str(e)}"}
+        # Cached per normalised location; concurrent lookups share one API call
+        observation = self.weather_service.get_observation(location, priority=priority)
+        if observation.get('status') != 'success':
+            return {"status": observation.get('status', 'error'),
+                    "message": observation.get('message', 'Weather API error')}
+        
+        # Score temperature, humidity, leaf wetness and rainfall per pathogen
+        engine = get_risk_engine()
+        rainfall = observation.get('rainfall_mm') or 0.0
+        if disease_class is None:
+            scores = engine.score(observation['temperature'], observation['humidity'], rainfall=rainfall)
+            disease_class = engine.class_names[int(scores.argmax())]
+        risk = engine.assess(disease_class, observation['temperature'], observation['humidity'], rainfall=rainfall)
+        
+        return {
+            "status": "success",
+            "location": observation['location'],
+            "temperature": observation['temperature'],
+            "humidity": observation['humidity'],
+            "rainfall_mm": rainfall,
+            "risk_level": risk['risk_level'],
+            "risk_score": risk['risk_score'],
+            "risk_factors": risk['risk_factors'],
+            "leaf_wetness_hours": risk['leaf_wetness_hours'],
+            "top_threats": risk['top_threats'],
+            "advice": risk['advice'],
+            "weather_description": observation['weather_description'],
+            "observation_age_seconds": observation.get('age_seconds', 0.0)
+        }
     
     def get_plant_info_wikipedia(self, plant_name):
+        """
+        Get plant information from Wikipedia (cached)
+        """
+        return self.lookup_cache.get_or_fetch(
+            f"plant:{plant_name}", lambda: self._fetch_plant_info_wikipedia(plant_name)
+        )
+    
+    def get_disease_info_wikipedia(self, disease_name):
+        """
+        Get disease-specific information from Wikipedia (cached)
+        """
+        return self.lookup_cache.get_or_fetch(
+            f"disease:{disease_name}", lambda: self._fetch_disease_info_wikipedia(disease_name)
+        )
+    
+    def warm_wikipedia_cache(self, class_names=None):
+        """
+        Prefetch plant and disease information for every class
+
+        Returns:
+            dict: lookup key -> status
+        """
+        class_names = class_names or CLASS_NAMES
+        statuses = {}
+        
+        for plant_name in dict.fromkeys(get_plant_name(name) for name in class_names):
+            result = self._fetch_plant_info_wikipedia(plant_name)
+            if is_cacheable(result):
+                self.lookup_cache.set(f"plant:{plant_name}", result)
+            statuses[f"plant:{plant_name}"] = result.get('status', 'unknown')
+        
+        for disease_name in class_names:
+            result = self._fetch_disease_info_wikipedia(disease_name)
+            if is_cacheable(result):
+                self.lookup_cache.set(f"disease:{disease_name}", result)
+            statuses[f"disease:{disease_name}"] = result.get('status', 'unknown')
+        
+        return statuses
+    
+    def _fetch_plant_info_wikipedia(self, plant_name):
         """
         Get plant information from Wikipedia using alternative method
         """
         try:
             # Use Wikipedia's opensearch API (more reliable)
-            search_url = "https://en.wikipedia.org/w/api.php"
+            search_url = self.wikipedia_api_url
             search_params = {
                 'action': 'opensearch',
                 'search': plant_name,
@@ -97,13 +180,8 @@ class SimpleEnhancedPlantCare:
                 'format': 'json'
             }
             
-            # Add User-Agent header to avoid 403 errors
-            headers = {
-                'User-Agent': 'PlantDiseaseApp/1.0 (Educational Purpose)'
-            }
-            
-            search_response = requests.get(search_url, params=search_params, 
-                                         headers=headers, timeout=10)
+            # The shared client sends a User-Agent header to avoid 403 errors
+            search_response = self.http_client.get('wikipedia', search_url, params=search_params, timeout=10)
             
             if search_response.status_code == 200:
                 search_data = search_response.json()
@@ -136,7 +214,7 @@ class SimpleEnhancedPlantCare:
                 "additional_info": self._get_plant_care_basics(plant_name)
             }
 
-    def get_disease_info_wikipedia(self, disease_name):
+    def _fetch_disease_info_wikipedia(self, disease_name):
         """
         Get disease-specific information from Wikipedia
         """
@@ -150,7 +228,7 @@ class SimpleEnhancedPlantCare:
                 cleaned_disease = disease_name.replace('_', ' ')
             
             # Use Wikipedia's opensearch API for disease information
-            search_url = "https://en.wikipedia.org/w/api.php"
+            search_url = self.wikipedia_api_url
             
             # Try multiple search terms for better results
             search_terms = [
@@ -159,10 +237,7 @@ class SimpleEnhancedPlantCare:
                 f"{cleaned_disease} disease"
             ]
             
-            headers = {
-                'User-Agent': 'PlantDiseaseApp/1.0 (Educational Purpose)'
-            }
-            
+            failed_searches = 0
             for search_term in search_terms:
                 search_params = {
                     'action': 'opensearch',
@@ -172,8 +247,8 @@ class SimpleEnhancedPlantCare:
                 }
                 
                 try:
-                    search_response = requests.get(search_url, params=search_params, 
-                                                 headers=headers, timeout=5)
+                    search_response = self.http_client.get('wikipedia', search_url,
+                                                           params=search_params, timeout=5)
                     
                     if search_response.status_code == 200:
                         search_data = search_response.json()
@@ -196,9 +271,22 @@ class SimpleEnhancedPlantCare:
                                         "search_term_used": search_term,
                                         "additional_info": self._get_disease_basics(disease_name)
                                     }
+                    elif search_response.status_code != 404:
+                        # 5xx, 429 rate limiting, 403 ... - the term may still exist
+                        failed_searches += 1
                 except Exception as e:
+                    failed_searches += 1
                     continue
             
+            # A search failed (provider down, rate limited, circuit open), so
+            # the miss is not conclusive - don't report (and cache) "not found"
+            if failed_searches:
+                return {
+                    "status": "error",
+                    "message": "Wikipedia unavailable",
+                    "additional_info": self._get_disease_basics(disease_name)
+                }
+            
             # If no disease-specific page found, return disease basics
             return {
                 "status": "not_found",
@@ -328,37 +416,136 @@ class SimpleEnhancedPlantCare:
             "advice": "Consult agricultural extension services for specific treatment"
         }
 
-    def get_complete_enhanced_diagnosis(self, disease_class, confidence, location=None):
+    def _timed(self, fetch, *args):
+        """Run a lookup and return (result, elapsed seconds)"""
+        started = time.perf_counter()
+        result = fetch(*args)
+        return result, time.perf_counter() - started
+    
+    def enrichment_steps(self, location=None):
+        """Names of the sections get_complete_enhanced_diagnosis reports progress for"""
+        steps = ["recommendations", "plant_information", "disease_information"]
+        if location:
+            steps.append("weather_analysis")
+        return steps
+    
+    def _start_enrichment(self, disease_class, location, priority='interactive'):
+        """
+        Submit weather, plant and disease lookups to run concurrently
+
+        Returns:
+            tuple: (futures by source, source definitions, start time)
+        """
+        plant_name = get_plant_name(disease_class)
+        sources = {
+            "plant_information": (self.get_plant_info_wikipedia, plant_name,
+                                  lambda: self._get_plant_care_basics(plant_name)),
+            "disease_information": (self.get_disease_info_wikipedia, disease_class,
+                                    lambda: self._get_disease_basics(disease_class))
+        }
+        if location:
+            sources["weather_analysis"] = (
+                functools.partial(self.get_weather_risk_assessment, disease_class=disease_class, priority=priority),
+                location, None
+            )
+        
+        started = time.perf_counter()
+        futures = {
+            self.enrichment_executor.submit(self._timed, fetch, argument): name
+            for name, (fetch, argument, _) in sources.items()
+        }
+        return futures, sources, started
+    
+    def _collect_enrichment(self, futures, sources, started, deadline, on_progress=None):
+        """
+        Wait for the lookups until the deadline. Sources that miss it get a
+        placeholder result; their lookups keep running in the background
+        and still fill the caches. on_progress(source, result) is called as
+        each lookup finishes.
+
+        Returns:
+            tuple: (results by source, timing report)
         """
-        Get complete diagnosis with weather and plant information
+        try:
+            for future in as_completed(futures, timeout=max(0.0, deadline - (time.perf_counter() - started))):
+                if on_progress and future.exception() is None:
+                    on_progress(futures[future], future.result()[0])
+        except FuturesTimeoutError:
+            pass
+        
+        results = {"weather_analysis": {}}
+        timing = {}
+        for future, name in futures.items():
+            fallback = sources[name][2]
+            if not future.done():
+                results[name] = {
+                    "status": "timeout",
+                    "message": f"Lookup did not finish within {deadline:.1f}s"
+                }
+                if fallback:
+                    results[name]["additional_info"] = fallback()
+                timing[name] = {"status": "timeout", "elapsed_ms": None}
+                continue
+            
+            try:
+                result, elapsed = future.result()
+                results[name] = result
+                timing[name] = {"status": result.get('status', 'unknown'), "elapsed_ms": round(elapsed * 1000.0, 1)}
+            except Exception as e:
+                results[name] = {"status": "error", "message": str(e)}
+                if fallback:
+                    results[name]["additional_info"] = fallback()
+                timing[name] = {"status": "error", "elapsed_ms": None}
+        
+        timing["total_ms"] = round((time.perf_counter() - started) * 1000.0, 1)
+        timing["deadline_ms"] = round(deadline * 1000.0, 1)
+        timing["partial"] = any(
+            entry["status"] in ("timeout", "error") for entry in timing.values() if isinstance(entry, dict)
+        )
+        return results, timing
+    
+    def get_complete_enhanced_diagnosis(self, disease_class, confidence, location=None, deadline=None,
+                                        on_progress=None, priority='interactive'):
+        """
+        Get complete diagnosis with weather and plant information.
+        External lookups run concurrently; any source that misses the
+        deadline (default: enrichment_deadline) is returned as partial.
+        on_progress(step, data) is called for each of enrichment_steps()
+        as its section becomes available. Bulk callers pass
+        priority='background' so they only spend the background share of
+        the weather budget.
         """
         print(f"\n🔬 ENHANCED DIAGNOSIS FOR: {disease_class}")
         print("="*60)
         
-        # 1. Get base disease recommendations
+        # 1. Start weather, plant and disease lookups concurrently
+        deadline = self.enrichment_deadline if deadline is None else deadline
+        enrichment = self._start_enrichment(disease_class, location, priority)
+        
+        # 2. Get base disease recommendations while the lookups run
         if self.care_system:
             recommendations = self.care_system.get_recommendations(disease_class, confidence)
             print(f"✅ Base recommendations loaded")
         else:
             print(f"⚠️ Using basic recommendations")
             recommendations = {"note": "Install plant_care_system for full recommendations"}
+        if on_progress:
+            on_progress("recommendations", {
+                key: recommendations.get(key, [])
+                for key in ("fertilizer_recommendations", "organic_manure", "immediate_treatment")
+            })
         
-        # 2. Get weather analysis
-        weather_data = {}
+        # 3. Collect lookup results (bounded by the deadline)
+        results, timing = self._collect_enrichment(*enrichment, deadline, on_progress)
+        weather_data = results["weather_analysis"]
+        plant_info = results["plant_information"]
+        disease_info = results["disease_information"]
         if location:
-            weather_data = self.get_weather_risk_assessment(location)
             print(f"🌤️ Weather data: {weather_data.get('status', 'unknown')}")
-        
-        # 3. Get plant information
-        plant_name = disease_class.split('___')[0] if '___' in disease_class else disease_class
-        plant_info = self.get_plant_info_wikipedia(plant_name)
         print(f"📚 Plant info: {plant_info.get('status', 'unknown')}")
-        
-        # 4. Get disease-specific information
-        disease_info = self.get_disease_info_wikipedia(disease_class)
         print(f"🦠 Disease info: {disease_info.get('status', 'unknown')}")
         
-        # 5. Create enhanced report
+        # 4. Create enhanced report
         enhanced_report = {
             "disease_analysis": {
                 "detected_condition": disease_class,
@@ -373,7 +560,8 @@ class SimpleEnhancedPlantCare:
             "disease_information": disease_info,
             "integrated_advice": self._create_integrated_advice(
                 disease_class, recommendations, weather_data, plant_info, disease_info
-            )
+            ),
+            "enrichment_timing": timing
         }
         
         return enhanced_report
@@ -489,7 +677,8 @@ def demo_enhanced_system():
             print(f"   Location: {weather['location']}")
             print(f"   Temperature: {weather['temperature']}°C")
             print(f"   Humidity: {weather['humidity']}%")
-            print(f"   Risk Level: {weather['risk_level']}")
+            print(f"   Risk Level: {weather['risk_level']} ({weather.get('risk_score', 0):.2f})")
+            print(f"   Advice: {weather['advice']}")
         elif weather.get('mock_data'):
             print(f"\n🌤️ WEATHER (DEMO DATA):")
             mock = weather['mock_data']
@@ -566,7 +755,36 @@ diagnosis = enhanced_system.get_complete_enhanced_diagnosis(
     
     print("📖 API key instructions saved to: QUICK_START_API_KEYS.md")
 
+def warm_cache_main(args):
+    """
+    Prefetch Wikipedia information for all classes into a persistent cache
+    """
+    cache = LookupCache(args.cache_db)
+    enhanced_system = SimpleEnhancedPlantCare(lookup_cache=cache, wikipedia_api_url=args.wikipedia_url)
+    
+    print(f"🔥 Warming Wikipedia cache: {args.cache_db}")
+    statuses = enhanced_system.warm_wikipedia_cache()
+    
+    for key, status in statuses.items():
+        icon = "✅" if status in ('success', 'not_found') else "❌"
+        print(f"   {icon} {key}: {status}")
+    
+    cached = sum(1 for status in statuses.values() if status in ('success', 'not_found'))
+    print(f"\n📦 Cached {cached}/{len(statuses)} lookups")
+
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Enhanced plant care demo and cache tools")
+    parser.add_argument('--warm-cache', action='store_true', help='Prefetch Wikipedia info for all classes')
+    parser.add_argument('--cache-db', default='cache/wikipedia.sqlite3', help='Persistent lookup cache file')
+    parser.add_argument('--wikipedia-url', default=WIKIPEDIA_API_URL, help='Wikipedia API endpoint')
+    cli_args = parser.parse_args()
+    
+    if cli_args.warm_cache:
+        warm_cache_main(cli_args)
+        raise SystemExit(0)
+    
     # Create instructions
     create_api_key_instructions()
     
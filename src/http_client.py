@@ -0,0 +1,250 @@
+"""
+Pooled HTTP Client for External APIs
+====================================
+One shared requests.Session per client, so connections to OpenWeatherMap and
+Wikipedia are kept alive and reused instead of paying a TCP/TLS handshake on
+every lookup. On top of the pool each provider gets:
+
+- bounded retries with exponential backoff (and jitter) on connection errors,
+  timeouts and 429/5xx responses, limited by a retry budget so a struggling
+  provider is not hammered with retry storms
+- a circuit breaker that short-circuits calls after repeated failures and
+  lets a single trial request through once the reset timeout has passed
+- latency / error / retry counters exposed through get_stats()
+"""
+
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+USER_AGENT = 'PlantDiseaseApp/1.0 (Educational Purpose)'
+
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of making a request while a provider's circuit is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker (closed -> open -> half_open -> closed)
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """Return True if a request may be sent now"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.times_opened += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def get_state(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "times_opened": self.times_opened
+            }
+
+
+class RetryBudget:
+    """
+    Token bucket limiting retries to a fraction of request volume: every
+    request deposits `ratio` tokens, every retry withdraws one
+    """
+
+    def __init__(self, ratio=0.2, min_tokens=10):
+        self.ratio = ratio
+        self.capacity = float(min_tokens)
+        self.tokens = float(min_tokens)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + self.ratio)
+
+    def try_withdraw(self):
+        with self._lock:
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return True
+            return False
+
+
+class HttpClient:
+    """
+    Shared keep-alive session with per-provider retries, breakers and metrics
+    """
+
+    def __init__(self, pool_maxsize=16, timeout=10, max_retries=2, backoff_factor=0.25,
+                 retry_budget_ratio=0.2, failure_threshold=5, reset_timeout=30.0):
+        self.timeout = timeout
+        self.max_retries = max(0, int(max_retries))
+        self.backoff_factor = backoff_factor
+        self.retry_budget_ratio = retry_budget_ratio
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        # Retries are handled here (not by urllib3) so they count against
+        # the retry budget and show up in the metrics
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+
+        self._providers = {}
+        self._lock = threading.Lock()
+
+    def _provider(self, name):
+        with self._lock:
+            provider = self._providers.get(name)
+            if provider is None:
+                provider = {
+                    "breaker": CircuitBreaker(self.failure_threshold, self.reset_timeout),
+                    "budget": RetryBudget(self.retry_budget_ratio),
+                    "stats": {
+                        "requests": 0,
+                        "attempts": 0,
+                        "successes": 0,
+                        "errors": 0,
+                        "retries": 0,
+                        "retries_denied": 0,
+                        "short_circuited": 0,
+                        "total_latency": 0.0,
+                        "max_latency": 0.0
+                    }
+                }
+                self._providers[name] = provider
+            return provider
+
+    def _count(self, provider, key, amount=1):
+        with self._lock:
+            provider["stats"][key] += amount
+
+    def _backoff(self, attempt):
+        """Exponential backoff with full jitter"""
+        return random.uniform(0, self.backoff_factor * (2 ** attempt))
+
+    def get(self, provider_name, url, params=None, headers=None, timeout=None):
+        """
+        GET url on behalf of a provider ('openweathermap', 'wikipedia', ...)
+
+        Returns:
+            requests.Response: the final response (4xx responses are returned
+            as-is; they are the caller's problem, not the provider's)
+
+        Raises:
+            CircuitOpenError: the provider's circuit is open
+            requests.RequestException: connection error / timeout after retries
+        """
+        provider = self._provider(provider_name)
+        breaker = provider["breaker"]
+
+        if not breaker.allow_request():
+            self._count(provider, "short_circuited")
+            raise CircuitOpenError(f"{provider_name} circuit open - skipping request")
+
+        self._count(provider, "requests")
+        provider["budget"].deposit()
+        started = time.perf_counter()
+        attempt = 0
+
+        while True:
+            self._count(provider, "attempts")
+            error = None
+            response = None
+            try:
+                response = self.session.get(url, params=params, headers=headers,
+                                            timeout=timeout or self.timeout)
+            except requests.RequestException as e:
+                error = e
+
+            retryable = error is not None or response.status_code in RETRY_STATUS_CODES
+            if not retryable or attempt >= self.max_retries:
+                break
+            if not provider["budget"].try_withdraw():
+                self._count(provider, "retries_denied")
+                break
+
+            self._count(provider, "retries")
+            if response is not None:
+                response.close()
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+        latency = time.perf_counter() - started
+        with self._lock:
+            stats = provider["stats"]
+            stats["total_latency"] += latency
+            stats["max_latency"] = max(stats["max_latency"], latency)
+
+        if retryable:
+            breaker.record_failure()
+            self._count(provider, "errors")
+            if error is not None:
+                raise error
+        else:
+            breaker.record_success()
+            self._count(provider, "successes")
+        return response
+
+    def get_stats(self):
+        """Return per-provider latency, error and circuit breaker metrics"""
+        with self._lock:
+            providers = {name: (dict(p["stats"]), p["breaker"]) for name, p in self._providers.items()}
+
+        result = {}
+        for name, (stats, breaker) in providers.items():
+            requests_made = stats["requests"]
+            result[name] = {
+                "requests": requests_made,
+                "attempts": stats["attempts"],
+                "successes": stats["successes"],
+                "errors": stats["errors"],
+                "error_rate": stats["errors"] / requests_made if requests_made else 0.0,
+                "retries": stats["retries"],
+                "retries_denied": stats["retries_denied"],
+                "short_circuited": stats["short_circuited"],
+                "avg_latency_ms": stats["total_latency"] / requests_made * 1000.0 if requests_made else 0.0,
+                "max_latency_ms": stats["max_latency"] * 1000.0,
+                "circuit": breaker.get_state()
+            }
+        return result
+
+    def close(self):
+        """Close pooled connections"""
+        self.session.close()
@@ -0,0 +1,180 @@
+"""
+Upload Derivatives (Thumbnails and Display Images)
+==================================================
+Produces small WebP/JPEG variants of each upload once, in the background,
+so the history and results pages never download multi-megabyte originals.
+
+Files are named after the SHA-256 of the original image bytes
+(`<hash[:2]>/<hash>-<variant>.<ext>`), so a given URL never changes
+content and can be cached forever. Re-uploads of the same photo reuse the
+existing files.
+
+The thumbnail is made from the image already decoded for inference when
+one is passed in, so only the display variant needs a decode of its own.
+"""
+
+import io
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps, features
+
+# Longest side in pixels for each variant
+VARIANTS = {
+    'thumb': 320,
+    'display': 1024
+}
+FORMATS = ('webp', 'jpeg') if features.check('webp') else ('jpeg',)
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+SAVE_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True}
+}
+EXIF_ORIENTATION = 0x0112
+
+
+def derivative_name(content_hash, variant, fmt):
+    """Relative path of a derivative (content-addressed)"""
+    return f"{content_hash[:2]}/{content_hash}-{variant}.{EXTENSIONS[fmt]}"
+
+
+def derivative_names(content_hash):
+    """
+    Returns:
+        dict: variant -> {format -> relative path}
+    """
+    return {
+        variant: {fmt: derivative_name(content_hash, variant, fmt) for fmt in FORMATS}
+        for variant in VARIANTS
+    }
+
+
+def _fit(image, max_side):
+    """Downscale (never upscale) so the longest side is at most max_side"""
+    if max(image.size) <= max_side:
+        return image
+    scale = max_side / float(max(image.size))
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    return image.resize(size, Image.LANCZOS)
+
+
+class DerivativeGenerator:
+    """
+    Background generator of content-addressed image variants
+    """
+
+    def __init__(self, output_dir, workers=2):
+        self.output_dir = output_dir
+        os.makedirs(output_dir, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix='derivatives')
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._stats = {
+            "generated": 0,
+            "already_present": 0,
+            "reused_inference_decode": 0,
+            "errors": 0,
+            "total_time": 0.0
+        }
+
+    def path(self, name):
+        return os.path.join(self.output_dir, name)
+
+    def exists(self, content_hash):
+        """True if every variant of this image is already on disk"""
+        return all(
+            os.path.exists(self.path(name))
+            for formats in derivative_names(content_hash).values()
+            for name in formats.values()
+        )
+
+    def submit(self, content_hash, image_bytes, decoded_image=None):
+        """
+        Queue derivative generation for an upload.
+
+        Args:
+            content_hash: SHA-256 hex digest of image_bytes
+            image_bytes: Original upload
+            decoded_image: Optional RGB image already decoded for inference
+
+        Returns:
+            dict: variant -> {format -> relative path} (files appear shortly)
+        """
+        names = derivative_names(content_hash)
+        with self._lock:
+            if content_hash in self._pending:
+                return names
+            if self.exists(content_hash):
+                self._stats["already_present"] += 1
+                return names
+            self._pending[content_hash] = self._executor.submit(
+                self._generate, content_hash, image_bytes, decoded_image
+            )
+        return names
+
+    def wait(self, content_hash, timeout=5.0):
+        """Block until a queued generation for content_hash has finished"""
+        with self._lock:
+            future = self._pending.get(content_hash)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception:
+                pass
+
+    def _generate(self, content_hash, image_bytes, decoded_image):
+        started = time.perf_counter()
+        try:
+            self._write_variants(content_hash, image_bytes, decoded_image)
+            with self._lock:
+                self._stats["generated"] += 1
+                self._stats["total_time"] += time.perf_counter() - started
+        except Exception as e:
+            print(f"❌ Error generating derivatives for {content_hash[:12]}: {str(e)}")
+            with self._lock:
+                self._stats["errors"] += 1
+        finally:
+            with self._lock:
+                self._pending.pop(content_hash, None)
+
+    def _write_variants(self, content_hash, image_bytes, decoded_image):
+        source = Image.open(io.BytesIO(image_bytes))
+        orientation = source.getexif().get(EXIF_ORIENTATION, 1)
+
+        # Display variant: DCT-scaled decode straight to about 1024px
+        display_size = VARIANTS['display']
+        if source.format == 'JPEG':
+            source.draft('RGB', (display_size, display_size))
+        display = _fit(ImageOps.exif_transpose(source).convert('RGB'), display_size)
+
+        # Thumbnail: reuse the inference decode if it is upright and big enough
+        thumb_size = VARIANTS['thumb']
+        if decoded_image is not None and orientation == 1 and (
+                max(decoded_image.size) >= thumb_size or max(display.size) <= max(decoded_image.size)):
+            thumb = _fit(decoded_image, thumb_size)
+            with self._lock:
+                self._stats["reused_inference_decode"] += 1
+        else:
+            thumb = _fit(display, thumb_size)
+
+        for variant, image in (('thumb', thumb), ('display', display)):
+            for fmt in FORMATS:
+                self._save(image, self.path(derivative_name(content_hash, variant, fmt)), fmt)
+
+    def _save(self, image, path, fmt):
+        """Write atomically so a half-written file is never served"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        image.save(temp_path, **SAVE_OPTIONS[fmt])
+        os.replace(temp_path, path)
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["pending"] = len(self._pending)
+        total_time = stats.pop("total_time")
+        stats["avg_generation_ms"] = total_time / stats["generated"] * 1000.0 if stats["generated"] else 0.0
+        stats["formats"] = list(FORMATS)
+        return stats
@@ -0,0 +1,149 @@
+"""
+Image Preprocessing for Model Input
+===================================
+Fast decoding of uploaded images down to the classifier input size, and a
+fused resize -> float -> normalize step that writes straight into a
+preallocated tensor. Used by both the web routes and offline tools.
+
+JPEGs are decoded with DCT scaling (PIL draft mode) so a 12MP phone photo
+is never fully materialised when the model only needs 224x224 pixels.
+"""
+
+import io
+
+import numpy as np
+import torch
+from PIL import Image
+
+# Model input size and normalization (same as training)
+INPUT_SIZE = (224, 224)
+MEAN = (0.485, 0.456, 0.406)
+STD = (0.229, 0.224, 0.225)
+
+# Built once: normalize(x / 255) == x * SCALE + OFFSET, per channel (CHW)
+_SCALE = (1.0 / (255.0 * np.asarray(STD, dtype=np.float32))).reshape(3, 1, 1)
+_OFFSET = (-np.asarray(MEAN, dtype=np.float32) / np.asarray(STD, dtype=np.float32)).reshape(3, 1, 1)
+
+
+def open_image(image_source):
+    """Open an image from a file path, file-like object or raw bytes"""
+    if isinstance(image_source, (bytes, bytearray)):
+        image_source = io.BytesIO(image_source)
+    return Image.open(image_source)
+
+
+def decode_image(image_source, target_size=INPUT_SIZE, fast=True):
+    """
+    Decode an image to RGB, shrinking it cheaply towards target_size.
+
+    Args:
+        image_source: File path, file-like object or bytes
+        target_size (tuple): Final (width, height) the caller will resize to
+        fast (bool): Use draft mode and integer reduction before the final resize
+
+    Returns:
+        PIL.Image: RGB image no smaller than target_size (unless the source is)
+    """
+    image = open_image(image_source)
+
+    if fast:
+        # JPEG DCT-scaled decoding: picks the largest 1/2, 1/4 or 1/8 scale
+        # that still covers target_size, before any pixels are decoded
+        if image.format == 'JPEG':
+            image.draft('RGB', target_size)
+
+        image = image.convert('RGB')
+
+        # Box-filter integer reduction down to at most 2x the target size
+        factor = min(image.width // (target_size[0] * 2), image.height // (target_size[1] * 2))
+        if factor > 1:
+            image = image.reduce(factor)
+    else:
+        image = image.convert('RGB')
+
+    return image
+
+
+def allocate_batch(batch_size, pin_memory=False):
+    """
+    Allocate an uninitialised (N, 3, H, W) float32 input slab.
+    Pinned memory is only used when CUDA is available.
+    """
+    pin_memory = pin_memory and torch.cuda.is_available()
+    return torch.empty((batch_size, 3, INPUT_SIZE[1], INPUT_SIZE[0]),
+                       dtype=torch.float32, pin_memory=pin_memory)
+
+
+def image_to_tensor(image, out=None):
+    """
+    Resize, convert to float and normalize an RGB image in one pass.
+
+    Args:
+        image (PIL.Image): RGB image
+        out (torch.Tensor): Optional (3, H, W) float32 tensor to write into
+
+    Returns:
+        torch.Tensor: Normalized (3, H, W) tensor (out, if given)
+    """
+    if image.size != INPUT_SIZE:
+        image = image.resize(INPUT_SIZE, Image.BILINEAR)
+
+    pixels = np.asarray(image, dtype=np.uint8).transpose(2, 0, 1)
+
+    if out is None:
+        out = torch.empty((3, INPUT_SIZE[1], INPUT_SIZE[0]), dtype=torch.float32)
+
+    buffer = out.numpy()
+    np.multiply(pixels, _SCALE, out=buffer)
+    buffer += _OFFSET
+    return out
+
+
+def preprocess_image(image_source, out=None):
+    """
+    Decode and normalize an image for the classifier.
+
+    Args:
+        image_source: File path, file-like object or bytes
+        out (torch.Tensor): Optional (3, H, W) slot, e.g. a row of allocate_batch()
+
+    Returns:
+        torch.Tensor: (1, 3, H, W) tensor ready for the model
+    """
+    tensor = image_to_tensor(decode_image(image_source), out=out)
+    return tensor.unsqueeze(0)
+
+
+def preprocess_batch(image_sources, executor=None, pin_memory=False):
+    """
+    Preprocess many images into a single batch slab.
+
+    Args:
+        image_sources (list): Paths, file-like objects or bytes
+        executor: Optional concurrent.futures executor for parallel decoding
+        pin_memory (bool): Allocate the slab in pinned memory (CUDA only)
+
+    Returns:
+        tuple: (batch tensor of the successfully decoded images,
+                list of indices into image_sources that succeeded)
+    """
+    slab = allocate_batch(len(image_sources), pin_memory=pin_memory)
+
+    def fill(index):
+        try:
+            preprocess_image(image_sources[index], out=slab[index])
+            return True
+        except Exception as e:
+            print(f"❌ Error preprocessing image {index}: {str(e)}")
+            return False
+
+    indices = range(len(image_sources))
+    if executor is not None:
+        succeeded = list(executor.map(fill, indices))
+    else:
+        succeeded = [fill(index) for index in indices]
+
+    valid = [index for index, ok in zip(indices, succeeded) if ok]
+    if len(valid) == len(image_sources):
+        return slab, valid
+    return slab[valid], valid
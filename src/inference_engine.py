@@ -0,0 +1,194 @@
+"""
+Dynamic Micro-Batching Inference Engine
+=======================================
+Collects preprocessed image tensors submitted from concurrent requests for a
+short window and runs them through the classifier in a single batched forward
+pass, then fans the per-image probabilities back to the waiting callers.
+Logits are divided by the calibration temperature (src/calibration.py)
+before the softmax.
+"""
+
+import threading
+import time
+import queue
+from concurrent.futures import Future
+
+import torch
+
+
+class BatchingInferenceEngine:
+    """
+    Batching scheduler wrapped around a classification model
+    """
+
+    def __init__(self, model, class_names, max_batch_size=8, max_wait_ms=10, temperature=1.0):
+        self.model = model
+        self.class_names = class_names
+        self.temperature = float(temperature)
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+
+        self._queue = queue.Queue()
+        self._worker = None
+        self._running = False
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "batches": 0,
+            "images": 0,
+            "requests": 0,
+            "total_queue_latency": 0.0,
+            "max_queue_latency": 0.0,
+            "total_inference_time": 0.0
+        }
+
+    def start(self):
+        """Start the background batching worker"""
+        if self._running:
+            return self
+        self._running = True
+        self._worker = threading.Thread(target=self._run, name="inference-engine", daemon=True)
+        self._worker.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Stop the worker after draining already queued requests"""
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put(None)
+        if self._worker is not None:
+            self._worker.join(timeout)
+            self._worker = None
+
+    def submit(self, image_tensor):
+        """
+        Queue a preprocessed tensor of shape (3, H, W) or (N, 3, H, W).
+
+        Returns:
+            Future: resolves to a (N, num_classes) tensor of probabilities
+        """
+        if image_tensor.dim() == 3:
+            image_tensor = image_tensor.unsqueeze(0)
+
+        future = Future()
+        if not self._running:
+            # Engine not started (e.g. offline scripts) - run inline
+            try:
+                future.set_result(self._forward(image_tensor))
+            except Exception as e:
+                future.set_exception(e)
+            return future
+
+        self._queue.put((image_tensor, future, time.perf_counter()))
+        return future
+
+    def predict_proba(self, image_tensor, timeout=None):
+        """Blocking helper returning the probability rows for a tensor"""
+        return self.submit(image_tensor).result(timeout=timeout)
+
+    def predict(self, image_tensor, timeout=None):
+        """
+        Classify a single preprocessed image
+
+        Returns:
+            tuple: (predicted_class, confidence_score)
+        """
+        probabilities = self.predict_proba(image_tensor, timeout=timeout)[0]
+        confidence, predicted_idx = torch.max(probabilities, 0)
+        return self.class_names[predicted_idx.item()], confidence.item()
+
+    def _forward(self, batch):
+        with torch.no_grad():
+            outputs = self.model(batch)
+            return torch.nn.functional.softmax(outputs / self.temperature, dim=1)
+
+    def _collect_batch(self, first_item):
+        """Gather queued requests until the batch is full or the window closes"""
+        items = [first_item]
+        rows = first_item[0].shape[0]
+        deadline = time.perf_counter() + self.max_wait
+
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Re-queue the sentinel so the run loop sees it
+                self._queue.put(None)
+                break
+            items.append(item)
+            rows += item[0].shape[0]
+
+        return items, rows
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                if not self._running and self._queue.empty():
+                    break
+                continue
+
+            items, rows = self._collect_batch(item)
+            dispatched_at = time.perf_counter()
+
+            try:
+                batch = torch.cat([tensor for tensor, _, _ in items], dim=0)
+                probabilities = self._forward(batch)
+            except Exception as e:
+                for _, future, _ in items:
+                    future.set_exception(e)
+                continue
+
+            inference_time = time.perf_counter() - dispatched_at
+
+            offset = 0
+            for tensor, future, _ in items:
+                count = tensor.shape[0]
+                future.set_result(probabilities[offset:offset + count])
+                offset += count
+
+            latencies = [dispatched_at - enqueued_at for _, _, enqueued_at in items]
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["images"] += rows
+                self._stats["requests"] += len(items)
+                self._stats["total_queue_latency"] += sum(latencies)
+                self._stats["max_queue_latency"] = max(self._stats["max_queue_latency"], max(latencies))
+                self._stats["total_inference_time"] += inference_time
+
+    def get_stats(self):
+        """Return batch fill rate and queue latency metrics"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+
+        batches = stats["batches"]
+        requests = stats["requests"]
+        return {
+            "running": self._running,
+            "mode": "in_process",
+            "temperature": self.temperature,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self._queue.qsize(),
+            "batches": batches,
+            "images": stats["images"],
+            "requests": requests,
+            "avg_batch_size": stats["images"] / batches if batches else 0.0,
+            "batch_fill_rate": stats["images"] / (batches * self.max_batch_size) if batches else 0.0,
+            "avg_queue_latency_ms": stats["total_queue_latency"] / requests * 1000.0 if requests else 0.0,
+            "max_queue_latency_ms": stats["max_queue_latency"] * 1000.0,
+            "avg_inference_ms": stats["total_inference_time"] / batches * 1000.0 if batches else 0.0
+        }
+
+    def reset_stats(self):
+        """Clear collected metrics"""
+        with self._stats_lock:
+            self._reset_stats()
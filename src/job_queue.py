@@ -0,0 +1,166 @@
+"""
+Background Job Queue
+====================
+Runs slow follow-up work (the weather/Wikipedia enrichment of an analysis)
+off the request thread. Each job has a fixed list of named steps; the job
+function reports steps as they finish, so pollers and Server-Sent-Event
+subscribers can show real progress and the sections that are ready.
+
+Jobs live in memory in the web process. Finished jobs are kept for
+`finished_ttl` seconds, so clients can still fetch the outcome after it
+completes.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueue:
+    """
+    Thread-pool backed job queue with per-step progress tracking
+    """
+
+    def __init__(self, workers=2, finished_ttl=3600):
+        self.finished_ttl = finished_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix='job')
+        self._jobs = {}
+        self._changed = threading.Condition()
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0}
+
+    def submit(self, fn, steps, job_id=None, completed_steps=()):
+        """
+        Queue fn(report) where report(step, data=None) marks a step as done
+        and optionally publishes its data as a section of the job.
+
+        Args:
+            fn: Job function; its return value becomes the job result
+            steps: Ordered step names used for progress
+            job_id: Optional id (defaults to a new UUID)
+            completed_steps: Steps already finished before the job was queued
+
+        Returns:
+            str: job id
+        """
+        job_id = job_id or str(uuid.uuid4())
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "steps": list(steps),
+            "completed_steps": [step for step in completed_steps if step in steps],
+            "sections": {},
+            "result": None,
+            "error": None,
+            "version": 0,
+            "created_at": time.time(),
+            "finished_at": None
+        }
+
+        with self._changed:
+            self._prune()
+            self._jobs[job_id] = job
+            self._stats["submitted"] += 1
+
+        self._executor.submit(self._run, job_id, fn)
+        return job_id
+
+    def _update(self, job_id, **changes):
+        """Apply changes to a job and wake any waiters"""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            step = changes.pop("step", None)
+            data = changes.pop("data", None)
+            if step is not None:
+                if step not in job["completed_steps"]:
+                    job["completed_steps"].append(step)
+                if data is not None:
+                    job["sections"][step] = data
+            job.update(changes)
+            job["version"] += 1
+            self._changed.notify_all()
+
+    def _run(self, job_id, fn):
+        self._update(job_id, status="running")
+
+        def report(step, data=None):
+            self._update(job_id, step=step, data=data)
+
+        try:
+            result = fn(report)
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {str(e)}")
+            self._update(job_id, status="failed", error=str(e), finished_at=time.time())
+            with self._changed:
+                self._stats["failed"] += 1
+            return
+
+        with self._changed:
+            job = self._jobs.get(job_id)
+            steps = list(job["steps"]) if job else []
+        self._update(job_id, status="done", result=result, completed_steps=steps, finished_at=time.time())
+        with self._changed:
+            self._stats["completed"] += 1
+
+    def _prune(self):
+        """Forget jobs that finished more than finished_ttl ago (caller holds the lock)"""
+        cutoff = time.time() - self.finished_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job["finished_at"] is not None and job["finished_at"] < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def _snapshot(self, job):
+        total = len(job["steps"])
+        completed = len(job["completed_steps"])
+        return {
+            "job_id": job["job_id"],
+            "status": job["status"],
+            "progress": {
+                "completed": completed,
+                "total": total,
+                "percent": round(completed / total * 100.0, 1) if total else 100.0,
+                "steps": job["steps"],
+                "completed_steps": list(job["completed_steps"])
+            },
+            "sections": dict(job["sections"]),
+            "result": job["result"],
+            "error": job["error"],
+            "version": job["version"]
+        }
+
+    def get(self, job_id):
+        """Return a snapshot of a job, or None if unknown"""
+        with self._changed:
+            job = self._jobs.get(job_id)
+            return self._snapshot(job) if job else None
+
+    def wait_for_update(self, job_id, version, timeout=15.0):
+        """
+        Block until the job changes past `version` (or the timeout passes)
+
+        Returns:
+            dict: job snapshot, or None if the job is unknown
+        """
+        deadline = time.monotonic() + timeout
+        with self._changed:
+            while True:
+                job = self._jobs.get(job_id)
+                if job is None or job["version"] > version or job["status"] in ("done", "failed"):
+                    return self._snapshot(job) if job else None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return self._snapshot(job)
+                self._changed.wait(remaining)
+
+    def get_stats(self):
+        """Return queue depth and job counters"""
+        with self._changed:
+            stats = dict(self._stats)
+            statuses = [job["status"] for job in self._jobs.values()]
+        stats["queued"] = statuses.count("queued")
+        stats["running"] = statuses.count("running")
+        stats["tracked"] = len(statuses)
+        return stats
@@ -0,0 +1,179 @@
+"""
+Persistent TTL Cache for External Lookups
+=========================================
+Two-tier (in-memory + SQLite) cache with a freshness TTL and a
+stale-while-revalidate window: fresh entries are returned directly, stale
+entries are returned immediately while a background refresh runs, and only
+missing or expired entries block on the fetch.
+
+Used in front of the Wikipedia lookups in SimpleEnhancedPlantCare, whose
+answers for the 38 classes are almost static.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_TTL = 7 * 24 * 3600         # Serve without refreshing for a week
+DEFAULT_STALE_TTL = 30 * 24 * 3600  # Serve stale (refreshing in background) for a month
+
+
+def is_cacheable(result):
+    """Only cache definitive answers, not transient API errors"""
+    return isinstance(result, dict) and result.get('status') in ('success', 'not_found')
+
+
+class LookupCache:
+    """
+    Key/value cache of JSON-serialisable lookup results
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, stale_ttl=DEFAULT_STALE_TTL, max_memory_entries=4096):
+        self.path = path
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_memory_entries = max_memory_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._stats = {
+            "fresh_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "refreshes": 0,
+            "fetch_errors": 0
+        }
+
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS lookups ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def _remember(self, key, value, stored_at):
+        """Insert into the in-memory tier (caller holds the lock)"""
+        self._memory[key] = (value, stored_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _read(self, key):
+        """Return (value, stored_at) from memory or SQLite (caller holds the lock)"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            self._memory.move_to_end(key)
+            return entry
+
+        if self._db is not None:
+            row = self._db.execute("SELECT value, stored_at FROM lookups WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                entry = (json.loads(row[0]), row[1])
+                self._remember(key, entry[0], entry[1])
+                return entry
+
+        return None
+
+    def get(self, key):
+        """
+        Returns:
+            tuple: (value, state) with state 'fresh' or 'stale', or None if
+            missing / past the stale window
+        """
+        with self._lock:
+            entry = self._read(key)
+        if entry is None:
+            return None
+
+        value, stored_at = entry
+        age = time.time() - stored_at
+        if age <= self.ttl:
+            return value, 'fresh'
+        if age <= self.ttl + self.stale_ttl:
+            return value, 'stale'
+        return None
+
+    def set(self, key, value):
+        """Store a value in both tiers"""
+        stored_at = time.time()
+        with self._lock:
+            self._remember(key, value, stored_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO lookups (key, value, stored_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), stored_at)
+                )
+                self._db.commit()
+
+    def _refresh(self, key, fetch, cacheable):
+        try:
+            value = fetch()
+            if cacheable(value):
+                self.set(key, value)
+            else:
+                with self._lock:
+                    self._stats["fetch_errors"] += 1
+        except Exception:
+            with self._lock:
+                self._stats["fetch_errors"] += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def get_or_fetch(self, key, fetch, cacheable=is_cacheable):
+        """
+        Return the cached value for key, calling fetch() on a miss.
+        Stale values are returned immediately and refreshed in the background.
+        """
+        cached = self.get(key)
+
+        if cached is not None:
+            value, state = cached
+            with self._lock:
+                if state == 'fresh':
+                    self._stats["fresh_hits"] += 1
+                    return value
+                self._stats["stale_hits"] += 1
+                start_refresh = key not in self._refreshing
+                if start_refresh:
+                    self._refreshing.add(key)
+                    self._stats["refreshes"] += 1
+            if start_refresh:
+                threading.Thread(target=self._refresh, args=(key, fetch, cacheable), daemon=True).start()
+            return value
+
+        with self._lock:
+            self._stats["misses"] += 1
+        value = fetch()
+        if cacheable(value):
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """Remove all entries from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM lookups")
+                self._db.commit()
+
+    def get_stats(self):
+        """Return hit/miss counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                stats["stored_entries"] = self._db.execute("SELECT COUNT(*) FROM lookups").fetchone()[0]
+
+        lookups = stats["fresh_hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["fresh_hits"] + stats["stale_hits"]) / lookups if lookups else 0.0
+        stats["persistent"] = self._db is not None
+        return stats
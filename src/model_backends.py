@@ -0,0 +1,407 @@
+"""
+Model Backends and Export
+=========================
+Loads the plant disease classifier from the training checkpoint and produces
+deployment variants of it:
+
+    torchscript   - TorchScript, frozen
+    dynamic_int8  - dynamic INT8 quantization (Linear layers), TorchScript
+    static_int8   - static INT8 quantization (fused conv/bn/relu), TorchScript
+    onnx          - ONNX graph run with onnxruntime (optional dependency)
+
+Command line:
+    python -m src.model_backends export --formats torchscript onnx
+    python -m src.model_backends export --formats static_int8 --calibration-dir path/to/images
+    python -m src.model_backends compare --data-dir path/to/labeled_images
+"""
+
+import argparse
+import json
+import os
+import time
+
+import torch
+import torchvision.models as models
+
+from .image_preprocessing import INPUT_SIZE, preprocess_batch
+
+MODEL_DIR = "model"
+CHECKPOINT_NAME = "plant_disease_classifier.pth"
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif')
+
+BACKENDS = ('pytorch', 'torchscript', 'dynamic_int8', 'static_int8', 'onnx')
+
+ARTIFACT_NAMES = {
+    'pytorch': CHECKPOINT_NAME,
+    'torchscript': "plant_disease_classifier_torchscript.pt",
+    'dynamic_int8': "plant_disease_classifier_dynamic_int8.pt",
+    'static_int8': "plant_disease_classifier_static_int8.pt",
+    'onnx': "plant_disease_classifier.onnx"
+}
+
+
+def artifact_path(backend, model_dir=MODEL_DIR):
+    """Path of the artifact file for a backend"""
+    if backend not in ARTIFACT_NAMES:
+        raise ValueError(f"Unknown model backend '{backend}' (choose from {', '.join(BACKENDS)})")
+    return os.path.join(model_dir, ARTIFACT_NAMES[backend])
+
+
+def model_version(backend='pytorch', model_dir=MODEL_DIR):
+    """
+    Cheap identifier for the loaded weights (backend, artifact size and
+    modification time), used to invalidate cached predictions on model updates
+    """
+    path = artifact_path(backend, model_dir)
+    stat = os.stat(path)
+    return f"{backend}:{os.path.basename(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def metadata_path(path):
+    """Sidecar JSON holding class names for an exported artifact"""
+    return os.path.splitext(path)[0] + ".json"
+
+
+def _example_input(batch_size=1):
+    return torch.randn(batch_size, 3, INPUT_SIZE[1], INPUT_SIZE[0])
+
+
+def _select_quantized_engine():
+    """Pick the best available INT8 kernel backend for this CPU"""
+    for engine in ('x86', 'fbgemm', 'qnnpack'):
+        if engine in torch.backends.quantized.supported_engines:
+            torch.backends.quantized.engine = engine
+            return engine
+    return torch.backends.quantized.engine
+
+
+def _load_checkpoint(model_path):
+    """
+    Load a checkpoint memory-mapped, so weights are paged in from the file
+    on demand instead of being read and copied up front
+    """
+    try:
+        return torch.load(model_path, map_location="cpu", mmap=True, weights_only=False)
+    except RuntimeError:
+        # Legacy (non-zipfile) checkpoints can't be memory-mapped
+        return torch.load(model_path, map_location="cpu", weights_only=False)
+
+
+def load_checkpoint_model(model_path=None, quantizable=False):
+    """
+    Build the float ResNet-50 classifier from the training checkpoint
+
+    Args:
+        model_path (str): Path to plant_disease_classifier.pth
+        quantizable (bool): Build torchvision's quantization-ready ResNet-50
+
+    Returns:
+        tuple: (model in eval mode, class_names)
+    """
+    model_path = model_path or os.path.join(MODEL_DIR, CHECKPOINT_NAME)
+    checkpoint = _load_checkpoint(model_path)
+
+    # Get class names and create model
+    class_names = checkpoint['class_names']
+    num_classes = len(class_names)
+
+    if 'model_state_dict' not in checkpoint:
+        return checkpoint['model'].eval(), class_names
+
+    # Create model architecture on the meta device: no memory is allocated
+    # and no random initialization runs, since every weight is overwritten
+    with torch.device('meta'):
+        if quantizable:
+            model = models.quantization.resnet50(weights=None, quantize=False)
+        else:
+            model = models.resnet50(weights=None)
+        model.fc = torch.nn.Linear(model.fc.in_features, num_classes)
+
+    # Load weights, adopting the (memory-mapped) checkpoint tensors directly
+    model.load_state_dict(checkpoint['model_state_dict'], assign=True)
+    model.eval()
+
+    return model, class_names
+
+
+def _save_torchscript(module, path, class_names, backend):
+    module.save(path)
+    with open(metadata_path(path), 'w') as f:
+        json.dump({"backend": backend, "class_names": class_names}, f, indent=2)
+    return path
+
+
+def export_torchscript(model, class_names, path):
+    """Script and freeze the float model"""
+    scripted = torch.jit.freeze(torch.jit.script(model.eval()))
+    return _save_torchscript(scripted, path, class_names, 'torchscript')
+
+
+def export_dynamic_int8(model, class_names, path):
+    """Dynamically quantize Linear layers to INT8 and trace"""
+    _select_quantized_engine()
+    quantized = torch.ao.quantization.quantize_dynamic(model.eval(), {torch.nn.Linear}, dtype=torch.qint8)
+    with torch.no_grad():
+        traced = torch.jit.freeze(torch.jit.trace(quantized, _example_input()))
+    return _save_torchscript(traced, path, class_names, 'dynamic_int8')
+
+
+def export_static_int8(model_path, path, calibration_images, batch_size=16):
+    """
+    Statically quantize the whole network to INT8
+
+    Args:
+        model_path (str): Float checkpoint
+        path (str): Output artifact path
+        calibration_images (list): Image paths used to calibrate activation ranges
+    """
+    if not calibration_images:
+        raise ValueError("Static quantization needs calibration images (--calibration-dir)")
+
+    engine = _select_quantized_engine()
+    model, class_names = load_checkpoint_model(model_path, quantizable=True)
+    model.fuse_model()
+    model.qconfig = torch.ao.quantization.get_default_qconfig(engine)
+    torch.ao.quantization.prepare(model, inplace=True)
+
+    # Calibrate activation observers
+    with torch.no_grad():
+        for start in range(0, len(calibration_images), batch_size):
+            batch, valid = preprocess_batch(calibration_images[start:start + batch_size])
+            if valid:
+                model(batch)
+
+    torch.ao.quantization.convert(model, inplace=True)
+    with torch.no_grad():
+        traced = torch.jit.freeze(torch.jit.trace(model, _example_input()))
+    return _save_torchscript(traced, path, class_names, 'static_int8')
+
+
+def export_onnx(model, class_names, path):
+    """Export the float model to ONNX with a dynamic batch dimension"""
+    torch.onnx.export(
+        model.eval(), (_example_input(),), path,
+        input_names=['input'], output_names=['logits'],
+        dynamic_axes={'input': {0: 'batch'}, 'logits': {0: 'batch'}},
+        dynamo=False
+    )
+    with open(metadata_path(path), 'w') as f:
+        json.dump({"backend": "onnx", "class_names": class_names}, f, indent=2)
+    return path
+
+
+class OnnxModel:
+    """
+    Callable wrapper giving an onnxruntime session the same interface as a
+    torch model (tensor in, logits tensor out)
+    """
+
+    def __init__(self, path, num_threads=None):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("onnxruntime is required for the 'onnx' backend: pip install onnxruntime")
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+
+    def __call__(self, batch):
+        outputs = self.session.run(None, {self.input_name: batch.contiguous().numpy()})
+        return torch.from_numpy(outputs[0])
+
+    def eval(self):
+        return self
+
+
+def load_backend(backend='pytorch', model_dir=MODEL_DIR):
+    """
+    Load the classifier for the selected backend
+
+    Returns:
+        tuple: (callable model, class_names)
+    """
+    path = artifact_path(backend, model_dir)
+
+    if backend == 'pytorch':
+        return load_checkpoint_model(path)
+
+    if not os.path.exists(path):
+        raise FileNotFoundError(
+            f"{path} not found - run: python -m src.model_backends export --formats {backend}"
+        )
+
+    with open(metadata_path(path), 'r') as f:
+        class_names = json.load(f)['class_names']
+
+    if backend == 'onnx':
+        return OnnxModel(path), class_names
+
+    if backend in ('dynamic_int8', 'static_int8'):
+        _select_quantized_engine()
+
+    return torch.jit.load(path, map_location="cpu").eval(), class_names
+
+
+def find_images(directory, limit=None):
+    """Recursively list image files under a directory"""
+    images = []
+    for root, _, files in sorted(os.walk(directory)):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                images.append(os.path.join(root, name))
+                if limit and len(images) >= limit:
+                    return images
+    return images
+
+
+def load_labeled_folder(data_dir, class_names, limit_per_class=None):
+    """
+    Collect (image_path, class_index) pairs from an ImageFolder-style
+    directory whose sub-folders are named after the model classes
+    """
+    samples = []
+    for class_name in sorted(os.listdir(data_dir)):
+        class_dir = os.path.join(data_dir, class_name)
+        if not os.path.isdir(class_dir) or class_name not in class_names:
+            continue
+        label = class_names.index(class_name)
+        for path in find_images(class_dir, limit=limit_per_class):
+            samples.append((path, label))
+    return samples
+
+
+def evaluate_backend(model, samples, batch_size=16):
+    """Return accuracy and latency figures for one backend"""
+    correct = 0
+    total = 0
+    inference_time = 0.0
+
+    with torch.no_grad():
+        # Warm-up pass so one-off graph optimizations aren't timed
+        model(_example_input())
+
+        for start in range(0, len(samples), batch_size):
+            chunk = samples[start:start + batch_size]
+            batch, valid = preprocess_batch([path for path, _ in chunk])
+            if not valid:
+                continue
+
+            started = time.perf_counter()
+            outputs = model(batch)
+            inference_time += time.perf_counter() - started
+
+            predictions = outputs.argmax(dim=1).tolist()
+            correct += sum(1 for i, predicted in zip(valid, predictions) if chunk[i][1] == predicted)
+            total += len(valid)
+
+    return {
+        "images": total,
+        "accuracy": correct / total if total else 0.0,
+        "ms_per_image": inference_time / total * 1000.0 if total else 0.0
+    }
+
+
+def compare_backends(data_dir, backends=BACKENDS, model_dir=MODEL_DIR, batch_size=16,
+                     limit_per_class=None):
+    """
+    Evaluate every available backend over a labeled image folder
+
+    Returns:
+        dict: backend -> metrics (or an error message)
+    """
+    report = {}
+    samples = None
+
+    for backend in backends:
+        try:
+            model, class_names = load_backend(backend, model_dir)
+        except Exception as e:
+            report[backend] = {"error": str(e)}
+            continue
+
+        if samples is None:
+            samples = load_labeled_folder(data_dir, class_names, limit_per_class)
+            if not samples:
+                raise ValueError(f"No labeled images found in {data_dir}")
+
+        metrics = evaluate_backend(model, samples, batch_size=batch_size)
+        metrics["size_mb"] = os.path.getsize(artifact_path(backend, model_dir)) / 1024.0 / 1024.0
+        report[backend] = metrics
+
+    return report
+
+
+def print_report(report):
+    """Pretty-print an accuracy-vs-latency comparison"""
+    print("\n📊 BACKEND COMPARISON")
+    print("=" * 64)
+    print(f"{'backend':<14} {'images':>7} {'accuracy':>9} {'ms/image':>9} {'size MB':>8}")
+
+    baseline = report.get('pytorch', {}).get('ms_per_image')
+    for backend, metrics in report.items():
+        if 'error' in metrics:
+            print(f"{backend:<14} ⚠️ {metrics['error']}")
+            continue
+        line = (f"{backend:<14} {metrics['images']:>7} {metrics['accuracy']:>8.2%} "
+                f"{metrics['ms_per_image']:>9.2f} {metrics['size_mb']:>8.1f}")
+        if baseline and metrics['ms_per_image']:
+            line += f"  ({baseline / metrics['ms_per_image']:.2f}x)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export and compare plant disease model backends")
+    parser.add_argument('--model-dir', default=MODEL_DIR, help='Directory holding the checkpoint and artifacts')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Export deployment variants of the checkpoint')
+    export_parser.add_argument('--formats', nargs='+', default=['torchscript', 'dynamic_int8', 'onnx'],
+                               choices=[b for b in BACKENDS if b != 'pytorch'])
+    export_parser.add_argument('--calibration-dir', help='Images used to calibrate static INT8 quantization')
+    export_parser.add_argument('--calibration-size', type=int, default=256)
+
+    compare_parser = subparsers.add_parser('compare', help='Accuracy vs latency over a labeled folder')
+    compare_parser.add_argument('--data-dir', required=True, help='Folder with one sub-folder per class')
+    compare_parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=BACKENDS)
+    compare_parser.add_argument('--batch-size', type=int, default=16)
+    compare_parser.add_argument('--limit-per-class', type=int, default=None)
+    compare_parser.add_argument('--output', help='Also write the report to this JSON file')
+
+    args = parser.parse_args()
+    checkpoint_path = artifact_path('pytorch', args.model_dir)
+
+    if args.command == 'export':
+        model, class_names = load_checkpoint_model(checkpoint_path)
+
+        for backend in args.formats:
+            path = artifact_path(backend, args.model_dir)
+            try:
+                if backend == 'torchscript':
+                    export_torchscript(model, class_names, path)
+                elif backend == 'dynamic_int8':
+                    export_dynamic_int8(model, class_names, path)
+                elif backend == 'static_int8':
+                    calibration_images = find_images(args.calibration_dir, args.calibration_size) \
+                        if args.calibration_dir else []
+                    export_static_int8(checkpoint_path, path, calibration_images)
+                elif backend == 'onnx':
+                    export_onnx(model, class_names, path)
+                print(f"✅ {backend}: {path}")
+            except Exception as e:
+                print(f"❌ {backend} export failed: {str(e)}")
+
+    elif args.command == 'compare':
+        report = compare_backends(args.data_dir, args.backends, args.model_dir,
+                                  batch_size=args.batch_size, limit_per_class=args.limit_per_class)
+        print_report(report)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=2)
+            print(f"\n📁 Report saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
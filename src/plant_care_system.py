@@ -5,307 +5,114 @@ specific fertilizer and manure recommendations based on plant type and disease.
 """
 
 import json
+import threading
+from types import MappingProxyType
+
+try:
+    from .class_names import CLASS_NAMES
+    from .recommendation_store import freeze, get_recommendation_store, thaw
+    from .calibration import DEFAULT_REVIEW_THRESHOLD
+except ImportError:
+    from class_names import CLASS_NAMES
+    from recommendation_store import freeze, get_recommendation_store, thaw
+    from calibration import DEFAULT_REVIEW_THRESHOLD
+
+LOW_CONFIDENCE_WARNING = "Low confidence - consider manual verification"
+
+GENERIC_HEALTHY_RECOMMENDATIONS = {
+    "immediate_treatment": ["Continue current care routine", "Monitor regularly"],
+    "fertilizer_recommendations": ["Balanced NPK fertilizer", "Seasonal adjustments as needed"],
+    "organic_manure": ["Well-composted organic matter", "Seasonal compost applications"],
+    "soil_amendments": ["Maintain proper pH", "Regular soil testing"],
+    "prevention": ["Continue good practices", "Regular monitoring"]
+}
+
+GENERIC_DISEASE_RECOMMENDATIONS = {
+    "immediate_treatment": ["Remove infected plant parts", "Improve air circulation", "Apply appropriate fungicide/bactericide"],
+    "fertilizer_recommendations": ["Reduce nitrogen", "Increase potassium for disease resistance", "Ensure adequate calcium"],
+    "organic_manure": ["Well-aged compost only", "Avoid fresh manure during disease"],
+    "soil_amendments": ["Improve drainage", "Maintain optimal pH", "Add organic matter"],
+    "prevention": ["Use resistant varieties", "Improve growing conditions", "Regular monitoring"]
+}
+
+GENERAL_CARE_TIPS = freeze({
+    "Apple": {
+        "watering": "Deep, infrequent watering - avoid wetting leaves",
+        "pruning": "Prune in late winter for air circulation",
+        "harvest": "Harvest when fruit comes off easily with upward twist"
+    },
+    "Tomato": {
+        "watering": "Consistent moisture - 1-2 inches per week",
+        "pruning": "Remove suckers, lower leaves touching ground",
+        "harvest": "Pick when fully colored but still firm"
+    },
+    "Potato": {
+        "watering": "Consistent moisture, especially during tuber formation",
+        "hilling": "Hill soil around plants as they grow",
+        "harvest": "Harvest after plant dies back naturally"
+    }
+})
+
+DEFAULT_CARE_TIPS = freeze({
+    "watering": "Maintain consistent moisture levels",
+    "care": "Follow best practices for this plant type",
+    "monitoring": "Regular inspection for pests and diseases"
+})
+
+WEEKLY_TASKS = (
+    "Monitor plant health",
+    "Check soil moisture",
+    "Apply organic fertilizer if scheduled"
+)
+
+MONTHLY_TASKS = (
+    "Soil pH testing",
+    "Apply compost or manure as recommended",
+    "Disease prevention treatments"
+)
+
+SEASONAL_TASKS = freeze({
+    "spring": ["Apply base fertilizer", "Begin regular watering", "Start disease monitoring"],
+    "summer": ["Increase watering frequency", "Apply potassium fertilizer", "Harvest as ready"],
+    "fall": ["Reduce watering", "Apply phosphorus fertilizer", "Prepare for dormancy"],
+    "winter": ["Minimal watering", "Plan for next season", "Equipment maintenance"]
+})
+
 
 class PlantCareRecommendationSystem:
-    def __init__(self):
-        self.recommendations = self._build_recommendation_database()
+    def __init__(self, store=None, review_threshold=DEFAULT_REVIEW_THRESHOLD):
+        # The database comes from the shared, hot-reloadable store
+        # (data/care_recommendations.json)
+        self.store = store if store is not None else get_recommendation_store()
+        # Calibrated confidence below which a prediction should be verified
+        # (the app sets the threshold fitted by src/calibration.py)
+        self.review_threshold = review_threshold
+        self._tables = None
+        self._current_tables()
+    
+    @property
+    def recommendations(self):
+        """Detailed recommendations by class (frozen; edit the JSON file instead)"""
+        return self._current_tables()[1]
+    
+    def _current_tables(self):
+        """
+        (snapshot, database, payloads, schedules) for the store's current
+        version; the lookup tables are rebuilt when the file is reloaded
+        """
+        snapshot = self.store.snapshot()
+        tables = self._tables
+        if tables is None or tables[0] is not snapshot:
+            tables = (snapshot, snapshot[1]) + self._build_lookup_tables(snapshot[1])
+            self._tables = tables
+        return tables
     
     def _build_recommendation_database(self):
         """
         Comprehensive database of fertilizer and manure recommendations
         for each plant type and disease condition.
         """
-        recommendations = {
-            # APPLE RECOMMENDATIONS
-            "Apple___Apple_scab": {
-                "disease_info": "Fungal disease causing dark spots on leaves and fruit",
-                "immediate_treatment": [
-                    "Remove infected leaves and fruit immediately",
-                    "Apply copper-based fungicide spray",
-                    "Improve air circulation around tree"
-                ],
-                "fertilizer_recommendations": [
-                    "Balanced NPK fertilizer (10-10-10) in early spring",
-                    "Potassium sulfate to boost disease resistance",
-                    "Calcium supplement to strengthen cell walls"
-                ],
-                "organic_manure": [
-                    "Well-composted cow manure (2-3 inches around tree base)",
-                    "Bone meal for phosphorus",
-                    "Wood ash for potassium (small amounts)"
-                ],
-                "soil_amendments": [
-                    "Ensure good drainage",
-                    "Maintain soil pH 6.0-7.0",
-                    "Add organic compost to improve soil health"
-                ],
-                "prevention": [
-                    "Plant disease-resistant apple varieties",
-                    "Prune for good air circulation",
-                    "Fall cleanup of fallen leaves"
-                ]
-            },
-            
-            "Apple___Black_rot": {
-                "disease_info": "Fungal disease causing fruit rot and cankers",
-                "immediate_treatment": [
-                    "Remove all infected fruit and wood",
-                    "Apply copper fungicide during dormant season",
-                    "Prune out cankers below infection point"
-                ],
-                "fertilizer_recommendations": [
-                    "Balanced fertilizer (12-12-12) in spring",
-                    "Avoid high nitrogen in late season",
-                    "Magnesium sulfate if leaves show yellowing"
-                ],
-                "organic_manure": [
-                    "Aged horse manure",
-                    "Compost tea applications",
-                    "Fish emulsion for nitrogen"
-                ],
-                "soil_amendments": [
-                    "Improve soil drainage",
-                    "Add perlite if soil is heavy clay",
-                    "Maintain soil pH 6.5-7.0"
-                ],
-                "prevention": [
-                    "Choose resistant rootstocks",
-                    "Avoid overhead watering",
-                    "Regular pruning for air flow"
-                ]
-            },
-            
-            "Apple___Cedar_apple_rust": {
-                "disease_info": "Fungal disease alternating between apple and cedar trees",
-                "immediate_treatment": [
-                    "Apply preventive fungicide in early spring",
-                    "Remove nearby cedar trees if possible",
-                    "Use systemic fungicides for severe cases"
-                ],
-                "fertilizer_recommendations": [
-                    "Low nitrogen fertilizer to reduce susceptibility",
-                    "Phosphorus and potassium emphasis",
-                    "Zinc and iron supplements"
-                ],
-                "organic_manure": [
-                    "Well-aged chicken manure (low nitrogen)",
-                    "Kelp meal for trace minerals",
-                    "Rock phosphate for phosphorus"
-                ],
-                "soil_amendments": [
-                    "Ensure excellent drainage",
-                    "Add sand to heavy soils",
-                    "Maintain slightly acidic soil (pH 6.0-6.5)"
-                ],
-                "prevention": [
-                    "Plant resistant apple varieties",
-                    "Remove alternate hosts (cedar trees)",
-                    "Spring fungicide applications"
-                ]
-            },
-            
-            "Apple___healthy": {
-                "disease_info": "Healthy apple tree - maintain optimal nutrition",
-                "immediate_treatment": [
-                    "Continue regular maintenance",
-                    "Monitor for early disease signs",
-                    "Maintain proper pruning schedule"
-                ],
-                "fertilizer_recommendations": [
-                    "Balanced NPK (10-10-10) in early spring",
-                    "Calcium for strong fruit development",
-                    "Boron for good fruit set"
-                ],
-                "organic_manure": [
-                    "Composted cow manure annually",
-                    "Bone meal in spring",
-                    "Kelp meal for micronutrients"
-                ],
-                "soil_amendments": [
-                    "Maintain soil pH 6.0-7.0",
-                    "Add compost annually",
-                    "Mulch around base with organic matter"
-                ],
-                "prevention": [
-                    "Regular soil testing",
-                    "Proper pruning and spacing",
-                    "Integrated pest management"
-                ]
-            },
-            
-            # TOMATO RECOMMENDATIONS
-            "Tomato___Bacterial_spot": {
-                "disease_info": "Bacterial infection causing leaf spots and fruit lesions",
-                "immediate_treatment": [
-                    "Remove infected plant parts immediately",
-                    "Apply copper-based bactericide",
-                    "Improve air circulation",
-                    "Avoid overhead watering"
-                ],
-                "fertilizer_recommendations": [
-                    "Reduce nitrogen to slow bacterial growth",
-                    "Increase potassium for disease resistance",
-                    "Calcium to strengthen cell walls",
-                    "Use 5-10-15 NPK ratio"
-                ],
-                "organic_manure": [
-                    "Well-composted manure only (avoid fresh)",
-                    "Worm castings for gentle nutrition",
-                    "Fish bone meal for phosphorus"
-                ],
-                "soil_amendments": [
-                    "Improve drainage immediately",
-                    "Add perlite to heavy soils",
-                    "Maintain soil pH 6.2-6.8",
-                    "Avoid waterlogged conditions"
-                ],
-                "prevention": [
-                    "Use disease-resistant varieties",
-                    "Drip irrigation instead of sprinklers",
-                    "Crop rotation with non-solanaceous plants",
-                    "Sterilize tools between plants"
-                ]
-            },
-            
-            "Tomato___Early_blight": {
-                "disease_info": "Fungal disease causing dark spots with concentric rings",
-                "immediate_treatment": [
-                    "Remove affected lower leaves",
-                    "Apply fungicide containing chlorothalonil",
-                    "Improve plant spacing",
-                    "Mulch to prevent soil splash"
-                ],
-                "fertilizer_recommendations": [
-                    "Balanced NPK (8-8-8) with emphasis on potassium",
-                    "Avoid excess nitrogen which promotes disease",
-                    "Calcium and magnesium supplements",
-                    "Phosphorus for root strength"
-                ],
-                "organic_manure": [
-                    "Aged cow manure",
-                    "Compost with good C:N ratio",
-                    "Bone meal for phosphorus",
-                    "Greensand for potassium"
-                ],
-                "soil_amendments": [
-                    "Ensure good drainage",
-                    "Add organic matter to improve soil structure",
-                    "Maintain soil pH 6.0-6.8",
-                    "Apply mulch to reduce soil splash"
-                ],
-                "prevention": [
-                    "Stake and prune for air circulation",
-                    "Water at soil level, not leaves",
-                    "Rotate crops annually",
-                    "Choose resistant varieties"
-                ]
-            },
-            
-            "Tomato___Late_blight": {
-                "disease_info": "Devastating fungal disease, same pathogen as Irish potato famine",
-                "immediate_treatment": [
-                    "URGENT: Remove entire infected plants",
-                    "Apply systemic fungicide immediately",
-                    "Increase air circulation dramatically",
-                    "Reduce humidity around plants"
-                ],
-                "fertilizer_recommendations": [
-                    "Stop nitrogen fertilization immediately",
-                    "High potassium fertilizer for disease resistance",
-                    "Calcium chloride foliar spray",
-                    "Phosphorus for root health"
-                ],
-                "organic_manure": [
-                    "No fresh manure - use only well-aged compost",
-                    "Worm castings for gentle feeding",
-                    "Rock phosphate",
-                    "Granite dust for potassium"
-                ],
-                "soil_amendments": [
-                    "Improve drainage urgently",
-                    "Add sand/perlite to heavy soils",
-                    "Ensure soil pH 6.5-7.0",
-                    "Remove all plant debris"
-                ],
-                "prevention": [
-                    "Plant only certified disease-free seeds",
-                    "Use resistant varieties",
-                    "Avoid overhead irrigation",
-                    "Monitor weather for favorable disease conditions"
-                ]
-            },
-            
-            "Tomato___Leaf_Mold": {
-                "disease_info": "Fungal disease common in greenhouse conditions",
-                "immediate_treatment": [
-                    "Increase ventilation immediately",
-                    "Reduce humidity below 85%",
-                    "Remove infected leaves",
-                    "Apply fungicide spray"
-                ],
-                "fertilizer_recommendations": [
-                    "Reduce nitrogen levels",
-                    "Increase potassium and calcium",
-                    "Use 4-8-12 NPK ratio",
-                    "Magnesium sulfate foliar spray"
-                ],
-                "organic_manure": [
-                    "Well-composted manure with good drainage",
-                    "Avoid high-nitrogen sources",
-                    "Kelp meal for potassium",
-                    "Bone meal for phosphorus"
-                ],
-                "soil_amendments": [
-                    "Improve air circulation at soil level",
-                    "Add perlite for drainage",
-                    "Maintain soil pH 6.0-6.8",
-                    "Use raised beds if possible"
-                ],
-                "prevention": [
-                    "Ensure excellent ventilation",
-                    "Control humidity levels",
-                    "Space plants adequately",
-                    "Use resistant varieties in greenhouses"
-                ]
-            },
-            
-            "Tomato___healthy": {
-                "disease_info": "Healthy tomato plant - maintain optimal growing conditions",
-                "immediate_treatment": [
-                    "Continue regular monitoring",
-                    "Maintain consistent watering",
-                    "Regular pruning of suckers"
-                ],
-                "fertilizer_recommendations": [
-                    "Balanced NPK (10-10-10) for vegetative growth",
-                    "Switch to high potassium (5-10-15) when fruiting",
-                    "Calcium supplement for blossom end rot prevention",
-                    "Magnesium for chlorophyll production"
-                ],
-                "organic_manure": [
-                    "Compost-enriched cow manure",
-                    "Worm castings throughout season",
-                    "Fish emulsion for quick nitrogen",
-                    "Bone meal at planting"
-                ],
-                "soil_amendments": [
-                    "Maintain soil pH 6.0-6.8",
-                    "Add compost regularly",
-                    "Mulch with organic matter",
-                    "Ensure consistent moisture"
-                ],
-                "prevention": [
-                    "Regular soil testing",
-                    "Proper plant spacing",
-                    "Consistent watering schedule",
-                    "Integrated pest management"
-                ]
-            }
-        }
-        
-        # Add more plant types (this is a starting template)
-        # You can expand this database with all 38 classes
-        return recommendations
+        return self.store.get()
     
     def get_recommendations(self, predicted_class, confidence_score=None):
         """
@@ -313,27 +120,52 @@ class PlantCareRecommendationSystem:
         
         Args:
             predicted_class (str): The class predicted by your model
-            confidence_score (float): Model confidence (optional)
+            confidence_score (float): Calibrated model confidence (optional)
             
         Returns:
-            dict: Complete recommendation package
+            dict: Complete recommendation package (a fresh copy with plain
+            dicts and lists, safe to modify)
         """
-        if predicted_class not in self.recommendations:
-            return self._get_generic_recommendations(predicted_class)
+        _, database, payloads, _ = self._current_tables()
+        payload = payloads.get(predicted_class)
+        if payload is None:
+            payload = self._build_payload(predicted_class, database)
         
-        recommendations = self.recommendations[predicted_class].copy()
+        # The precomputed payload is shared; callers get their own copy
+        recommendations = thaw(payload)
         
-        # Add confidence information
-        if confidence_score:
+        # Add confidence information (only for classes in the detailed database)
+        if confidence_score and predicted_class in database:
             recommendations['model_confidence'] = f"{confidence_score:.2%}"
-            if confidence_score < 0.7:
-                recommendations['confidence_warning'] = "Low confidence - consider manual verification"
-        
-        # Add general care tips
-        recommendations['general_care'] = self._get_general_care_tips(predicted_class)
+            if confidence_score < self.review_threshold:
+                recommendations['confidence_warning'] = LOW_CONFIDENCE_WARNING
         
         return recommendations
     
+    def _build_lookup_tables(self, database):
+        """
+        Precompute the recommendation payload of every known class and the
+        care schedule of every class and season, frozen so they can be shared
+        between callers
+        """
+        classes = list(dict.fromkeys(list(CLASS_NAMES) + list(database)))
+        payloads = {name: self._build_payload(name, database) for name in classes}
+        schedules = {
+            (name, season): self._build_care_schedule(payloads[name], name, season)
+            for name in classes
+            for season in SEASONAL_TASKS
+        }
+        return MappingProxyType(payloads), MappingProxyType(schedules)
+    
+    def _build_payload(self, predicted_class, database):
+        """Frozen recommendation payload of a class (without confidence annotations)"""
+        if predicted_class not in database:
+            return freeze(self._get_generic_recommendations(predicted_class))
+        
+        payload = dict(database[predicted_class])
+        payload['general_care'] = self._get_general_care_tips(predicted_class)
+        return freeze(payload)
+    
     def _get_generic_recommendations(self, predicted_class):
         """
         Provide generic recommendations for classes not in detailed database
@@ -342,91 +174,63 @@ class PlantCareRecommendationSystem:
         is_healthy = 'healthy' in predicted_class.lower()
         
         if is_healthy:
-            return {
-                "disease_info": f"Healthy {plant_type} - maintain current care",
-                "immediate_treatment": ["Continue current care routine", "Monitor regularly"],
-                "fertilizer_recommendations": ["Balanced NPK fertilizer", "Seasonal adjustments as needed"],
-                "organic_manure": ["Well-composted organic matter", "Seasonal compost applications"],
-                "soil_amendments": ["Maintain proper pH", "Regular soil testing"],
-                "prevention": ["Continue good practices", "Regular monitoring"]
-            }
+            return dict(GENERIC_HEALTHY_RECOMMENDATIONS,
+                        disease_info=f"Healthy {plant_type} - maintain current care")
         else:
-            return {
-                "disease_info": f"Disease detected in {plant_type} - general treatment needed",
-                "immediate_treatment": ["Remove infected plant parts", "Improve air circulation", "Apply appropriate fungicide/bactericide"],
-                "fertilizer_recommendations": ["Reduce nitrogen", "Increase potassium for disease resistance", "Ensure adequate calcium"],
-                "organic_manure": ["Well-aged compost only", "Avoid fresh manure during disease"],
-                "soil_amendments": ["Improve drainage", "Maintain optimal pH", "Add organic matter"],
-                "prevention": ["Use resistant varieties", "Improve growing conditions", "Regular monitoring"]
-            }
+            return dict(GENERIC_DISEASE_RECOMMENDATIONS,
+                        disease_info=f"Disease detected in {plant_type} - general treatment needed")
     
     def _get_general_care_tips(self, predicted_class):
         """
         Get general care tips based on plant type
         """
         plant_type = predicted_class.split('___')[0] if '___' in predicted_class else predicted_class
-        
-        care_tips = {
-            "Apple": {
-                "watering": "Deep, infrequent watering - avoid wetting leaves",
-                "pruning": "Prune in late winter for air circulation",
-                "harvest": "Harvest when fruit comes off easily with upward twist"
-            },
-            "Tomato": {
-                "watering": "Consistent moisture - 1-2 inches per week",
-                "pruning": "Remove suckers, lower leaves touching ground",
-                "harvest": "Pick when fully colored but still firm"
-            },
-            "Potato": {
-                "watering": "Consistent moisture, especially during tuber formation",
-                "hilling": "Hill soil around plants as they grow",
-                "harvest": "Harvest after plant dies back naturally"
-            }
-        }
-        
-        return care_tips.get(plant_type, {
-            "watering": "Maintain consistent moisture levels",
-            "care": "Follow best practices for this plant type",
-            "monitoring": "Regular inspection for pests and diseases"
-        })
+        return GENERAL_CARE_TIPS.get(plant_type, DEFAULT_CARE_TIPS)
     
     def generate_care_schedule(self, predicted_class, season="spring"):
         """
         Generate a seasonal care schedule
-        """
-        recommendations = self.get_recommendations(predicted_class)
         
-        schedule = {
+        Returns:
+            dict: immediate_actions, weekly_tasks, monthly_tasks and
+            seasonal_tasks lists (a fresh copy, safe to modify)
+        """
+        if season not in SEASONAL_TASKS:
+            season = "spring"
+        schedule = self._current_tables()[3].get((predicted_class, season))
+        if schedule is None:
+            schedule = self._build_care_schedule(self.get_recommendations(predicted_class), predicted_class, season)
+        return thaw(schedule)
+    
+    def _build_care_schedule(self, recommendations, predicted_class, season):
+        return freeze({
             "immediate_actions": recommendations.get('immediate_treatment', []),
-            "weekly_tasks": [
-                "Monitor plant health",
-                "Check soil moisture",
-                "Apply organic fertilizer if scheduled"
-            ],
-            "monthly_tasks": [
-                "Soil pH testing",
-                "Apply compost or manure as recommended",
-                "Disease prevention treatments"
-            ],
+            "weekly_tasks": WEEKLY_TASKS,
+            "monthly_tasks": MONTHLY_TASKS,
             "seasonal_tasks": self._get_seasonal_tasks(predicted_class, season)
-        }
-        
-        return schedule
+        })
     
     def _get_seasonal_tasks(self, predicted_class, season):
         """
         Get season-specific tasks
         """
-        plant_type = predicted_class.split('___')[0] if '___' in predicted_class else predicted_class
-        
-        seasonal_tasks = {
-            "spring": ["Apply base fertilizer", "Begin regular watering", "Start disease monitoring"],
-            "summer": ["Increase watering frequency", "Apply potassium fertilizer", "Harvest as ready"],
-            "fall": ["Reduce watering", "Apply phosphorus fertilizer", "Prepare for dormancy"],
-            "winter": ["Minimal watering", "Plan for next season", "Equipment maintenance"]
-        }
-        
-        return seasonal_tasks.get(season, seasonal_tasks["spring"])
+        return SEASONAL_TASKS.get(season, SEASONAL_TASKS["spring"])
+
+_shared_system = None
+_shared_lock = threading.Lock()
+
+
+def get_care_system():
+    """
+    The process-wide PlantCareRecommendationSystem on the shared store,
+    created on first use so every consumer reuses the same lookup tables
+    """
+    global _shared_system
+    if _shared_system is None:
+        with _shared_lock:
+            if _shared_system is None:
+                _shared_system = PlantCareRecommendationSystem()
+    return _shared_system
 
 # Example usage function
 def save_recommendations_database():
@@ -464,7 +268,7 @@ if __name__ == "__main__":
         for key, value in recommendations.items():
             if key != 'general_care':
                 print(f"\n{key.upper().replace('_', ' ')}:")
-                if isinstance(value, list):
+                if isinstance(value, (list, tuple)):
                     for item in value:
                         print(f"  • {item}")
                 else:
@@ -0,0 +1,174 @@
+"""
+Content-Hash Prediction Cache
+=============================
+Caches model predictions keyed on the SHA-256 of the uploaded image bytes
+and the model version, so re-uploading the same photo skips decoding,
+inference and (for the same location) the enrichment pipeline.
+
+Entries live in an in-memory LRU, with an optional on-disk JSON tier that
+survives restarts.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+def image_hash(image_bytes):
+    """SHA-256 hex digest of raw image bytes"""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+class PredictionCache:
+    """
+    LRU cache of {predicted_class, confidence, top_predictions, analyses} per image hash
+    """
+
+    def __init__(self, max_entries=1024, disk_dir=None, model_version="", analysis_ttl=3600):
+        self.max_entries = max(1, int(max_entries))
+        self.model_version = model_version
+        self.analysis_ttl = analysis_ttl
+
+        # Separate directory per model version so stale predictions are never read
+        self.disk_dir = None
+        if disk_dir:
+            version_key = hashlib.sha256(model_version.encode('utf-8')).hexdigest()[:16]
+            self.disk_dir = os.path.join(disk_dir, version_key)
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "analysis_hits": 0,
+            "analysis_misses": 0
+        }
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"⚠️ Prediction cache write failed: {str(e)}")
+
+    def _remember(self, key, entry):
+        """Insert into the LRU (caller holds the lock)"""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _lookup(self, key):
+        """Find an entry in memory, then on disk (caller holds the lock)"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry, "memory"
+
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+            return entry, "disk"
+
+        return None, None
+
+    def get_prediction(self, key):
+        """
+        Returns:
+            tuple: (predicted_class, confidence, top_predictions) or None on a miss
+        """
+        with self._lock:
+            entry, tier = self._lookup(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats[f"{tier}_hits"] += 1
+            top_predictions = entry.get("top_predictions") or [
+                {"class": entry["predicted_class"], "probability": entry["confidence"]}
+            ]
+            return entry["predicted_class"], entry["confidence"], top_predictions
+
+    def put_prediction(self, key, predicted_class, confidence, top_predictions=None):
+        """Store a model prediction (and its top-k classes) for an image hash"""
+        with self._lock:
+            entry = self._entries.get(key) or {"analyses": {}}
+            entry["predicted_class"] = predicted_class
+            entry["confidence"] = confidence
+            if top_predictions is not None:
+                entry["top_predictions"] = top_predictions
+            self._remember(key, entry)
+            snapshot = json.loads(json.dumps(entry))
+        self._write_disk(key, snapshot)
+
+    def get_analysis(self, key, location):
+        """Return a cached enhanced analysis for this image and location, if still fresh"""
+        with self._lock:
+            entry, _ = self._lookup(key)
+            cached = entry.get("analyses", {}).get(location or "") if entry else None
+            if cached and time.time() - cached["stored_at"] <= self.analysis_ttl:
+                self._stats["analysis_hits"] += 1
+                return cached["analysis"]
+            self._stats["analysis_misses"] += 1
+            return None
+
+    def put_analysis(self, key, location, analysis):
+        """Store the enhanced analysis computed for this image and location"""
+        with self._lock:
+            entry, _ = self._lookup(key)
+            if entry is None:
+                return
+            entry.setdefault("analyses", {})[location or ""] = {
+                "stored_at": time.time(),
+                "analysis": analysis
+            }
+            snapshot = json.loads(json.dumps(entry))
+        self._write_disk(key, snapshot)
+
+    def clear(self):
+        """Drop all in-memory entries (the disk tier is left intact)"""
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        """Return hit-rate counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            size = len(self._entries)
+
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        analysis_lookups = stats["analysis_hits"] + stats["analysis_misses"]
+        stats.update({
+            "entries": size,
+            "max_entries": self.max_entries,
+            "disk_tier": bool(self.disk_dir),
+            "model_version": self.model_version,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "analysis_hit_rate": stats["analysis_hits"] / analysis_lookups if analysis_lookups else 0.0
+        })
+        return stats
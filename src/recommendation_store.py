@@ -0,0 +1,244 @@
+"""
+Shared Recommendation Store
+===========================
+The treatment / fertilizer / manure database lives in
+data/care_recommendations.json. This module loads it lazily on first use,
+validates it, and hands every consumer the same frozen snapshot, so the web
+app and the enrichment system share one copy instead of each rebuilding it.
+
+The file is hot-reloadable: at most every `check_interval` seconds the
+store checks the file's modification time and, if it changed, loads and
+validates the new version. An edit that fails validation is logged and
+ignored, and the previous snapshot stays in use.
+
+Validate the file without starting the app:
+    python -m src.recommendation_store validate [--path data/care_recommendations.json]
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+
+try:
+    from .class_names import CLASS_NAMES
+except ImportError:
+    from class_names import CLASS_NAMES
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                            'data', 'care_recommendations.json')
+
+# Schema of one class entry
+TEXT_FIELDS = ('disease_info',)
+LIST_FIELDS = ('immediate_treatment', 'fertilizer_recommendations', 'organic_manure',
+               'soil_amendments', 'prevention')
+
+
+class RecommendationSchemaError(ValueError):
+    """The recommendation file does not match the expected schema"""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__("; ".join(self.errors))
+
+
+class FrozenDict(dict):
+    """
+    Read-only dict: shared safely between callers, and still a dict for
+    json.dumps, Jinja templates and dict(...) copies
+    """
+
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("FrozenDict is read-only")
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __hash__(self):
+        return hash(tuple(sorted(self.items())))
+
+
+def freeze(value):
+    """Recursively convert dicts to FrozenDicts and lists to tuples"""
+    if isinstance(value, dict):
+        return value if isinstance(value, FrozenDict) else FrozenDict((k, freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Mutable deep copy of a frozen value: FrozenDicts to dicts, tuples to lists"""
+    if isinstance(value, dict):
+        return {k: thaw(v) if isinstance(v, (dict, tuple)) else v for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) if isinstance(item, (dict, tuple)) else item for item in value]
+    return value
+
+
+def validate_recommendations(data):
+    """
+    Check a recommendation database against the schema: an object mapping
+    known class names to entries with a `disease_info` string and non-empty
+    lists of strings for every field in LIST_FIELDS (extra fields allowed).
+
+    Raises:
+        RecommendationSchemaError: listing every problem found
+    """
+    if not isinstance(data, dict):
+        raise RecommendationSchemaError(["top level must be an object mapping class names to entries"])
+
+    errors = []
+    known_classes = set(CLASS_NAMES)
+    for class_name, entry in data.items():
+        if class_name not in known_classes:
+            errors.append(f"{class_name}: not one of the model's class names")
+        if not isinstance(entry, dict):
+            errors.append(f"{class_name}: entry must be an object")
+            continue
+        for field in TEXT_FIELDS:
+            if not isinstance(entry.get(field), str) or not entry[field].strip():
+                errors.append(f"{class_name}.{field}: must be a non-empty string")
+        for field in LIST_FIELDS:
+            items = entry.get(field)
+            if not isinstance(items, list) or not items:
+                errors.append(f"{class_name}.{field}: must be a non-empty list")
+            elif not all(isinstance(item, str) and item.strip() for item in items):
+                errors.append(f"{class_name}.{field}: items must be non-empty strings")
+
+    if errors:
+        raise RecommendationSchemaError(errors)
+
+
+def load_recommendations(path):
+    """Read and validate a recommendation file, returning a frozen database"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    validate_recommendations(data)
+    return freeze(data)
+
+
+class RecommendationStore:
+    """
+    Lazily loaded, validated, hot-reloadable recommendation database
+    """
+
+    def __init__(self, path=DEFAULT_PATH, check_interval=2.0):
+        self.path = path
+        self.check_interval = check_interval
+
+        # (version, database); replaced as a whole so readers never see a mix
+        self._snapshot = None
+        self._mtime = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+        self._stats = {
+            "loads": 0,
+            "reloads": 0,
+            "rejected": 0
+        }
+        self._last_error = None
+
+    def snapshot(self):
+        """
+        Current (version, database) pair. The version changes whenever a new
+        file is loaded, so consumers can rebuild anything derived from it.
+        """
+        if self._snapshot is None or time.monotonic() >= self._next_check:
+            self.reload()
+        return self._snapshot
+
+    def get(self):
+        """Current frozen database: class name -> entry"""
+        return self.snapshot()[1]
+
+    def reload(self, force=False):
+        """
+        Load the file if it changed since the last load (or if force)
+
+        Returns:
+            bool: True if a new version was loaded
+        """
+        with self._lock:
+            self._next_check = time.monotonic() + self.check_interval
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                if self._snapshot is None:
+                    print(f"❌ Recommendation database not found: {self.path}")
+                    self._last_error = str(e)
+                    self._snapshot = (0, FrozenDict())
+                return False
+
+            if not force and self._snapshot is not None and mtime == self._mtime:
+                return False
+
+            try:
+                database = load_recommendations(self.path)
+            except (OSError, ValueError) as e:
+                self._stats["rejected"] += 1
+                self._last_error = str(e)
+                self._mtime = mtime  # don't retry until the file changes again
+                print(f"❌ Invalid recommendation database {self.path}: {str(e)}")
+                if self._snapshot is None:
+                    self._snapshot = (0, FrozenDict())
+                return False
+
+            previous = self._snapshot[0] if self._snapshot else 0
+            self._stats["reloads" if previous else "loads"] += 1
+            version = previous + 1
+            self._snapshot = (version, database)
+            self._mtime = mtime
+            self._last_error = None
+            if version > 1:
+                print(f"✅ Reloaded recommendation database ({len(database)} classes)")
+            return True
+
+    def get_stats(self):
+        version, database = self.snapshot()
+        with self._lock:
+            stats = dict(self._stats)
+        stats.update({
+            "path": self.path,
+            "version": version,
+            "classes": len(database),
+            "last_error": self._last_error
+        })
+        return stats
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_recommendation_store(path=None):
+    """The shared RecommendationStore for a file (one per path per process)"""
+    path = os.path.abspath(path or DEFAULT_PATH)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = RecommendationStore(path)
+        return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recommendation database tools')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    validate = subparsers.add_parser('validate', help='Check the database against the schema')
+    validate.add_argument('--path', default=DEFAULT_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'validate':
+        try:
+            database = load_recommendations(args.path)
+        except RecommendationSchemaError as e:
+            print(f"❌ {len(e.errors)} problems in {args.path}:")
+            for error in e.errors:
+                print(f"  • {error}")
+            raise SystemExit(1)
+        print(f"✅ {args.path} is valid ({len(database)} classes)")
+
+
+if __name__ == '__main__':
+    main()
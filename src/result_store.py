@@ -0,0 +1,536 @@
+"""
+SQLite Result Store
+===================
+Stores analysis results in a single SQLite database (WAL mode) instead of
+one JSON file per result. The full result, including the enhanced analysis,
+is kept as JSON in `results`; a compact summary row per result (timestamp,
+class, confidence, location, thumbnail, weather risk) is written to the
+indexed `result_summaries` table in the same transaction. History listings
+read only the summary index, never the JSON blobs, and the index can be
+rebuilt from the stored JSON at any time. Triggers on the index keep running
+totals per plant, class and location in `summary_counts`, so the history
+summary panel and filter dropdowns never scan the results.
+
+Import results saved by older versions, or rebuild the summary index, with:
+    python -m src.result_store migrate [--results-dir results] [--db results/results.sqlite3]
+    python -m src.result_store rebuild-index [--db results/results.sqlite3]
+"""
+
+import argparse
+import base64
+import json
+import os
+import sqlite3
+import threading
+
+DEFAULT_DB_PATH = os.path.join('results', 'results.sqlite3')
+
+# Rows of summary_counts a summary row is counted in: the overall total, its
+# plant, class and location (%(row)s is NEW or OLD)
+COUNT_KEYS = """
+    SELECT 'all' AS dimension, '' AS value
+    UNION ALL SELECT 'plant', CASE WHEN instr(%(row)s.predicted_class, '___') > 0
+        THEN substr(%(row)s.predicted_class, 1, instr(%(row)s.predicted_class, '___') - 1)
+        ELSE %(row)s.predicted_class END
+    UNION ALL SELECT 'predicted_class', %(row)s.predicted_class
+    UNION ALL SELECT 'location', %(row)s.location
+"""
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    result_id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    predicted_class TEXT,
+    confidence REAL,
+    location TEXT,
+    filename TEXT,
+    enrichment_status TEXT,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS result_summaries (
+    result_id TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    predicted_class TEXT,
+    confidence REAL,
+    location TEXT,
+    filename TEXT,
+    thumbnail TEXT,
+    enrichment_status TEXT,
+    risk_level TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_summaries_timestamp ON result_summaries (timestamp, result_id);
+CREATE INDEX IF NOT EXISTS idx_summaries_class ON result_summaries (predicted_class, timestamp);
+CREATE INDEX IF NOT EXISTS idx_summaries_location ON result_summaries (location, timestamp);
+CREATE TABLE IF NOT EXISTS summary_counts (
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    results INTEGER NOT NULL,
+    high_confidence INTEGER NOT NULL,
+    confidences INTEGER NOT NULL,
+    confidence_sum REAL NOT NULL,
+    PRIMARY KEY (dimension, value)
+);
+CREATE TRIGGER IF NOT EXISTS summary_counts_insert AFTER INSERT ON result_summaries BEGIN
+    INSERT INTO summary_counts (dimension, value, results, high_confidence, confidences, confidence_sum)
+    SELECT dimension, value, 1, COALESCE(NEW.confidence > 0.8, 0), NEW.confidence IS NOT NULL,
+           COALESCE(NEW.confidence, 0.0)
+    FROM (%(keys)s)
+    WHERE value IS NOT NULL
+    ON CONFLICT (dimension, value) DO UPDATE SET
+        results = results + 1,
+        high_confidence = high_confidence + excluded.high_confidence,
+        confidences = confidences + excluded.confidences,
+        confidence_sum = confidence_sum + excluded.confidence_sum;
+END;
+CREATE TRIGGER IF NOT EXISTS summary_counts_delete AFTER DELETE ON result_summaries BEGIN
+    UPDATE summary_counts SET
+        results = results - 1,
+        high_confidence = high_confidence - COALESCE(OLD.confidence > 0.8, 0),
+        confidences = confidences - (OLD.confidence IS NOT NULL),
+        confidence_sum = confidence_sum - COALESCE(OLD.confidence, 0.0)
+    WHERE (dimension, value) IN (%(old_keys)s);
+    DELETE FROM summary_counts WHERE results <= 0;
+END;
+DROP INDEX IF EXISTS idx_results_timestamp;
+DROP INDEX IF EXISTS idx_results_class;
+DROP INDEX IF EXISTS idx_results_location;
+""" % {'keys': COUNT_KEYS % {'row': 'NEW'}, 'old_keys': COUNT_KEYS % {'row': 'OLD'}}
+
+# Fields returned by history listings (no enhanced_analysis blob); filename is
+# the name the image was uploaded under
+SUMMARY_FIELDS = ('result_id', 'timestamp', 'predicted_class', 'confidence', 'location',
+                  'filename', 'thumbnail', 'enrichment_status', 'risk_level')
+SUMMARY_COLUMNS = ", ".join(SUMMARY_FIELDS)
+
+
+def encode_cursor(timestamp, result_id):
+    """Opaque pagination cursor for the position after (timestamp, result_id)"""
+    raw = json.dumps([timestamp, result_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        timestamp, result_id = json.loads(raw)
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return str(timestamp), str(result_id)
+
+
+def _filter_clauses(predicted_class=None, location=None, date_from=None, date_to=None, min_confidence=None):
+    """
+    WHERE clauses for history filters. Dates are 'YYYY-MM-DD' and inclusive.
+
+    Returns:
+        tuple: (list of SQL clauses, list of parameters)
+    """
+    clauses, params = [], []
+    if predicted_class:
+        clauses.append("predicted_class = ?")
+        params.append(predicted_class)
+    if location:
+        clauses.append("location = ?")
+        params.append(location)
+    if date_from:
+        clauses.append("timestamp >= ?")
+        params.append(date_from)
+    if date_to:
+        # Timestamps are 'YYYY-MM-DD HH:MM:SS'; '~' sorts after any time
+        clauses.append("timestamp <= ?")
+        params.append(f"{date_to}~")
+    if min_confidence is not None:
+        clauses.append("confidence >= ?")
+        params.append(float(min_confidence))
+    return clauses, params
+
+
+def _row_values(result_id, result_data):
+    return (
+        result_id,
+        result_data.get('timestamp', ''),
+        result_data.get('predicted_class'),
+        result_data.get('confidence'),
+        result_data.get('location'),
+        result_data.get('filename'),
+        result_data.get('enrichment_status', 'complete'),
+        json.dumps(result_data)
+    )
+
+
+def _summary_values(result_id, result_data):
+    """Summary index row for a result (order of SUMMARY_FIELDS)"""
+    weather = (result_data.get('enhanced_analysis') or {}).get('weather_analysis') or {}
+    return (
+        result_id,
+        result_data.get('timestamp', ''),
+        result_data.get('predicted_class'),
+        result_data.get('confidence'),
+        result_data.get('location'),
+        result_data.get('original_filename') or result_data.get('filename'),
+        result_data.get('thumbnail'),
+        result_data.get('enrichment_status', 'complete'),
+        weather.get('risk_level') if isinstance(weather, dict) else None
+    )
+
+
+INSERT_SUMMARY = (
+    f"INTO result_summaries ({SUMMARY_COLUMNS}) VALUES ({', '.join('?' * len(SUMMARY_FIELDS))})"
+)
+
+
+class ResultStore:
+    """
+    Result persistence with indexed lookups by time, class and location
+    """
+
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        # One connection per thread: WAL lets readers run alongside the writer
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        # Filtered summary totals are cached until the next write
+        self._version = 0
+        self._summary_cache = {}
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            # Rows replaced by INSERT OR REPLACE must leave summary_counts too
+            conn.execute("PRAGMA recursive_triggers=ON")
+            self._local.conn = conn
+        return conn
+
+    def save(self, result_id, result_data):
+        """Insert or replace a result"""
+        self.save_many([(result_id, result_data)])
+
+    def save_many(self, items, replace=True):
+        """
+        Insert several (result_id, result_data) pairs and their summary
+        index rows in one transaction
+
+        Returns:
+            int: rows written
+        """
+        verb = "INSERT OR REPLACE" if replace else "INSERT OR IGNORE"
+        items = list(items)
+        conn = self._connection()
+        with self._write_lock:
+            try:
+                cursor = conn.executemany(
+                    f"{verb} INTO results (result_id, timestamp, predicted_class, confidence, "
+                    "location, filename, enrichment_status, data) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [_row_values(result_id, data) for result_id, data in items]
+                )
+                written = cursor.rowcount
+                conn.executemany(
+                    f"{verb} {INSERT_SUMMARY}",
+                    [_summary_values(result_id, data) for result_id, data in items]
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            self._version += 1
+        return written
+
+    def get(self, result_id):
+        """Return the full result dict, or None if unknown"""
+        row = self._connection().execute(
+            "SELECT data FROM results WHERE result_id = ?", (result_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query_summaries(self, limit=12, cursor=None, **filters):
+        """
+        One page of result summaries, newest first, using keyset pagination
+        on (timestamp, result_id) so every page costs the same to fetch.
+
+        Args:
+            limit: Page size
+            cursor: next_cursor from the previous page (None for the first)
+            **filters: predicted_class, location, date_from, date_to, min_confidence
+
+        Returns:
+            tuple: (list of summary dicts, next_cursor or None)
+        """
+        clauses, params = _filter_clauses(**filters)
+        if cursor:
+            timestamp, result_id = decode_cursor(cursor)
+            clauses.append("(timestamp < ? OR (timestamp = ? AND result_id < ?))")
+            params.extend([timestamp, timestamp, result_id])
+
+        query = f"SELECT {SUMMARY_COLUMNS} FROM result_summaries"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY timestamp DESC, result_id DESC LIMIT ?"
+        params.append(int(limit) + 1)  # one extra row tells us whether there is a next page
+
+        rows = self._connection().execute(query, params).fetchall()
+        summaries = [dict(zip(SUMMARY_FIELDS, row)) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit and summaries:
+            next_cursor = encode_cursor(summaries[-1]['timestamp'], summaries[-1]['result_id'])
+        return summaries, next_cursor
+
+    def summarize(self, **filters):
+        """
+        Totals for the history summary panel over the filtered results. The
+        unfiltered totals come from summary_counts; filtered ones are
+        computed over the matching summary rows.
+        """
+        if not any(value is not None and value != '' for value in filters.values()):
+            return self._summarize_counts()
+        return self._cached(('summary', tuple(sorted(filters.items()))), lambda: self._summarize(**filters))
+
+    def _summarize_counts(self):
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT results, high_confidence, confidences, confidence_sum FROM summary_counts "
+            "WHERE dimension = 'all'"
+        ).fetchone()
+        total, high_confidence, confidences, confidence_sum = row or (0, 0, 0, 0.0)
+        plant_types = conn.execute("SELECT COUNT(*) FROM summary_counts WHERE dimension = 'plant'").fetchone()[0]
+        return {
+            "total": total,
+            "high_confidence": high_confidence,
+            "avg_confidence": confidence_sum / confidences if confidences else 0.0,
+            "plant_types": plant_types
+        }
+
+    def _cached(self, key, compute):
+        """Memoise an aggregate query until the next write"""
+        key = (self._version, key)
+        value = self._summary_cache.get(key)
+        if value is None:
+            value = compute()
+            if len(self._summary_cache) > 256:
+                self._summary_cache.clear()
+            self._summary_cache[key] = value
+        return value
+
+    def _summarize(self, **filters):
+        clauses, params = _filter_clauses(**filters)
+        query = (
+            "SELECT COUNT(*), SUM(confidence > 0.8), AVG(confidence), "
+            "COUNT(DISTINCT CASE WHEN instr(predicted_class, '___') > 0 "
+            "THEN substr(predicted_class, 1, instr(predicted_class, '___') - 1) "
+            "ELSE predicted_class END) FROM result_summaries"
+        )
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        total, high_confidence, avg_confidence, plant_types = self._connection().execute(query, params).fetchone()
+        return {
+            "total": total,
+            "high_confidence": high_confidence or 0,
+            "avg_confidence": avg_confidence or 0.0,
+            "plant_types": plant_types
+        }
+
+    def distinct_values(self, column):
+        """Sorted distinct classes or locations (for filter dropdowns)"""
+        if column not in ('predicted_class', 'location'):
+            raise ValueError(f"Unsupported column: {column}")
+        return [row[0] for row in self._connection().execute(
+            "SELECT value FROM summary_counts WHERE dimension = ? ORDER BY value", (column,)
+        )]
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def delete(self, result_id):
+        conn = self._connection()
+        with self._write_lock:
+            conn.execute("DELETE FROM results WHERE result_id = ?", (result_id,))
+            conn.execute("DELETE FROM result_summaries WHERE result_id = ?", (result_id,))
+            conn.commit()
+            self._version += 1
+
+    def referenced_originals(self):
+        """
+        Returns:
+            dict: content hash of a stored original upload -> number of results using it
+        """
+        return dict(self._connection().execute(
+            "SELECT json_extract(data, '$.original') AS content_hash, COUNT(*) FROM results "
+            "WHERE content_hash IS NOT NULL GROUP BY content_hash"
+        ).fetchall())
+
+    def referenced_derivatives(self):
+        """Content hashes whose thumbnail/display copies some result uses"""
+        return {
+            os.path.basename(thumbnail).split('-')[0]
+            for (thumbnail,) in self._connection().execute(
+                "SELECT DISTINCT thumbnail FROM result_summaries WHERE thumbnail IS NOT NULL"
+            )
+        }
+
+    def legacy_upload_names(self, result_ids):
+        """
+        Returns:
+            dict: result_id -> file name in static/uploads, for those of the
+            given results saved before uploads were content-addressed
+        """
+        if not result_ids:
+            return {}
+        placeholders = ", ".join("?" * len(result_ids))
+        return dict(self._connection().execute(
+            f"SELECT result_id, filename FROM results WHERE result_id IN ({placeholders}) AND filename IS NOT NULL",
+            list(result_ids)
+        ).fetchall())
+
+    def iter_legacy_uploads(self):
+        """
+        Yield (result_id, result_data) for results whose upload is still a
+        file in static/uploads (saved before uploads were content-addressed)
+        """
+        result_ids = [row[0] for row in self._connection().execute(
+            "SELECT result_id FROM results WHERE json_extract(data, '$.original') IS NULL AND filename IS NOT NULL"
+        )]
+        for result_id in result_ids:
+            result_data = self.get(result_id)
+            if result_data is not None:
+                yield result_id, result_data
+
+    def index_is_consistent(self):
+        """True if every stored result has exactly one summary row, all counted"""
+        conn = self._connection()
+        try:
+            missing = conn.execute(
+                "SELECT COUNT(*) FROM results WHERE result_id NOT IN (SELECT result_id FROM result_summaries)"
+            ).fetchone()[0]
+            summaries = conn.execute("SELECT COUNT(*) FROM result_summaries").fetchone()[0]
+            counted = conn.execute(
+                "SELECT COALESCE(SUM(results), 0) FROM summary_counts WHERE dimension = 'all'"
+            ).fetchone()[0]
+        except sqlite3.DatabaseError:
+            return False
+        return missing == 0 and summaries == self.count() and counted == summaries
+
+    def rebuild_index(self, batch_size=1000):
+        """
+        Recreate the summary index from the stored result JSON
+
+        Returns:
+            int: summary rows written
+        """
+        reader = sqlite3.connect(self.path, timeout=30)
+        conn = self._connection()
+        rebuilt = 0
+        with self._write_lock:
+            try:
+                try:
+                    conn.execute("DELETE FROM result_summaries")
+                except sqlite3.DatabaseError:
+                    # Damaged table - recreate it
+                    conn.rollback()
+                    conn.execute("DROP TABLE IF EXISTS result_summaries")
+                    conn.executescript(SCHEMA)
+                # The insert trigger recounts every row below
+                conn.execute("DELETE FROM summary_counts")
+                rows = reader.execute("SELECT result_id, data FROM results")
+                while True:
+                    batch = rows.fetchmany(batch_size)
+                    if not batch:
+                        break
+                    conn.executemany(
+                        f"INSERT OR REPLACE {INSERT_SUMMARY}",
+                        [_summary_values(result_id, json.loads(data)) for result_id, data in batch]
+                    )
+                    rebuilt += len(batch)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                reader.close()
+            self._version += 1
+        return rebuilt
+
+    def ensure_index(self):
+        """
+        Rebuild the summary index if it is missing rows or unreadable
+
+        Returns:
+            bool: True if a rebuild was needed
+        """
+        if self.index_is_consistent():
+            return False
+        rebuilt = self.rebuild_index()
+        print(f"⚠️ Result summary index was inconsistent - rebuilt {rebuilt} entries")
+        return True
+
+    def import_json_dir(self, results_dir='results', batch_size=500):
+        """
+        Import <result_id>.json files written by older versions.
+        Results already in the store are left untouched.
+
+        Returns:
+            tuple: (imported, skipped)
+        """
+        if not os.path.isdir(results_dir):
+            return 0, 0
+
+        imported = skipped = 0
+        batch = []
+        for filename in sorted(os.listdir(results_dir)):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(results_dir, filename), 'r') as f:
+                    batch.append((filename[:-5], json.load(f)))
+            except (OSError, ValueError):
+                skipped += 1
+                continue
+            if len(batch) >= batch_size:
+                imported += self.save_many(batch, replace=False)
+                batch = []
+        if batch:
+            imported += self.save_many(batch, replace=False)
+        return imported, skipped
+
+    def get_stats(self):
+        return {
+            "path": self.path,
+            "results": self.count(),
+            "indexed": self._connection().execute("SELECT COUNT(*) FROM result_summaries").fetchone()[0]
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Result store maintenance')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    migrate = subparsers.add_parser('migrate', help='Import results/<id>.json files into the store')
+    migrate.add_argument('--results-dir', default='results')
+    migrate.add_argument('--db', default=DEFAULT_DB_PATH)
+
+    rebuild = subparsers.add_parser('rebuild-index', help='Recreate the history summary index')
+    rebuild.add_argument('--db', default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    if args.command == 'migrate':
+        store = ResultStore(args.db)
+        imported, skipped = store.import_json_dir(args.results_dir)
+        print(f"✅ Imported {imported} results into {args.db} ({store.count()} total)")
+        if skipped:
+            print(f"⚠️ Skipped {skipped} unreadable files")
+    elif args.command == 'rebuild-index':
+        store = ResultStore(args.db)
+        print(f"✅ Rebuilt {store.rebuild_index()} summary index entries in {args.db}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""
+Weather-Driven Disease Risk Engine
+==================================
+Scores how strongly weather conditions favour each of the 38 classes,
+using per-pathogen response curves held in NumPy arrays:
+
+- temperature: 0 outside the pathogen's range, rising linearly to 1 at its
+  optimum
+- humidity: how far relative humidity is past the pathogen's threshold.
+  Spider mites and the whitefly-borne leaf curl virus are favoured by dry
+  air instead.
+- leaf wetness: hours of wet foliage relative to what infection needs
+- rainfall: splash dispersal (mm), saturating
+
+score = susceptibility * temperature * weighted(humidity, wetness, rainfall)
+
+Inputs broadcast, so one call scores one observation, or a whole grid such
+as (locations, forecast steps), against all classes: the result has shape
+inputs.shape + (38,). Healthy classes take the highest risk among the
+diseases of the same plant. Plants without disease classes use a generic
+fungal profile.
+
+The curves are coarse agronomic rules of thumb for ranking risk, not
+calibrated infection models.
+"""
+
+import numpy as np
+
+try:
+    from .class_names import CLASS_NAMES, plant_name
+except ImportError:
+    from class_names import CLASS_NAMES, plant_name
+
+# Pathogen profiles:
+# t_min, t_opt, t_max (°C), humidity threshold (%RH), humidity direction
+# (+1 humid favours / -1 dry favours), wetness hours for full infection,
+# rainfall scale (mm), weights (humidity, wetness, rainfall), susceptibility
+PROFILES = {
+    'apple_scab':        (6, 18, 26, 75, 1, 9, 2.0, (0.3, 0.5, 0.2), 1.0),
+    'cool_wet_blight':   (10, 18, 26, 80, 1, 10, 2.0, (0.4, 0.4, 0.2), 1.0),
+    'warm_wet_fungal':   (13, 25, 33, 70, 1, 6, 4.0, (0.35, 0.4, 0.25), 0.9),
+    'rust':              (10, 20, 28, 85, 1, 6, 3.0, (0.4, 0.5, 0.1), 0.9),
+    'powdery_mildew':    (15, 24, 32, 50, 1, 0, 0.0, (1.0, 0.0, 0.0), 0.8),
+    'humid_mold':        (15, 23, 30, 85, 1, 0, 0.0, (1.0, 0.0, 0.0), 0.9),
+    'bacterial':         (18, 28, 35, 75, 1, 4, 1.5, (0.3, 0.3, 0.4), 0.9),
+    'trunk_disease':     (15, 26, 35, 60, 1, 12, 6.0, (0.3, 0.3, 0.4), 0.6),
+    'leaf_scorch':       (15, 24, 30, 75, 1, 8, 3.0, (0.3, 0.4, 0.3), 0.8),
+    'spider_mites':      (22, 30, 40, 60, -1, 0, 0.0, (1.0, 0.0, 0.0), 0.9),
+    'whitefly_virus':    (20, 29, 38, 70, -1, 0, 0.0, (1.0, 0.0, 0.0), 0.7),
+    'mechanical_virus':  (18, 26, 35, 0, 1, 0, 0.0, (1.0, 0.0, 0.0), 0.4),
+    'citrus_greening':   (20, 28, 35, 50, 1, 0, 0.0, (1.0, 0.0, 0.0), 0.5),
+    'generic_fungal':    (12, 24, 32, 75, 1, 8, 3.0, (0.4, 0.4, 0.2), 0.7),
+}
+
+CLASS_PROFILES = {
+    "Apple___Apple_scab": 'apple_scab',
+    "Apple___Black_rot": 'warm_wet_fungal',
+    "Apple___Cedar_apple_rust": 'rust',
+    "Cherry_(including_sour)___Powdery_mildew": 'powdery_mildew',
+    "Corn_(maize)___Cercospora_leaf_spot Gray_leaf_spot": 'warm_wet_fungal',
+    "Corn_(maize)___Common_rust_": 'rust',
+    "Corn_(maize)___Northern_Leaf_Blight": 'cool_wet_blight',
+    "Grape___Black_rot": 'warm_wet_fungal',
+    "Grape___Esca_(Black_Measles)": 'trunk_disease',
+    "Grape___Leaf_blight_(Isariopsis_Leaf_Spot)": 'warm_wet_fungal',
+    "Orange___Haunglongbing_(Citrus_greening)": 'citrus_greening',
+    "Peach___Bacterial_spot": 'bacterial',
+    "Pepper,_bell___Bacterial_spot": 'bacterial',
+    "Potato___Early_blight": 'warm_wet_fungal',
+    "Potato___Late_blight": 'cool_wet_blight',
+    "Squash___Powdery_mildew": 'powdery_mildew',
+    "Strawberry___Leaf_scorch": 'leaf_scorch',
+    "Tomato___Bacterial_spot": 'bacterial',
+    "Tomato___Early_blight": 'warm_wet_fungal',
+    "Tomato___Late_blight": 'cool_wet_blight',
+    "Tomato___Leaf_Mold": 'humid_mold',
+    "Tomato___Septoria_leaf_spot": 'warm_wet_fungal',
+    "Tomato___Spider_mites Two-spotted_spider_mite": 'spider_mites',
+    "Tomato___Target_Spot": 'warm_wet_fungal',
+    "Tomato___Tomato_Yellow_Leaf_Curl_Virus": 'whitefly_virus',
+    "Tomato___Tomato_mosaic_virus": 'mechanical_virus',
+}
+
+RISK_LEVELS = np.array(['LOW', 'MEDIUM', 'HIGH'])
+LEVEL_THRESHOLDS = (0.35, 0.65)
+FACTORS = ('temperature', 'humidity', 'leaf_wetness', 'rainfall')
+
+
+def estimate_leaf_wetness(humidity, rainfall=0.0):
+    """
+    Rough hours of leaf wetness when no sensor reading is available: up to
+    12h as relative humidity climbs from 80% to 100%, plus 6h after rain
+    """
+    humidity = np.asarray(humidity, dtype=np.float32)
+    rainfall = np.asarray(rainfall, dtype=np.float32)
+    return np.minimum(np.clip((humidity - 80.0) / 20.0, 0.0, 1.0) * 12.0 + np.where(rainfall > 0.2, 6.0, 0.0), 24.0)
+
+
+class RiskEngine:
+    """
+    Vectorised risk scoring of all classes against weather inputs
+    """
+
+    def __init__(self, class_names=None):
+        self.class_names = list(class_names or CLASS_NAMES)
+        self.class_index = {name: i for i, name in enumerate(self.class_names)}
+
+        rows = np.array([self._profile_row(name) for name in self.class_names], dtype=np.float32)
+        (self.t_min, self.t_opt, self.t_max, self.rh_threshold, self.rh_direction,
+         self.wetness_hours, self.rain_scale, self.w_humidity, self.w_wetness, self.w_rain,
+         self.susceptibility) = rows.T
+        self.inv_wetness_hours = 1.0 / np.maximum(self.wetness_hours, 1e-6)
+        self.inv_rain_scale = 1.0 / np.maximum(self.rain_scale, 1e-6)
+
+        # Healthy classes take the max over their plant's diseases
+        self.healthy = ~np.isin(self.class_names, list(CLASS_PROFILES))
+        self.healthy_sources = {}
+        for i, name in enumerate(self.class_names):
+            diseases = [j for j, other in enumerate(self.class_names)
+                        if other in CLASS_PROFILES and plant_name(other) == plant_name(name)]
+            if self.healthy[i] and diseases:
+                self.healthy_sources[i] = np.array(diseases)
+
+    def _profile_row(self, class_name):
+        t_min, t_opt, t_max, rh, direction, wetness, rain, weights, susceptibility = \
+            PROFILES[CLASS_PROFILES.get(class_name, 'generic_fungal')]
+        total = float(sum(weights))
+        return (t_min, t_opt, t_max, rh, direction, wetness, rain,
+                weights[0] / total, weights[1] / total, weights[2] / total, susceptibility)
+
+    def factors(self, temperature, humidity, leaf_wetness=None, rainfall=0.0):
+        """
+        Per-factor responses in [0, 1], each of shape inputs.shape + (classes,)
+
+        Returns:
+            dict: factor name -> array
+        """
+        temperature = np.asarray(temperature, dtype=np.float32)[..., None]
+        humidity_in = np.asarray(humidity, dtype=np.float32)
+        rainfall_in = np.asarray(rainfall, dtype=np.float32)
+        if leaf_wetness is None:
+            leaf_wetness = estimate_leaf_wetness(humidity_in, rainfall_in)
+        wetness = np.asarray(leaf_wetness, dtype=np.float32)[..., None]
+        humidity = humidity_in[..., None]
+        rainfall = rainfall_in[..., None]
+
+        rising = (temperature - self.t_min) / (self.t_opt - self.t_min)
+        falling = (self.t_max - temperature) / (self.t_max - self.t_opt)
+        temperature_factor = np.clip(np.minimum(rising, falling), 0.0, 1.0)
+
+        humid = (humidity - self.rh_threshold) / np.maximum(100.0 - self.rh_threshold, 1.0)
+        dry = (self.rh_threshold - humidity) / np.maximum(self.rh_threshold, 1.0)
+        humidity_factor = np.clip(np.where(self.rh_direction > 0, humid, dry), 0.0, 1.0)
+
+        wetness_factor = (1.0 - np.exp(-wetness * self.inv_wetness_hours)) * (self.wetness_hours > 0)
+        rain_factor = (1.0 - np.exp(-rainfall * self.inv_rain_scale)) * (self.rain_scale > 0)
+
+        return {
+            'temperature': temperature_factor,
+            'humidity': humidity_factor,
+            'leaf_wetness': wetness_factor,
+            'rainfall': rain_factor
+        }
+
+    def score(self, temperature, humidity, leaf_wetness=None, rainfall=0.0):
+        """
+        Risk score in [0, 1] of every class
+
+        Args:
+            temperature: °C, scalar or array
+            humidity: relative humidity %, broadcastable with temperature
+            leaf_wetness: hours of wet foliage (estimated from humidity and
+                rain when None)
+            rainfall: mm in the last hour / time step
+
+        Returns:
+            np.ndarray: shape broadcast(inputs).shape + (classes,)
+        """
+        f = self.factors(temperature, humidity, leaf_wetness, rainfall)
+        moisture = self.w_humidity * f['humidity'] + self.w_wetness * f['leaf_wetness'] + self.w_rain * f['rainfall']
+        scores = self.susceptibility * f['temperature'] * moisture
+
+        # Healthy classes: highest risk among the plant's diseases
+        for i, diseases in self.healthy_sources.items():
+            scores[..., i] = scores[..., diseases].max(axis=-1)
+        return scores
+
+    @staticmethod
+    def levels(scores):
+        """Map scores to 'LOW' / 'MEDIUM' / 'HIGH' (same shape)"""
+        return RISK_LEVELS[np.digitize(scores, LEVEL_THRESHOLDS)]
+
+    def assess(self, predicted_class, temperature, humidity, leaf_wetness=None, rainfall=0.0):
+        """
+        Risk for one class and one observation, with the factor breakdown
+
+        Returns:
+            dict: risk_score, risk_level, advice, risk_factors, top_threats
+        """
+        if leaf_wetness is None:
+            leaf_wetness = float(estimate_leaf_wetness(humidity, rainfall))
+        scores = self.score(temperature, humidity, leaf_wetness, rainfall)
+        factors = self.factors(temperature, humidity, leaf_wetness, rainfall)
+
+        index = self.class_index.get(predicted_class)
+        plant = plant_name(predicted_class)
+        same_plant = [j for j, name in enumerate(self.class_names)
+                      if plant_name(name) == plant and name in CLASS_PROFILES]
+        if index is None:
+            score = float(scores[same_plant].max()) if same_plant else 0.0
+            index = max(same_plant, key=lambda j: scores[j]) if same_plant else None
+        else:
+            score = float(scores[index])
+
+        # The class whose factors explain the score (for healthy: the top threat)
+        driver = index
+        if index is not None and self.healthy[index] and same_plant:
+            driver = max(same_plant, key=lambda j: scores[j])
+
+        risk_factors = {name: round(float(factors[name][driver]), 2) for name in FACTORS} if driver is not None else {}
+        risk_level = str(self.levels(score))
+        top_threats = [
+            {"class": self.class_names[j], "risk_score": round(float(scores[j]), 2)}
+            for j in sorted(same_plant, key=lambda j: -scores[j])[:3]
+        ]
+        return {
+            "risk_score": round(score, 2),
+            "risk_level": risk_level,
+            "advice": self._advice(risk_level, risk_factors, self.class_names[driver] if driver is not None else None),
+            "risk_factors": risk_factors,
+            "leaf_wetness_hours": round(float(leaf_wetness), 1),
+            "top_threats": top_threats
+        }
+
+    def _advice(self, risk_level, risk_factors, disease_class):
+        if risk_level == 'LOW' or not disease_class:
+            return "Good growing conditions"
+        disease = disease_class.split('___')[-1].replace('_', ' ').strip()
+        moisture = {k: v for k, v in risk_factors.items() if k != 'temperature'}
+        driver = max(moisture, key=moisture.get) if moisture else 'temperature'
+        reasons = {
+            'humidity': "humidity",
+            'leaf_wetness': "long leaf wetness",
+            'rainfall': "rain splash",
+            'temperature': "temperature"
+        }
+        if risk_level == 'HIGH':
+            return f"Conditions strongly favour {disease} ({reasons[driver]} and temperature)"
+        return f"Moderate {disease} risk ({reasons[driver]})"
+
+
+_engine = None
+
+
+def get_risk_engine():
+    """Shared RiskEngine for the 38 model classes"""
+    global _engine
+    if _engine is None:
+        _engine = RiskEngine()
+    return _engine
@@ -0,0 +1,106 @@
+"""
+Test-Time Augmentation
+======================
+Re-classifies an uncertain image from several augmented views (flips,
+crops, zoom) and averages their logits. All views go through the model as
+one (K, 3, H, W) batch, so TTA costs one extra forward pass, not K.
+
+The inference engines return softmax(logits / T). The mean of the views'
+log-probabilities differs from mean(logits) / T only by a per-image
+constant, the same for every class, so averaging log-probabilities gives
+the logit-averaged prediction without exposing raw logits. It is exact
+except where a probability underflows: those are clamped to 1e-30 before
+the log, which bounds how far one view can pull a class down.
+"""
+
+import torch
+from PIL import Image
+
+try:
+    from .image_preprocessing import INPUT_SIZE, allocate_batch, image_to_tensor
+except ImportError:
+    from image_preprocessing import INPUT_SIZE, allocate_batch, image_to_tensor
+
+# In order of usefulness; a K-view TTA uses the first K
+VIEWS = ('identity', 'hflip', 'center_crop', 'vflip', 'zoom', 'hflip_crop')
+DEFAULT_VIEWS = 4
+
+
+def _center_crop(image, fraction):
+    width, height = image.size
+    crop_w, crop_h = int(width * fraction), int(height * fraction)
+    left, top = (width - crop_w) // 2, (height - crop_h) // 2
+    return image.crop((left, top, left + crop_w, top + crop_h))
+
+
+def _render(view, image):
+    """One augmented copy of a decoded RGB image"""
+    if view == 'identity':
+        return image
+    if view == 'hflip':
+        return image.transpose(Image.FLIP_LEFT_RIGHT)
+    if view == 'vflip':
+        return image.transpose(Image.FLIP_TOP_BOTTOM)
+    if view == 'center_crop':
+        return _center_crop(image, 0.875)
+    if view == 'zoom':
+        return _center_crop(image, 0.75)
+    if view == 'hflip_crop':
+        return _center_crop(image, 0.875).transpose(Image.FLIP_LEFT_RIGHT)
+    raise ValueError(f"Unknown TTA view '{view}' (choose from {', '.join(VIEWS)})")
+
+
+def build_views(image, views=VIEWS[:DEFAULT_VIEWS]):
+    """
+    Augmented copies of a decoded RGB image, preprocessed into one slab
+
+    Args:
+        image (PIL.Image): Decoded RGB image (e.g. from decode_image)
+        views: View names from VIEWS
+
+    Returns:
+        torch.Tensor: (len(views), 3, H, W) batch
+    """
+    # Resize once to the input size for the pure flips; crops use the
+    # (larger) decoded image so they keep their detail
+    resized = image if image.size == INPUT_SIZE else image.resize(INPUT_SIZE, Image.BILINEAR)
+    slab = allocate_batch(len(views))
+    for row, view in enumerate(views):
+        source = resized if view in ('identity', 'hflip', 'vflip') else image
+        image_to_tensor(_render(view, source), out=slab[row])
+    return slab
+
+
+def average_logits(probabilities):
+    """
+    Combine per-view probability rows (K, classes) into one row, equivalent
+    to the softmax of the averaged (temperature-scaled) logits up to the
+    1e-30 clamp on underflowed probabilities
+    """
+    log_probabilities = torch.log(probabilities.clamp_min(1e-30))
+    return torch.softmax(log_probabilities.mean(dim=0), dim=0)
+
+
+def predict_tta(engine, image, views=VIEWS[:DEFAULT_VIEWS], base_probabilities=None, timeout=None):
+    """
+    Probability row for an image averaged over augmented views (logit
+    averaging, up to the clamp in average_logits)
+
+    Args:
+        engine: BatchingInferenceEngine or InferenceWorkerPool
+        image (PIL.Image): Decoded RGB image
+        views: View names; 'identity' is skipped when base_probabilities
+            (the identity prediction already made) is given
+        base_probabilities: Optional (classes,) row from the plain pass
+        timeout: Seconds to wait for the engine (None = no limit)
+
+    Returns:
+        torch.Tensor: (classes,) probabilities
+    """
+    if base_probabilities is not None:
+        views = [view for view in views if view != 'identity']
+    rows = engine.predict_proba(build_views(image, views), timeout=timeout) if views else None
+    if base_probabilities is not None:
+        base = base_probabilities.unsqueeze(0)
+        rows = base if rows is None else torch.cat([base, rows], dim=0)
+    return average_logits(rows)
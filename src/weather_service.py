@@ -0,0 +1,299 @@
+"""
+Weather Observation Service
+===========================
+Sits between the diagnosis code and the weather provider so that many
+uploads from the same place cost one API call, not one call each:
+
+- location keys are normalised ("  New York, US" and "new york,us" are the
+  same key; empty / "Unknown" locations never reach the provider)
+- observations are cached for a freshness window (default 10 minutes), and
+  unknown locations are remembered briefly so typos don't burn calls
+- concurrent requests for the same location share one in-flight provider
+  call (single-flight)
+- provider calls are limited by a daily budget (the OpenWeatherMap free tier
+  allows 1,000 calls/day). Background lookups stop at `background_share` of
+  the budget, so interactive diagnoses can still use the rest. When the
+  budget is spent, the last known observation is served as stale.
+
+MockWeatherProvider returns deterministic observations without network
+access, for tests and local development (WEATHER_PROVIDER=mock).
+"""
+
+import hashlib
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+OPENWEATHER_URL = "http://api.openweathermap.org/data/2.5/weather"
+DEFAULT_FRESHNESS = 600       # seconds an observation is served without refetching
+DEFAULT_NEGATIVE_TTL = 3600   # seconds an unknown location is remembered
+DEFAULT_DAILY_BUDGET = 1000
+UNKNOWN_LOCATIONS = {'', 'unknown', 'none', 'n/a', 'na'}
+
+
+class WeatherProviderError(Exception):
+    """A provider call failed (network error, bad response, quota)"""
+
+
+class LocationNotFound(WeatherProviderError):
+    """The provider does not know the location"""
+
+
+def normalize_location(location):
+    """
+    Cache key for a free-text location: Unicode-normalised, case-folded,
+    whitespace collapsed and no spaces around commas.
+
+    Returns:
+        str or None: None for empty or placeholder locations
+    """
+    if not location:
+        return None
+    text = unicodedata.normalize('NFKC', str(location)).casefold()
+    parts = [" ".join(part.split()) for part in text.split(',')]
+    key = ",".join(part for part in parts if part)
+    return None if key in UNKNOWN_LOCATIONS else key
+
+
+class OpenWeatherMapProvider:
+    """
+    Current conditions from the OpenWeatherMap API via the pooled HttpClient
+    """
+
+    name = 'openweathermap'
+
+    def __init__(self, api_key, http_client, url=OPENWEATHER_URL, timeout=10):
+        self.api_key = api_key
+        self.http_client = http_client
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self, location):
+        params = {'q': location, 'appid': self.api_key, 'units': 'metric'}
+        try:
+            response = self.http_client.get('openweathermap', self.url, params=params, timeout=self.timeout)
+        except Exception as e:
+            raise WeatherProviderError(str(e))
+
+        if response.status_code == 404:
+            raise LocationNotFound(f"Unknown location: {location}")
+        if response.status_code != 200:
+            raise WeatherProviderError(f"Weather API error: {response.status_code}")
+
+        data = response.json()
+        return {
+            "location": data.get('name') or location,
+            "temperature": data['main']['temp'],
+            "humidity": data['main']['humidity'],
+            "rainfall_mm": (data.get('rain') or {}).get('1h', 0.0),
+            "weather_description": data['weather'][0]['description']
+        }
+
+
+class MockWeatherProvider:
+    """
+    Offline provider: deterministic observations derived from the location
+    name, or fixed ones passed in. Counts calls and can simulate latency.
+    """
+
+    name = 'mock'
+    DESCRIPTIONS = ('clear sky', 'few clouds', 'scattered clouds', 'light rain', 'overcast clouds', 'mist')
+
+    def __init__(self, observations=None, latency=0.0, unknown_locations=()):
+        self.observations = {normalize_location(k): v for k, v in (observations or {}).items()}
+        self.latency = latency
+        self.unknown_locations = {normalize_location(name) for name in unknown_locations}
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, location):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        key = normalize_location(location)
+        if key in self.unknown_locations:
+            raise LocationNotFound(f"Unknown location: {location}")
+        if key in self.observations:
+            return dict(self.observations[key])
+
+        seed = hashlib.sha256(key.encode('utf-8')).digest()
+        description = self.DESCRIPTIONS[seed[3] % len(self.DESCRIPTIONS)]
+        return {
+            "location": location.strip().title(),
+            "temperature": round(5 + seed[0] / 255 * 30, 1),
+            "humidity": 30 + seed[1] % 71,
+            "rainfall_mm": round(seed[2] / 255 * 4, 1) if 'rain' in description else 0.0,
+            "weather_description": description
+        }
+
+
+class _InFlight:
+    """One provider call that concurrent requests for a location wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+
+
+class WeatherService:
+    """
+    Cached, coalesced, budgeted access to a weather provider
+    """
+
+    def __init__(self, provider, freshness=DEFAULT_FRESHNESS, daily_budget=DEFAULT_DAILY_BUDGET,
+                 negative_ttl=DEFAULT_NEGATIVE_TTL, background_share=0.8, max_entries=10000,
+                 wait_timeout=15.0):
+        self.provider = provider
+        self.freshness = freshness
+        self.daily_budget = daily_budget
+        self.negative_ttl = negative_ttl
+        self.background_share = background_share
+        self.max_entries = max_entries
+        self.wait_timeout = wait_timeout
+
+        self._cache = OrderedDict()  # key -> (result, fetched_at)
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self._budget_day = None
+        self._calls_today = 0
+        self._stats = {
+            "requests": 0,
+            "fresh_hits": 0,
+            "coalesced": 0,
+            "provider_calls": 0,
+            "provider_errors": 0,
+            "budget_denied": 0,
+            "stale_served": 0,
+            "no_location": 0
+        }
+
+    def get_observation(self, location, priority='interactive'):
+        """
+        Current weather for a location
+
+        Args:
+            location: Free-text location
+            priority: 'interactive' (a user is waiting) or 'background'
+
+        Returns:
+            dict: status 'success' with temperature / humidity / rainfall_mm /
+            weather_description (plus 'cached', 'stale', 'age_seconds'), or
+            status 'no_location', 'not_found', 'budget_exceeded' or 'error'
+        """
+        key = normalize_location(location)
+        with self._lock:
+            self._stats["requests"] += 1
+            if key is None:
+                self._stats["no_location"] += 1
+                return {"status": "no_location", "message": "No location given"}
+
+            entry = self._cache.get(key)
+            now = time.time()
+            if entry is not None and now - entry[1] < self._ttl(entry[0]):
+                self._cache.move_to_end(key)
+                self._stats["fresh_hits"] += 1
+                return self._answer(entry, now, cached=True)
+
+            flight = self._in_flight.get(key)
+            if flight is not None:
+                self._stats["coalesced"] += 1
+                leader = False
+            elif not self._take_budget(priority):
+                self._stats["budget_denied"] += 1
+                if entry is not None and entry[0].get("status") == "success":
+                    self._stats["stale_served"] += 1
+                    return self._answer(entry, now, cached=True, stale=True)
+                return {"status": "budget_exceeded", "message": "Daily weather API budget used up"}
+            else:
+                flight = self._in_flight[key] = _InFlight()
+                leader = True
+
+        if not leader:
+            if not flight.done.wait(self.wait_timeout):
+                return {"status": "error", "message": "Timed out waiting for weather lookup"}
+            return self._answer(flight.result, time.time(), cached=True)
+
+        try:
+            result = self._fetch(location)
+            entry = (result, time.time())
+            fallback = False
+            with self._lock:
+                if result["status"] in ("success", "not_found"):
+                    self._remember(key, entry)
+                elif key in self._cache and self._cache[key][0].get("status") == "success":
+                    # Provider failed: fall back to the last good observation
+                    self._stats["stale_served"] += 1
+                    entry = self._cache[key]
+                    fallback = True
+            flight.result = entry
+            return self._answer(entry, time.time(), cached=fallback, stale=fallback)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            if flight.result is None:
+                flight.result = ({"status": "error", "message": "Weather lookup failed"}, time.time())
+            flight.done.set()
+
+    def _fetch(self, location):
+        """Call the provider; never raises"""
+        with self._lock:
+            self._stats["provider_calls"] += 1
+        try:
+            observation = self.provider.fetch(location)
+            return dict(observation, status="success")
+        except LocationNotFound as e:
+            return {"status": "not_found", "message": str(e)}
+        except Exception as e:
+            with self._lock:
+                self._stats["provider_errors"] += 1
+            return {"status": "error", "message": f"Weather API error: {str(e)}"}
+
+    def _ttl(self, result):
+        return self.freshness if result.get("status") == "success" else self.negative_ttl
+
+    def _answer(self, entry, now, cached, stale=False):
+        result, fetched_at = entry
+        answer = dict(result)
+        if answer.get("status") == "success":
+            answer["cached"] = cached
+            answer["stale"] = stale
+            answer["age_seconds"] = round(now - fetched_at, 1)
+        return answer
+
+    def _remember(self, key, entry):
+        """Insert into the LRU cache (caller holds the lock)"""
+        self._cache[key] = entry
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def _take_budget(self, priority):
+        """Reserve one provider call from today's (UTC) budget (caller holds the lock)"""
+        today = datetime.now(timezone.utc).date()
+        if today != self._budget_day:
+            self._budget_day = today
+            self._calls_today = 0
+        if not self.daily_budget:
+            self._calls_today += 1
+            return True
+        limit = self.daily_budget if priority == 'interactive' else int(self.daily_budget * self.background_share)
+        if self._calls_today >= limit:
+            return False
+        self._calls_today += 1
+        return True
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["cached_locations"] = len(self._cache)
+            stats["in_flight"] = len(self._in_flight)
+            stats["calls_today"] = self._calls_today
+        stats["provider"] = getattr(self.provider, 'name', type(self.provider).__name__)
+        stats["daily_budget"] = self.daily_budget
+        stats["budget_remaining"] = max(0, self.daily_budget - stats["calls_today"]) if self.daily_budget else None
+        stats["hit_rate"] = (stats["fresh_hits"] + stats["coalesced"]) / stats["requests"] if stats["requests"] else 0.0
+        return stats
@@ -0,0 +1,351 @@
+"""
+Process-Pool Inference Workers
+==============================
+Runs the classifier in N worker processes so inference is not bound by the
+GIL of the web process. The model is loaded once in the parent and its
+weights are moved to shared memory; the workers receive handles to the same
+physical weight pages instead of copies.
+
+Workers are started with 'spawn' by default: forking a web process that
+already runs Flask, executor and job-queue threads can deadlock the child on
+a lock some other thread held. ('forkserver' cannot pass the hundreds of
+shared-memory handles of a model.) Models that cannot be pickled to a spawned
+child (TorchScript, ONNX Runtime) are loaded inside each worker by the
+model_loader callable instead.
+
+Each worker pins its own intra-op thread count and micro-batches whatever
+requests are waiting in its queue. Requests go to the worker with the fewest
+in flight. Results come back over a pipe per worker rather than one shared
+queue, whose cross-process write lock a killed worker could leave held. The
+dispatcher checks the workers every health_check_interval seconds (and as
+soon as a result pipe closes): when one has died (OOM kill, segfault) its
+in-flight requests fail with RuntimeError and a replacement is started.
+
+The pool exposes the same submit / predict_proba / predict / get_stats
+interface as BatchingInferenceEngine, so the app can use either
+interchangeably.
+"""
+
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import connection
+
+import torch
+import torch.multiprocessing as mp
+
+
+def _worker_main(worker_id, model, model_loader, input_queue, results, num_threads, max_batch_size,
+                 max_wait, temperature=1.0):
+    """Inference loop run inside each worker process"""
+    torch.set_num_threads(num_threads)
+    if model is None:
+        model = model_loader()
+        if isinstance(model, tuple):  # load_backend returns (model, class_names)
+            model = model[0]
+
+    while True:
+        item = input_queue.get()
+        if item is None:
+            break
+
+        # Micro-batch whatever else is already waiting
+        items = [item]
+        rows = item[1].shape[0]
+        deadline = time.perf_counter() + max_wait
+        stop = False
+        while rows < max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                next_item = input_queue.get(timeout=remaining) if remaining > 0 else input_queue.get_nowait()
+            except queue.Empty:
+                break
+            if next_item is None:
+                stop = True
+                break
+            items.append(next_item)
+            rows += next_item[1].shape[0]
+
+        try:
+            batch = torch.cat([tensor for _, tensor in items], dim=0)
+            with torch.no_grad():
+                probabilities = torch.nn.functional.softmax(model(batch) / temperature, dim=1)
+            offset = 0
+            for request_id, tensor in items:
+                count = tensor.shape[0]
+                results.send((request_id, worker_id, probabilities[offset:offset + count].clone(), None, len(items)))
+                offset += count
+        except Exception as e:
+            for request_id, _ in items:
+                results.send((request_id, worker_id, None, str(e), len(items)))
+
+        if stop:
+            break
+
+
+class InferenceWorkerPool:
+    """
+    Dispatcher in front of N inference processes sharing one model
+    """
+
+    def __init__(self, model, class_names, num_workers=2, threads_per_worker=None,
+                 max_batch_size=8, max_wait_ms=10, start_method=None, temperature=1.0,
+                 model_loader=None, health_check_interval=1.0):
+        self.model = model
+        self.class_names = class_names
+        self.temperature = float(temperature)
+        self.num_workers = max(1, int(num_workers))
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // self.num_workers)
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms / 1000.0)
+        self.model_loader = model_loader
+        self.health_check_interval = max(0.05, float(health_check_interval))
+
+        # Never fork by default: the web process is already multi-threaded
+        self.start_method = start_method or 'spawn'
+        self._context = mp.get_context(self.start_method)
+
+        self._processes = []
+        self._input_queues = []
+        self._result_readers = []
+        self._in_flight = [0] * self.num_workers
+        self._wakeup = None
+        self._listener = None
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._ids = itertools.count()
+        self._running = False
+        self._stats_lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self._stats = {
+            "requests": 0,
+            "images": 0,
+            "errors": 0,
+            "total_latency": 0.0,
+            "batched_requests": 0,
+            "worker_restarts": 0,
+            "per_worker": [0] * self.num_workers
+        }
+
+    def _start_worker(self, worker_id):
+        """
+        Start (or replace) one worker process
+
+        Returns:
+            tuple: (process, its input queue, the read end of its result pipe)
+        """
+        # Forked children inherit the model; others get it pickled through
+        # shared memory, or load it themselves when it cannot be pickled
+        model = self.model if self.model_loader is None or self.start_method == 'fork' else None
+        input_queue = self._context.Queue()
+        reader, writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, model, self.model_loader, input_queue, writer,
+                  self.threads_per_worker, self.max_batch_size, self.max_wait, self.temperature),
+            name=f"inference-worker-{worker_id}",
+            daemon=True
+        )
+        process.start()
+        # Only the worker holds the write end, so the pipe closes when it dies
+        writer.close()
+        return process, input_queue, reader
+
+    def start(self):
+        """Move weights to shared memory and start the workers"""
+        if self._running:
+            return self
+
+        if isinstance(self.model, torch.nn.Module):
+            self.model.share_memory()
+
+        self._wakeup = self._context.Pipe(duplex=False)
+        self._processes, self._input_queues, self._result_readers = [], [], []
+        for worker_id in range(self.num_workers):
+            process, input_queue, reader = self._start_worker(worker_id)
+            self._processes.append(process)
+            self._input_queues.append(input_queue)
+            self._result_readers.append(reader)
+        self._in_flight = [0] * self.num_workers
+
+        self._running = True
+        self._listener = threading.Thread(target=self._collect_results, name="inference-dispatcher", daemon=True)
+        self._listener.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Shut the workers down and fail any requests still in flight"""
+        if not self._running:
+            return
+        self._running = False
+
+        for input_queue in self._input_queues:
+            input_queue.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._input_queues = []
+
+        self._wakeup[1].send(None)
+        if self._listener is not None:
+            self._listener.join(timeout)
+            self._listener = None
+        for conn in self._result_readers + list(self._wakeup):
+            if conn is not None:
+                conn.close()
+        self._result_readers = []
+
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        for future, _, _ in pending.values():
+            future.set_exception(RuntimeError("Inference worker pool stopped"))
+
+    def submit(self, image_tensor):
+        """
+        Send a preprocessed tensor of shape (3, H, W) or (N, 3, H, W) to the
+        least busy worker.
+
+        Returns:
+            Future: resolves to a (N, num_classes) tensor of probabilities
+        """
+        if image_tensor.dim() == 3:
+            image_tensor = image_tensor.unsqueeze(0)
+
+        future = Future()
+        if not self._running:
+            future.set_exception(RuntimeError("Inference worker pool is not running"))
+            return future
+
+        request_id = next(self._ids)
+        # Enqueue under the lock so a worker being replaced cannot swallow it
+        with self._pending_lock:
+            worker_id = min(range(self.num_workers), key=self._in_flight.__getitem__)
+            self._in_flight[worker_id] += 1
+            self._pending[request_id] = (future, time.perf_counter(), worker_id)
+            self._input_queues[worker_id].put((request_id, image_tensor))
+        return future
+
+    def predict_proba(self, image_tensor, timeout=None):
+        """Blocking helper returning the probability rows for a tensor"""
+        return self.submit(image_tensor).result(timeout=timeout)
+
+    def predict(self, image_tensor, timeout=None):
+        """
+        Classify a single preprocessed image
+
+        Returns:
+            tuple: (predicted_class, confidence_score)
+        """
+        probabilities = self.predict_proba(image_tensor, timeout=timeout)[0]
+        confidence, predicted_idx = torch.max(probabilities, 0)
+        return self.class_names[predicted_idx.item()], confidence.item()
+
+    def _collect_results(self):
+        """Fan worker results back out to the waiting futures and watch worker health"""
+        next_check = time.monotonic() + self.health_check_interval
+        while True:
+            readers = [reader for reader in self._result_readers if reader is not None]
+            ready = connection.wait(readers + [self._wakeup[0]], timeout=self.health_check_interval)
+            if self._wakeup[0] in ready:
+                break
+            for reader in ready:
+                try:
+                    message = reader.recv()
+                except (EOFError, OSError):
+                    # The worker is gone: stop listening and check right away
+                    self._result_readers[self._result_readers.index(reader)] = None
+                    reader.close()
+                    next_check = 0.0
+                    continue
+                self._deliver(*message)
+
+            if time.monotonic() >= next_check:
+                self._check_workers()
+                next_check = time.monotonic() + self.health_check_interval
+
+    def _deliver(self, request_id, worker_id, probabilities, error, batch_requests):
+        with self._pending_lock:
+            entry = self._pending.pop(request_id, None)
+            if entry is not None:
+                self._in_flight[entry[2]] -= 1
+        if entry is None:
+            return
+
+        future, submitted_at, _ = entry
+        with self._stats_lock:
+            self._stats["requests"] += 1
+            self._stats["total_latency"] += time.perf_counter() - submitted_at
+            self._stats["batched_requests"] += batch_requests
+            self._stats["per_worker"][worker_id] += 1
+            if error is None:
+                self._stats["images"] += probabilities.shape[0]
+            else:
+                self._stats["errors"] += 1
+
+        if error is None:
+            future.set_result(probabilities)
+        else:
+            future.set_exception(RuntimeError(error))
+
+    def _check_workers(self):
+        """Fail the requests of any dead worker and start a replacement"""
+        for worker_id, process in enumerate(self._processes):
+            if not self._running or process.is_alive():
+                continue
+
+            with self._pending_lock:
+                lost = [request_id for request_id, entry in self._pending.items() if entry[2] == worker_id]
+                futures = [self._pending.pop(request_id)[0] for request_id in lost]
+                self._in_flight[worker_id] = 0
+                # Requests submitted from now on go to the replacement
+                self._processes[worker_id], self._input_queues[worker_id], reader = self._start_worker(worker_id)
+            if self._result_readers[worker_id] is not None:
+                self._result_readers[worker_id].close()
+            self._result_readers[worker_id] = reader
+
+            print(f"⚠️ Inference worker {worker_id} died (exit code {process.exitcode}), restarted; "
+                  f"{len(futures)} requests failed")
+            with self._stats_lock:
+                self._stats["worker_restarts"] += 1
+                self._stats["errors"] += len(futures)
+            error = f"Inference worker {worker_id} died (exit code {process.exitcode})"
+            for future in futures:
+                future.set_exception(RuntimeError(error))
+
+    def get_stats(self):
+        """Return throughput and latency metrics for the pool"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+            stats["per_worker"] = list(self._stats["per_worker"])
+
+        requests = stats["requests"]
+        return {
+            "running": self._running,
+            "mode": "process_pool",
+            "workers": self.num_workers,
+            "start_method": self.start_method,
+            "alive_workers": sum(1 for process in self._processes if process.is_alive()),
+            "threads_per_worker": self.threads_per_worker,
+            "max_batch_size": self.max_batch_size,
+            "temperature": self.temperature,
+            "in_flight": len(self._pending),
+            "requests": requests,
+            "images": stats["images"],
+            "errors": stats["errors"],
+            "worker_restarts": stats["worker_restarts"],
+            "avg_latency_ms": stats["total_latency"] / requests * 1000.0 if requests else 0.0,
+            "avg_requests_per_batch": stats["batched_requests"] / requests if requests else 0.0,
+            "requests_per_worker": stats["per_worker"]
+        }
+
+    def reset_stats(self):
+        """Clear collected metrics"""
+        with self._stats_lock:
+            self._reset_stats()
@@ -66,9 +66,21 @@ document.addEventListener('DOMContentLoaded', function() {
             
             // Show loading state
             showLoadingState();
+
+            // Upload in the background so the progress bar can follow it
+            if (window.FormData && window.XMLHttpRequest) {
+                e.preventDefault();
+                uploadWithProgress(uploadForm);
+            }
         });
     }
 
+    // Follow background enrichment on the results page
+    const enrichmentProgress = document.getElementById('enrichmentProgress');
+    if (enrichmentProgress) {
+        trackEnrichmentJob(enrichmentProgress.dataset.jobId, enrichmentProgress.dataset.resultId);
+    }
+
     // Location autocomplete (basic implementation)
     const locationInput = document.getElementById('location');
     if (locationInput) {
@@ -99,21 +111,170 @@ function showLoadingState() {
     if (submitBtn && loadingDiv) {
         submitBtn.style.display = 'none';
         loadingDiv.style.display = 'block';
-        
-        // Animate progress bar
-        const progressBar = loadingDiv.querySelector('.progress-bar');
-        if (progressBar) {
-            let width = 0;
-            const interval = setInterval(() => {
-                width += Math.random() * 10;
-                if (width > 90) {
-                    clearInterval(interval);
-                    width = 95; // Stop at 95% until actual completion
+        setLoadingProgress(0, 'Uploading your plant image...');
+    }
+}
+
+// Update the upload progress bar and its message
+function setLoadingProgress(percent, message) {
+    const loadingDiv = document.getElementById('loadingDiv');
+    if (!loadingDiv) return;
+
+    const progressBar = loadingDiv.querySelector('.progress-bar');
+    if (progressBar) {
+        progressBar.style.width = percent + '%';
+        progressBar.setAttribute('aria-valuenow', Math.round(percent));
+    }
+    const loadingText = document.getElementById('loadingText');
+    if (loadingText && message) {
+        loadingText.textContent = message;
+    }
+}
+
+// Restore the form after a failed upload
+function hideLoadingState() {
+    const submitBtn = document.getElementById('submitBtn');
+    const loadingDiv = document.getElementById('loadingDiv');
+    if (submitBtn && loadingDiv) {
+        submitBtn.style.display = '';
+        loadingDiv.style.display = 'none';
+    }
+}
+
+// Submit the upload form with real progress: upload bytes, then
+// classification; enrichment progress continues on the results page
+function uploadWithProgress(form) {
+    const xhr = new XMLHttpRequest();
+    xhr.open('POST', form.action);
+    xhr.setRequestHeader('Accept', 'application/json');
+
+    xhr.upload.addEventListener('progress', function(e) {
+        if (e.lengthComputable) {
+            const percent = e.loaded / e.total * 70;
+            setLoadingProgress(percent, `Uploading your plant image... ${Math.round(e.loaded / e.total * 100)}%`);
+        }
+    });
+    xhr.upload.addEventListener('load', function() {
+        setLoadingProgress(75, 'Analyzing your plant image...');
+    });
+
+    xhr.addEventListener('load', function() {
+        let data = {};
+        try {
+            data = JSON.parse(xhr.responseText);
+        } catch (error) {
+            // Not JSON - fall through to the error handling below
+        }
+
+        if (xhr.status >= 200 && xhr.status < 300 && data.result_url) {
+            const name = data.predicted_class.replace('___', ' - ');
+            setLoadingProgress(100, `Detected ${name}. Loading results...`);
+            window.location.href = data.result_url;
+        } else {
+            hideLoadingState();
+            alert(data.error || 'Error analyzing image. Please try again.');
+        }
+    });
+    xhr.addEventListener('error', function() {
+        hideLoadingState();
+        alert('Upload failed. Please check your connection and try again.');
+    });
+
+    xhr.send(new FormData(form));
+}
+
+// Follow an enrichment job (SSE, falling back to polling) and swap in
+// the result sections as they are completed
+function trackEnrichmentJob(jobId, resultId) {
+    const container = document.getElementById('enrichmentProgress');
+    const progressBar = container.querySelector('.progress-bar');
+    const label = document.getElementById('enrichmentLabel');
+    const stepNames = {
+        classification: 'disease detection',
+        recommendations: 'treatment recommendations',
+        plant_information: 'plant information',
+        disease_information: 'disease information',
+        weather_analysis: 'weather risk',
+        saving: 'saving'
+    };
+    let renderedSteps = 0;
+    let finished = false;
+
+    function update(job) {
+        const progress = job.progress;
+        progressBar.style.width = progress.percent + '%';
+        progressBar.setAttribute('aria-valuenow', progress.percent);
+        progressBar.textContent = `${progress.completed}/${progress.total}`;
+
+        const pending = progress.steps.filter(step => !progress.completed_steps.includes(step));
+        if (pending.length) {
+            label.innerHTML = '<i class="fas fa-sync fa-spin text-success"></i> Waiting for ' +
+                pending.map(step => stepNames[step] || step).join(', ') + '...';
+        }
+
+        if (job.status === 'done' || job.status === 'failed') {
+            finished = true;
+            refreshSections().then(() => {
+                if (job.status === 'failed') {
+                    label.textContent = 'Some information could not be loaded. Please try again later.';
+                    progressBar.classList.replace('bg-success', 'bg-danger');
+                } else {
+                    container.remove();
                 }
-                progressBar.style.width = width + '%';
-            }, 500);
+            });
+        } else if (progress.completed > renderedSteps) {
+            renderedSteps = progress.completed;
+            refreshSections();
         }
     }
+
+    function refreshSections() {
+        return fetch(`/results/${resultId}`)
+            .then(response => response.text())
+            .then(html => {
+                const page = new DOMParser().parseFromString(html, 'text/html');
+                page.querySelectorAll('[data-enriched-section]').forEach(section => {
+                    const current = document.getElementById(section.id);
+                    if (current) {
+                        current.replaceWith(section);
+                    }
+                });
+            })
+            .catch(error => console.error('Result refresh error:', error));
+    }
+
+    function poll() {
+        fetch(`/api/jobs/${jobId}`)
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+                return response.json();
+            })
+            .then(job => {
+                update(job);
+                if (!finished) setTimeout(poll, 1000);
+            })
+            .catch(error => {
+                console.error('Job status error:', error);
+                label.textContent = 'Lost track of the analysis. Refresh the page to see the latest results.';
+            });
+    }
+
+    if (window.EventSource) {
+        const events = new EventSource(`/api/jobs/${jobId}/events`);
+        const onEvent = e => update(JSON.parse(e.data));
+        events.addEventListener('progress', onEvent);
+        events.addEventListener('done', e => {
+            events.close();
+            onEvent(e);
+        });
+        events.onerror = () => {
+            // Stream dropped (proxy, server restart) - fall back to polling
+            events.close();
+            if (!finished) poll();
+        };
+    } else {
+        poll();
+    }
 }
 
 // Image preview functionality
@@ -0,0 +1,72 @@
+"""
+Scripted HTTP server for tests: binds a free localhost port and answers each
+path from a queue of (status, body) responses, recording every request.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, so connection reuse is visible
+
+    def do_GET(self):
+        server = self.server.stub
+        path = urlsplit(self.path).path
+        with server.lock:
+            server.requests.append({'path': self.path, 'client_port': self.client_address[1]})
+            script = server.responses.get(path)
+            status, body = script.pop(0) if script else server.default
+        if callable(body):
+            body = body(self)
+        data = body if isinstance(body, bytes) else json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer:
+    """Context manager; `url(path)` gives the full URL of a path"""
+
+    def __init__(self, default=(200, {'ok': True})):
+        self.default = default
+        self.responses = {}
+        self.requests = []
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def url(self, path='/'):
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def script(self, path, *responses):
+        """Queue responses for a path: status codes or (status, body) pairs"""
+        with self.lock:
+            self.responses.setdefault(path, []).extend(
+                (r, self.default[1]) if isinstance(r, int) else r for r in responses
+            )
+
+    def hits(self, path=None):
+        with self.lock:
+            return sum(1 for r in self.requests if path is None or urlsplit(r['path']).path == path)
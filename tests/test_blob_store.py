@@ -0,0 +1,97 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from src.blob_store import BlobStore, collect_garbage
+from src.image_derivatives import derivative_name
+from src.result_store import ResultStore
+
+
+class BlobStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.blob_dir = os.path.join(self.root, 'blobs')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_put_deduplicates_and_delete_removes(self):
+        store = BlobStore(self.blob_dir)
+        first = store.put(b'image bytes')
+        second = store.put(b'image bytes')
+
+        self.assertEqual(first, second)
+        self.assertEqual(store.get_info(first)['refcount'], 2)
+        self.assertEqual(store.get_stats()['total_bytes'], len(b'image bytes'))
+
+        self.assertTrue(store.delete(first))
+        self.assertFalse(store.exists(first))
+        self.assertIsNone(store.get_info(first))
+        self.assertEqual(store.get_stats()['total_bytes'], 0)
+        self.assertFalse(store.delete(first))
+
+    def test_size_budget_evicts_least_recently_referenced(self):
+        store = BlobStore(self.blob_dir, max_total_bytes=250)
+        hashes = []
+        for i in range(3):
+            hashes.append(store.put(bytes([i]) * 100))
+            time.sleep(0.01)
+
+        self.assertFalse(store.exists(hashes[0]))
+        self.assertTrue(store.exists(hashes[1]) and store.exists(hashes[2]))
+        self.assertEqual(store.get_stats()['total_bytes'], 200)
+
+    def test_age_limit_is_checked_on_an_interval(self):
+        store = BlobStore(self.blob_dir, max_age_days=1, retention_interval=3600)
+        old = store.put(b'old')
+        store.enforce_retention()  # starts the interval
+        store._db.execute("UPDATE blobs SET last_referenced_at = ?", (time.time() - 2 * 86400,))
+        store._db.commit()
+
+        store.put(b'new')
+        self.assertTrue(store.exists(old))  # next pass not due yet
+        self.assertEqual(store.retention_candidates(), [(old, 3)])
+        self.assertEqual(store.enforce_retention(), 1)
+        self.assertFalse(store.exists(old))
+
+    def test_gc_keeps_new_unreferenced_blobs(self):
+        store = BlobStore(self.blob_dir)
+        results = ResultStore(os.path.join(self.root, 'results.sqlite3'))
+        referenced = store.put(b'referenced')
+        results.save('r1', {'timestamp': '2026-01-01 00:00:00', 'original': referenced})
+        pending = store.put(b'result not saved yet')
+
+        report = collect_garbage(store, results)
+        self.assertEqual((report['orphaned_blobs'], report['in_grace_period']), (0, 1))
+        self.assertTrue(store.exists(pending))
+
+        report = collect_garbage(store, results, grace_seconds=0)
+        self.assertEqual(report['orphaned_blobs'], 1)
+        self.assertFalse(store.exists(pending))
+        self.assertTrue(store.exists(referenced))
+        self.assertEqual(store.get_info(referenced)['refcount'], 1)
+
+
+    def test_gc_keeps_new_unreferenced_derivatives(self):
+        store = BlobStore(self.blob_dir)
+        results = ResultStore(os.path.join(self.root, 'results.sqlite3'))
+        derivatives_dir = os.path.join(self.root, 'media')
+        content_hash = store.put(b'derivatives written, result not saved yet')
+        thumbnail = os.path.join(derivatives_dir, derivative_name(content_hash, 'thumb', 'jpeg'))
+        os.makedirs(os.path.dirname(thumbnail))
+        with open(thumbnail, 'wb') as f:
+            f.write(b'thumbnail')
+
+        report = collect_garbage(store, results, derivatives_dir=derivatives_dir)
+        self.assertEqual((report['orphaned_derivatives'], report['in_grace_period']), (0, 2))
+        self.assertTrue(os.path.exists(thumbnail))
+
+        report = collect_garbage(store, results, derivatives_dir=derivatives_dir, grace_seconds=0)
+        self.assertEqual(report['orphaned_derivatives'], 1)
+        self.assertFalse(os.path.exists(thumbnail))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import time
+import unittest
+
+from src.http_client import CircuitBreaker, CircuitOpenError, HttpClient
+from tests.http_stub import StubServer
+
+
+class HttpClientTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer().__enter__()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.__exit__(None, None, None)
+
+    def make_client(self, **kwargs):
+        kwargs.setdefault('backoff_factor', 0)
+        self.client = HttpClient(**kwargs)
+        return self.client
+
+    def test_connections_are_reused(self):
+        client = self.make_client()
+        for _ in range(5):
+            self.assertEqual(client.get('stub', self.server.url('/ok')).status_code, 200)
+
+        ports = {r['client_port'] for r in self.server.requests}
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(len(ports), 1)
+
+    def test_503_is_retried_until_success(self):
+        client = self.make_client(max_retries=2)
+        self.server.script('/flaky', 503)
+
+        response = client.get('stub', self.server.url('/flaky'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.server.hits('/flaky'), 2)
+        stats = client.get_stats()['stub']
+        self.assertEqual((stats['requests'], stats['attempts'], stats['retries']), (1, 2, 1))
+        self.assertEqual((stats['successes'], stats['errors']), (1, 0))
+
+    def test_retry_budget_limits_retries(self):
+        client = self.make_client(max_retries=2, failure_threshold=1000)
+        self.server.default = (503, {'error': 'down'})
+
+        for _ in range(10):
+            self.assertEqual(client.get('stub', self.server.url('/down')).status_code, 503)
+
+        stats = client.get_stats()['stub']
+        # 10 tokens to start plus 0.2 per request, well short of 2 retries per request
+        self.assertGreater(stats['retries_denied'], 0)
+        self.assertLessEqual(stats['retries'], 10 + 0.2 * 10)
+        self.assertEqual(stats['attempts'], 10 + stats['retries'])
+        self.assertEqual(self.server.hits('/down'), stats['attempts'])
+        self.assertEqual(stats['errors'], 10)
+
+    def test_circuit_opens_and_recovers(self):
+        client = self.make_client(max_retries=0, failure_threshold=2, reset_timeout=0.2)
+        self.server.script('/api', 503, 503)
+
+        for _ in range(2):
+            client.get('stub', self.server.url('/api'))
+        self.assertEqual(client.get_stats()['stub']['circuit']['state'], 'open')
+
+        with self.assertRaises(CircuitOpenError):
+            client.get('stub', self.server.url('/api'))
+        self.assertEqual(self.server.hits('/api'), 2)
+        self.assertEqual(client.get_stats()['stub']['short_circuited'], 1)
+
+        # After the reset timeout one trial request goes through and closes it
+        time.sleep(0.25)
+        self.assertEqual(client.get('stub', self.server.url('/api')).status_code, 200)
+        circuit = client.get_stats()['stub']['circuit']
+        self.assertEqual((circuit['state'], circuit['consecutive_failures'], circuit['times_opened']),
+                         ('closed', 0, 1))
+
+    def test_metrics_are_kept_per_provider(self):
+        client = self.make_client(max_retries=0)
+        self.server.script('/b', 500)
+
+        client.get('provider_a', self.server.url('/a'))
+        client.get('provider_b', self.server.url('/b'))
+
+        stats = client.get_stats()
+        self.assertEqual(set(stats), {'provider_a', 'provider_b'})
+        self.assertEqual((stats['provider_a']['successes'], stats['provider_a']['errors']), (1, 0))
+        self.assertEqual((stats['provider_b']['successes'], stats['provider_b']['errors']), (0, 1))
+        self.assertEqual(stats['provider_b']['error_rate'], 1.0)
+        self.assertGreater(stats['provider_a']['avg_latency_ms'], 0.0)
+
+
+class CircuitBreakerTest(unittest.TestCase):
+
+    def test_half_open_lets_one_trial_through(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        self.assertEqual(breaker.state, 'open')
+        self.assertFalse(breaker.allow_request())
+
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow_request())
+        self.assertEqual(breaker.state, 'half_open')
+        self.assertFalse(breaker.allow_request())
+
+        breaker.record_success()
+        self.assertEqual(breaker.state, 'closed')
+        self.assertTrue(breaker.allow_request())
+
+    def test_failed_trial_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.record_failure()
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow_request())
+        breaker.record_failure()
+        self.assertEqual(breaker.get_state()['state'], 'open')
+        self.assertEqual(breaker.get_state()['times_opened'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
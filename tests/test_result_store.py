@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from src.result_store import ResultStore
+
+
+class ResultStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.store = ResultStore(os.path.join(self.root, 'results.sqlite3'))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def test_summary_filename_is_the_uploaded_name(self):
+        self.store.save('new', {'timestamp': '2026-01-02 00:00:00', 'original_filename': 'leaf.jpg',
+                                'original': 'a' * 64, 'thumbnail': 'aa/aa/' + 'a' * 64 + '-thumb.jpg'})
+        self.store.save('legacy', {'timestamp': '2026-01-01 00:00:00', 'original_filename': 'old.jpg',
+                                   'filename': '1234_old.jpg'})
+
+        summaries, _ = self.store.query_summaries()
+        self.assertEqual({s['result_id']: s['filename'] for s in summaries}, {'new': 'leaf.jpg', 'legacy': 'old.jpg'})
+
+    def test_legacy_upload_names(self):
+        self.store.save('new', {'timestamp': '2026-01-02 00:00:00', 'original_filename': 'leaf.jpg'})
+        self.store.save('legacy', {'timestamp': '2026-01-01 00:00:00', 'filename': '1234_old.jpg'})
+
+        self.assertEqual(self.store.legacy_upload_names(['new', 'legacy', 'missing']), {'legacy': '1234_old.jpg'})
+        self.assertEqual(self.store.legacy_upload_names([]), {})
+
+
+    def test_counters_follow_saves_replacements_and_deletes(self):
+        self.store.save_many([
+            ('a', {'timestamp': '2026-01-01 00:00:00', 'predicted_class': 'Tomato___Late_blight',
+                   'confidence': 0.9, 'location': 'Lima'}),
+            ('b', {'timestamp': '2026-01-02 00:00:00', 'predicted_class': 'Tomato___healthy',
+                   'confidence': 0.5, 'location': 'Oslo'}),
+            ('c', {'timestamp': '2026-01-03 00:00:00', 'predicted_class': 'Potato___Early_blight',
+                   'confidence': 0.95, 'location': 'Lima'})
+        ])
+        self.store.save('b', {'timestamp': '2026-01-02 00:00:00', 'predicted_class': 'Tomato___healthy',
+                              'confidence': 0.85, 'location': 'Quito'})
+        self.store.delete('c')
+
+        summary = self.store.summarize(predicted_class=None, location=None)
+        scanned = self.store._summarize()
+        self.assertAlmostEqual(summary.pop('avg_confidence'), scanned.pop('avg_confidence'))
+        self.assertEqual(summary, scanned)
+        self.assertEqual(summary, {'total': 2, 'high_confidence': 2, 'plant_types': 1})
+        self.assertEqual(self.store.distinct_values('location'), ['Lima', 'Quito'])
+        self.assertEqual(self.store.distinct_values('predicted_class'), ['Tomato___Late_blight', 'Tomato___healthy'])
+
+    def test_missing_counters_are_rebuilt(self):
+        self.store.save('a', {'timestamp': '2026-01-01 00:00:00', 'predicted_class': 'Tomato___Late_blight',
+                              'confidence': 0.9, 'location': 'Lima'})
+        conn = self.store._connection()
+        conn.execute("DELETE FROM summary_counts")
+        conn.commit()
+
+        self.assertTrue(self.store.ensure_index())
+        self.assertEqual(self.store.summarize()['total'], 1)
+        self.assertEqual(self.store.distinct_values('location'), ['Lima'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,159 @@
+import threading
+import time
+import unittest
+
+from src.disease_analyzer import SimpleEnhancedPlantCare
+from src.http_client import HttpClient
+from src.weather_service import MockWeatherProvider, WeatherService, normalize_location
+from tests.http_stub import StubServer
+
+
+class NormalizeLocationTest(unittest.TestCase):
+
+    def test_case_and_whitespace_give_one_key(self):
+        keys = {normalize_location(text) for text in ("New York, US", "  new   york,us ", "NEW YORK ,  US")}
+        self.assertEqual(keys, {"new york,us"})
+
+    def test_placeholders_have_no_key(self):
+        for text in (None, "", "   ", "Unknown", " UNKNOWN ", "n/a", ","):
+            self.assertIsNone(normalize_location(text), text)
+
+
+class WeatherServiceTest(unittest.TestCase):
+
+    def test_equivalent_locations_share_one_call(self):
+        provider = MockWeatherProvider()
+        service = WeatherService(provider)
+
+        first = service.get_observation("New York, US")
+        second = service.get_observation("  new york,us")
+
+        self.assertEqual(provider.calls, 1)
+        self.assertEqual(first["status"], "success")
+        self.assertFalse(first["cached"])
+        self.assertTrue(second["cached"])
+        self.assertEqual(second["temperature"], first["temperature"])
+
+    def test_unknown_location_never_reaches_provider(self):
+        provider = MockWeatherProvider()
+        service = WeatherService(provider)
+
+        for location in ("", "Unknown", "  unknown  ", None):
+            self.assertEqual(service.get_observation(location)["status"], "no_location")
+        self.assertEqual(provider.calls, 0)
+        self.assertEqual(service.get_stats()["no_location"], 4)
+
+    def test_observation_is_refetched_after_freshness_window(self):
+        provider = MockWeatherProvider()
+        service = WeatherService(provider, freshness=0.1)
+
+        service.get_observation("Paris")
+        service.get_observation("Paris")
+        self.assertEqual(provider.calls, 1)
+
+        time.sleep(0.15)
+        result = service.get_observation("Paris")
+        self.assertEqual(provider.calls, 2)
+        self.assertFalse(result["cached"])
+
+    def test_unknown_location_is_cached_for_an_hour(self):
+        provider = MockWeatherProvider(unknown_locations=["Atlantis"])
+        service = WeatherService(provider, freshness=0.05)
+
+        self.assertEqual(service.get_observation("Atlantis")["status"], "not_found")
+        time.sleep(0.1)  # past the freshness window, well inside the negative TTL
+        self.assertEqual(service.get_observation("atlantis")["status"], "not_found")
+        self.assertEqual(provider.calls, 1)
+
+        service.negative_ttl = 0.05
+        self.assertEqual(service.get_observation("Atlantis")["status"], "not_found")
+        self.assertEqual(provider.calls, 2)
+
+    def test_concurrent_requests_make_one_provider_call(self):
+        provider = MockWeatherProvider(latency=0.2)
+        service = WeatherService(provider)
+        threads = 10
+        barrier = threading.Barrier(threads)
+        results = []
+
+        def lookup():
+            barrier.wait()
+            results.append(service.get_observation("Lisbon, PT"))
+
+        workers = [threading.Thread(target=lookup) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(provider.calls, 1)
+        self.assertEqual([r["status"] for r in results], ["success"] * threads)
+        self.assertEqual(len({r["temperature"] for r in results}), 1)
+        self.assertEqual(service.get_stats()["coalesced"], threads - 1)
+
+    def test_background_lookups_stop_at_their_share_of_the_budget(self):
+        provider = MockWeatherProvider()
+        service = WeatherService(provider, daily_budget=5, background_share=0.8)
+
+        statuses = [service.get_observation(f"City {i}", priority='background')["status"] for i in range(5)]
+        self.assertEqual(statuses, ["success"] * 4 + ["budget_exceeded"])
+
+        # The remaining 20% is kept for interactive diagnoses
+        self.assertEqual(service.get_observation("City 5")["status"], "success")
+        self.assertEqual(service.get_observation("City 6")["status"], "budget_exceeded")
+        self.assertEqual(provider.calls, 5)
+        self.assertEqual(service.get_stats()["budget_remaining"], 0)
+
+    def test_stale_observation_served_when_budget_is_spent(self):
+        provider = MockWeatherProvider()
+        service = WeatherService(provider, freshness=0.05, daily_budget=1)
+
+        fresh = service.get_observation("Oslo")
+        time.sleep(0.1)
+        stale = service.get_observation("Oslo")
+
+        self.assertEqual(provider.calls, 1)
+        self.assertEqual(stale["status"], "success")
+        self.assertTrue(stale["stale"])
+        self.assertEqual(stale["temperature"], fresh["temperature"])
+        stats = service.get_stats()
+        self.assertEqual((stats["budget_denied"], stats["stale_served"]), (1, 1))
+
+
+class _CareSystem:
+    def get_recommendations(self, disease_class, confidence):
+        return {}
+
+
+class EnrichmentPriorityTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer(default=(200, ["", [], [], []])).__enter__()
+        self.http_client = HttpClient(max_retries=0, backoff_factor=0)
+        self.provider = MockWeatherProvider()
+        # One call a day, none of it for background lookups
+        self.analyzer = SimpleEnhancedPlantCare(
+            wikipedia_api_url=self.server.url('/w/api.php'), http_client=self.http_client,
+            care_system=_CareSystem(),
+            weather_service=WeatherService(self.provider, daily_budget=1, background_share=0.5)
+        )
+
+    def tearDown(self):
+        self.analyzer.enrichment_executor.shutdown()
+        self.http_client.close()
+        self.server.__exit__(None, None, None)
+
+    def test_background_diagnosis_uses_the_background_budget(self):
+        diagnosis = self.analyzer.get_complete_enhanced_diagnosis(
+            "Tomato___Late_blight", 0.9, "Lima", priority='background'
+        )
+        self.assertEqual(diagnosis["weather_analysis"]["status"], "budget_exceeded")
+        self.assertEqual(self.provider.calls, 0)
+
+        diagnosis = self.analyzer.get_complete_enhanced_diagnosis("Tomato___Late_blight", 0.9, "Lima")
+        self.assertEqual(diagnosis["weather_analysis"]["status"], "success")
+        self.assertEqual(self.provider.calls, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
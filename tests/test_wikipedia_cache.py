@@ -0,0 +1,109 @@
+import time
+import unittest
+from urllib.parse import parse_qs, urlsplit
+
+from src.class_names import CLASS_NAMES, plant_name
+from src.disease_analyzer import SimpleEnhancedPlantCare
+from src.http_client import HttpClient
+from src.lookup_cache import LookupCache
+from tests.http_stub import StubServer
+
+API_PATH = '/w/api.php'
+
+
+def opensearch(handler):
+    """Opensearch answer whose one title matches the disease keywords"""
+    term = parse_qs(urlsplit(handler.path).query)['search'][0]
+    title = f"{term} disease"
+    return [term, [title], [f"About {title}"], [f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"]]
+
+
+class WikipediaCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubServer(default=(200, opensearch)).__enter__()
+        self.http_client = HttpClient(max_retries=0, backoff_factor=0, failure_threshold=1000)
+
+    def tearDown(self):
+        self.analyzer.enrichment_executor.shutdown()
+        self.http_client.close()
+        self.server.__exit__(None, None, None)
+
+    def make_analyzer(self, **cache_options):
+        self.cache = LookupCache(**cache_options)
+        self.analyzer = SimpleEnhancedPlantCare(
+            lookup_cache=self.cache, wikipedia_api_url=self.server.url(API_PATH),
+            http_client=self.http_client, care_system=object()
+        )
+        return self.analyzer
+
+    def test_fresh_hit_makes_no_request(self):
+        analyzer = self.make_analyzer()
+
+        first = analyzer.get_plant_info_wikipedia("Tomato")
+        second = analyzer.get_plant_info_wikipedia("Tomato")
+
+        self.assertEqual(first["status"], "success")
+        self.assertEqual(second, first)
+        self.assertEqual(self.server.hits(), 1)
+        self.assertEqual(self.cache.get_stats()["fresh_hits"], 1)
+
+    def test_stale_hit_refreshes_once_in_background(self):
+        analyzer = self.make_analyzer(ttl=0.05, stale_ttl=60)
+        analyzer.get_plant_info_wikipedia("Tomato")
+        time.sleep(0.1)
+
+        results = [analyzer.get_plant_info_wikipedia("Tomato") for _ in range(3)]
+
+        deadline = time.time() + 5
+        while self.cache.get("plant:Tomato")[1] != 'fresh' and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual([r["status"] for r in results], ["success"] * 3)
+        self.assertEqual(self.cache.get_stats()["refreshes"], 1)
+        self.assertEqual(self.server.hits(), 2)
+
+    def test_transient_errors_are_not_cached(self):
+        analyzer = self.make_analyzer()
+        self.server.script(API_PATH, (503, {}))
+
+        self.assertEqual(analyzer.get_plant_info_wikipedia("Tomato")["status"], "error")
+        self.assertIsNone(self.cache.get("plant:Tomato"))
+
+        # The next lookup goes back to Wikipedia and caches the answer
+        self.assertEqual(analyzer.get_plant_info_wikipedia("Tomato")["status"], "success")
+        self.assertEqual(self.server.hits(), 2)
+        self.assertIsNotNone(self.cache.get("plant:Tomato"))
+
+    def test_rate_limited_disease_search_is_not_cached_as_not_found(self):
+        analyzer = self.make_analyzer()
+        no_match = (200, lambda handler: ["", [], [], []])
+        self.server.script(API_PATH, (429, {}), no_match, no_match)
+
+        self.assertEqual(analyzer.get_disease_info_wikipedia("Tomato___Late_blight")["status"], "error")
+        self.assertIsNone(self.cache.get("disease:Tomato___Late_blight"))
+
+        self.assertEqual(analyzer.get_disease_info_wikipedia("Tomato___Late_blight")["status"], "success")
+        self.assertIsNotNone(self.cache.get("disease:Tomato___Late_blight"))
+
+    def test_warm_cache_fills_every_class(self):
+        analyzer = self.make_analyzer()
+
+        statuses = analyzer.warm_wikipedia_cache(CLASS_NAMES)
+
+        plants = {plant_name(name) for name in CLASS_NAMES}
+        self.assertEqual(len(statuses), len(plants) + len(CLASS_NAMES))
+        self.assertEqual(set(statuses.values()), {"success"})
+        for name in CLASS_NAMES:
+            self.assertEqual(self.cache.get(f"disease:{name}")[1], 'fresh', name)
+            self.assertEqual(self.cache.get(f"plant:{plant_name(name)}")[1], 'fresh', name)
+
+        # Every class is now answered without touching Wikipedia
+        hits = self.server.hits()
+        for name in CLASS_NAMES:
+            analyzer.get_disease_info_wikipedia(name)
+            analyzer.get_plant_info_wikipedia(plant_name(name))
+        self.assertEqual(self.server.hits(), hits)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import signal
+import time
+import unittest
+
+import torch
+
+from src.worker_pool import InferenceWorkerPool
+
+CLASS_NAMES = ['a', 'b', 'c']
+
+
+def tiny_model():
+    torch.manual_seed(0)
+    return torch.nn.Sequential(torch.nn.Flatten(), torch.nn.Linear(3 * 4 * 4, len(CLASS_NAMES))).eval()
+
+
+class InferenceWorkerPoolTest(unittest.TestCase):
+
+    def test_spawn_is_the_default_start_method(self):
+        pool = InferenceWorkerPool(tiny_model(), CLASS_NAMES)
+        self.assertEqual(pool.start_method, 'spawn')
+        self.assertEqual(pool._context.get_start_method(), 'spawn')
+
+    def test_explicit_start_method_is_used(self):
+        pool = InferenceWorkerPool(tiny_model(), CLASS_NAMES, start_method='forkserver')
+        self.assertEqual(pool._context.get_start_method(), 'forkserver')
+
+    def test_dead_worker_fails_its_requests_and_is_replaced(self):
+        model = tiny_model()
+        pool = InferenceWorkerPool(model, CLASS_NAMES, num_workers=1, threads_per_worker=1,
+                                   health_check_interval=0.1).start()
+        try:
+            batch = torch.rand(2, 3, 4, 4)
+            expected = torch.softmax(model(batch), dim=1)
+            self.assertTrue(torch.allclose(pool.predict_proba(batch, timeout=60), expected, atol=1e-6))
+
+            # Hold the health check until a request is queued on the dead worker
+            check_workers = pool._check_workers
+            pool._check_workers = lambda: None
+            victim = pool._processes[0]
+            os.kill(victim.pid, signal.SIGKILL)
+            victim.join(10)
+            future = pool.submit(batch)
+            pool._check_workers = check_workers
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=30)
+
+            deadline = time.time() + 30
+            while pool.get_stats()['alive_workers'] < 1 and time.time() < deadline:
+                time.sleep(0.1)
+            self.assertEqual(pool.get_stats()['worker_restarts'], 1)
+            self.assertNotEqual(pool._processes[0].pid, victim.pid)
+            self.assertTrue(torch.allclose(pool.predict_proba(batch, timeout=60), expected, atol=1e-6))
+        finally:
+            pool.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()